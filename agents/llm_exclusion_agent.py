@@ -1,15 +1,18 @@
 import os
+import io
 import json
 import pandas as pd
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
+import asyncio
+from openai import AsyncOpenAI, OpenAI
 from urllib.parse import urlparse
 from datetime import datetime
 from pydantic import BaseModel
+from typing import Dict, List
 from crewai import Agent
-from openpyxl.worksheet.datavalidation import DataValidation
-from openpyxl.utils import get_column_letter
+from tools import artifact_store, async_llm, batch_runner, decision_store, excel_writer, exclusion_classifier, llm_cache
+from tools.text_chunker import count_tokens
 
 # Load environment variables
 load_dotenv("C:/Users/hp/Documents/Agent Router Tools/.env")
@@ -19,14 +22,51 @@ client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Choices offered in the workbook's action column
+ACTION_OPTIONS = ["summarize", "custom prompt", "no action"]
+
+# Packed review: up to this many rows per request, within the prompt token budget
+MAX_ROWS_PER_REQUEST = 20
+MAX_PACKED_PROMPT_TOKENS = 6000
+MAX_PARALLEL_REQUESTS = 4
+
+# A malformed answer is re-asked this many times in total before the row is marked "Error"
+PARSE_ATTEMPTS = 2
+# Upper bound for reviewing one row, retries and backoff included (time queued behind other rows excluded)
+ROW_TIMEOUT_SECONDS = 180
+
+PACKED_PROMPT_TEMPLATE = """
+You are a compliance filtering assistant for a U.S. bank.
+
+For each update below, use its topic, supporting context, and regulator source to decide whether it is relevant for compliance monitoring.
+
+Respond with a JSON array only, one object per update, like this:
+[
+  {{"id": <id of the update>, "recommendation": "Include" or "Exclude", "reason": "short explanation"}}
+]
+
+Updates:
+{updates}
+"""
+
 # Input/output schema
 class LLMExclusionInput(BaseModel):
     url: str
     extracted_file: str  # path to CSV file
+    bypass_cache: bool = False  # always ask the LLM, even for rows reviewed before
+    batch: bool = False  # review all rows in one Batch API job (nightly runs; minutes to hours, half the price)
+    rows_per_request: int = MAX_ROWS_PER_REQUEST  # rows packed into one prompt; 1 = one request per row
+    concurrency: int = async_llm.MAX_CONCURRENT_REQUESTS  # requests in flight at once; 1 = sequential
+    skip_seen: bool = True  # reuse stored decisions for updates reviewed in earlier runs
+    local_classifier: bool = True  # decide confident rows with the classifier trained on past outputs
+    include_threshold: float = exclusion_classifier.INCLUDE_THRESHOLD
+    exclude_threshold: float = exclusion_classifier.EXCLUDE_THRESHOLD
+    sidecars: List[str] = []  # also write "csv" and/or "parquet" copies for machine consumers
 
 class LLMExclusionOutput(BaseModel):
     url: str
     exclusion_file: str  # path to XLSX
+    sidecar_files: Dict[str, str] = {}  # format -> path of CSV/Parquet copies
 
 class LLMExclusionAgent(Agent):
     def __init__(self):
@@ -52,43 +92,206 @@ Context: {context}
 Regulator: {regulator}
 """
 
-    def _review_llm(self, topic: str, context: str, regulator: str):
+    def _fields(self, topic, context, regulator) -> dict:
         topic = str(topic).strip() if pd.notnull(topic) else ""
         context = str(context).strip() if pd.notnull(context) else ""
         regulator = str(regulator).strip() if pd.notnull(regulator) else ""
+        return {"topic": topic[:300], "context": context[:1000], "regulator": regulator}
 
-        prompt = self.prompt_template.format(
-            topic=topic[:300],
-            context=context[:1000],
-            regulator=regulator
-        )
+    def _request(self, topic: str, context: str, regulator: str) -> dict:
+        prompt = self.prompt_template.format(**self._fields(topic, context, regulator))
+        return {
+            "model": "gpt-4o-mini",
+            "messages": [
+                {"role": "system", "content": "You are a compliance content classifier."},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": 0.2
+        }
+
+    def _parse_review(self, content: str) -> dict:
+        content = content.strip()
+        json_start = content.find('{')
+        json_end = content.rfind('}') + 1
+        if json_start == -1 or json_end == -1:
+            raise ValueError("No JSON object found in LLM response")
+
+        parsed = json.loads(content[json_start:json_end])
+        if "recommendation" not in parsed or "reason" not in parsed:
+            raise ValueError("Missing required keys in parsed LLM output")
+
+        return parsed
+
+    def _parse_response(self, response) -> dict:
+        return self._parse_review(response.choices[0].message.content)
+
+    def _parse_pack(self, response) -> list:
+        content = response.choices[0].message.content.strip()
+        return json.loads(content[content.find('['):content.rfind(']') + 1])
+
+    def _error(self, error: Exception) -> dict:
+        # Errored rows are marked as such, not silently excluded
+        return {
+            "recommendation": "Error",
+            "reason": f"⚠️ LLM error or invalid output: {str(error)}"
+        }
+
+    def _review_llm(self, topic: str, context: str, regulator: str, bypass_cache: bool = False):
+        error = None
+        for attempt in range(PARSE_ATTEMPTS):
+            try:
+                # A malformed answer is not cached, so the retry asks afresh
+                response = llm_cache.chat_completion(
+                    client,
+                    bypass=bypass_cache,
+                    validate=self._parse_response,
+                    **self._request(topic, context, regulator)
+                )
+                return self._parse_response(response)
+
+            except Exception as e:
+                print(f"⚠️ Failed to parse LLM output: {e}")
+                error = e
+        return self._error(error)
+
+    async def _areview_row(self, aclient, semaphore, i, topic, context, regulator, bypass_cache: bool = False) -> dict:
+        error = None
+        budget = async_llm.TimeBudget(ROW_TIMEOUT_SECONDS)
+        for attempt in range(PARSE_ATTEMPTS):
+            try:
+                response = await async_llm.achat_completion(
+                    aclient, semaphore,
+                    bypass=bypass_cache,
+                    validate=self._parse_response,
+                    budget=budget,
+                    **self._request(topic, context, regulator)
+                )
+                return self._parse_response(response)
+            except asyncio.TimeoutError as e:
+                if budget.remaining() <= 0:
+                    return self._error(TimeoutError(f"row not reviewed within {ROW_TIMEOUT_SECONDS}s"))
+                print(f"⚠️ Review of row {i} failed: {type(e).__name__}: {e}")
+                error = e
+            except Exception as e:
+                print(f"⚠️ Review of row {i} failed: {type(e).__name__}: {e}")
+                error = e
+        return self._error(error)
+
+    async def _areview_rows(self, df: pd.DataFrame, ids: list, bypass_cache: bool, concurrency: int) -> dict:
+        semaphore = asyncio.Semaphore(concurrency)
+        # The client retries nothing itself: async_llm owns backoff and Retry-After handling
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0) as aclient:
+            verdicts = await asyncio.gather(*(
+                self._areview_row(aclient, semaphore, i, df.at[i, "topic"], df.at[i, "additional_context"],
+                                  df.at[i, "regulator"], bypass_cache)
+                for i in ids
+            ))
+        # gather keeps input order, so verdicts line up with the row ids
+        return dict(zip(ids, verdicts))
+
+    def _review_rows(self, df: pd.DataFrame, ids: list, bypass_cache: bool = False,
+                     concurrency: int = async_llm.MAX_CONCURRENT_REQUESTS) -> dict:
+        """Review rows one request each, `concurrency` at a time."""
+        if not ids:
+            return {}
+        if concurrency <= 1:
+            return {
+                i: self._review_llm(df.at[i, "topic"], df.at[i, "additional_context"], df.at[i, "regulator"], bypass_cache)
+                for i in ids
+            }
+        return async_llm.run_sync(self._areview_rows(df, ids, bypass_cache, concurrency))
+
+    def _packs(self, df: pd.DataFrame, rows_per_request: int) -> list:
+        """Group row ids so each packed prompt stays within the row and token budgets."""
+        packs, pack, tokens = [], [], 0
+        for i, row in df.iterrows():
+            row_tokens = count_tokens(json.dumps(self._fields(row.get("topic", ""), row.get("additional_context", ""), row.get("regulator", ""))))
+            if pack and (len(pack) >= rows_per_request or tokens + row_tokens > MAX_PACKED_PROMPT_TOKENS):
+                packs.append(pack)
+                pack, tokens = [], 0
+            pack.append(i)
+            tokens += row_tokens
+        if pack:
+            packs.append(pack)
+        return packs
+
+    async def _areview_pack(self, aclient, semaphore, df: pd.DataFrame, pack: list, bypass_cache: bool = False) -> dict:
+        """Review several rows in one request; returns the valid verdicts by row id (others are left out)."""
+        updates = [
+            {"id": int(i), **self._fields(df.at[i, "topic"], df.at[i, "additional_context"], df.at[i, "regulator"])}
+            for i in pack
+        ]
         try:
-            response = client.chat.completions.create(
+            response = await async_llm.achat_completion(
+                aclient, semaphore,
+                bypass=bypass_cache,
+                validate=self._parse_pack,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "You are a compliance content classifier."},
-                    {"role": "user", "content": prompt}
+                    {"role": "user", "content": PACKED_PROMPT_TEMPLATE.format(updates=json.dumps(updates, indent=1))}
                 ],
                 temperature=0.2
             )
-            content = response.choices[0].message.content.strip()
-            json_start = content.find('{')
-            json_end = content.rfind('}') + 1
-            if json_start == -1 or json_end == -1:
-                raise ValueError("No JSON object found in LLM response")
+            parsed = self._parse_pack(response)
+        except Exception as e:
+            print(f"⚠️ Packed review of {len(pack)} rows failed: {type(e).__name__}: {e}")
+            return {}
 
-            parsed = json.loads(content[json_start:json_end])
-            if "recommendation" not in parsed or "reason" not in parsed:
-                raise ValueError("Missing required keys in parsed LLM output")
+        verdicts = {}
+        expected = {int(i): i for i in pack}
+        for item in parsed if isinstance(parsed, list) else []:
+            if not isinstance(item, dict):
+                continue
+            try:
+                row_id = expected.get(int(item.get("id")))
+            except (TypeError, ValueError):
+                continue
+            recommendation = str(item.get("recommendation", "")).strip().capitalize()
+            if row_id is not None and recommendation in ("Include", "Exclude") and item.get("reason"):
+                verdicts[row_id] = {"recommendation": recommendation, "reason": str(item["reason"])}
+        return verdicts
 
-            return parsed
+    async def _areview_packs(self, df: pd.DataFrame, packs: list, bypass_cache: bool, concurrency: int) -> dict:
+        # Same client setup as _areview_rows: async_llm owns retries, backoff and Retry-After
+        semaphore = asyncio.Semaphore(max(1, min(concurrency, MAX_PARALLEL_REQUESTS)))
+        async with AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0) as aclient:
+            results = {}
+            for verdicts in await asyncio.gather(*(self._areview_pack(aclient, semaphore, df, pack, bypass_cache) for pack in packs)):
+                results.update(verdicts)
+        return results
 
-        except Exception as e:
-            print(f"⚠️ Failed to parse LLM output: {e}")
-            return {
-                "recommendation": "Exclude",
-                "reason": f"⚠️ LLM error or invalid output: {str(e)}"
-            }
+    def _review_packed(self, df: pd.DataFrame, rows_per_request: int, bypass_cache: bool = False,
+                       concurrency: int = async_llm.MAX_CONCURRENT_REQUESTS) -> dict:
+        """Review rows K at a time; rows missing or invalid in a packed answer are re-asked on their own."""
+        packs = self._packs(df, rows_per_request)
+        results = async_llm.run_sync(self._areview_packs(df, packs, bypass_cache, concurrency))
+
+        retry = [i for i in df.index if i not in results]
+        print(f"📦 Reviewed {len(df)} rows in {len(packs)} packed requests; re-asking {len(retry)} rows individually")
+        results.update(self._review_rows(df, retry, bypass_cache, concurrency))
+        return results
+
+    def _review_batch(self, df: pd.DataFrame, job_name: str, bypass_cache: bool = False,
+                      concurrency: int = async_llm.MAX_CONCURRENT_REQUESTS) -> dict:
+        """Review all rows in one Batch API job; rows the batch could not answer are retried one by one."""
+        requests = [
+            {"custom_id": f"row-{i}", "params": self._request(row.get("topic", ""), row.get("additional_context", ""), row.get("regulator", ""))}
+            for i, row in df.iterrows()
+        ]
+        answers = batch_runner.run_batch(requests, job_name, bypass_cache=bypass_cache)
+
+        results = {}
+        for i, row in df.iterrows():
+            content = answers.get(f"row-{i}")
+            try:
+                results[i] = self._parse_review(content) if content is not None else None
+            except Exception as e:
+                print(f"⚠️ Failed to parse batch output for row {i}: {e}")
+                results[i] = None
+        retry = [i for i, verdict in results.items() if verdict is None]
+        results.update(self._review_rows(df, retry, bypass_cache, concurrency))
+        return results
 
     def run(self, input_data: dict) -> dict:
         if "extracted_file" not in input_data and "llm_output_file" in input_data:
@@ -101,8 +304,8 @@ Regulator: {regulator}
         if not file_path.exists():
             raise FileNotFoundError(f"❌ Extracted file not found at: {file_path}")
 
-        # ✅ Read CSV input
-        df = pd.read_csv(file_path)
+        # ✅ Read CSV input (plain file or artifact store entry)
+        df = pd.read_csv(io.StringIO(artifact_store.read_text(str(file_path))))
 
         required_cols = {"topic", "additional_context", "regulator", "link"}
         if not required_cols.issubset(df.columns):
@@ -113,53 +316,74 @@ Regulator: {regulator}
 
         print(f"🔍 Reviewing {len(df)} updates for exclusion...")
 
-        for i, row in df.iterrows():
-            topic = row.get("topic", "")
-            context = row.get("additional_context", "")
-            regulator = row.get("regulator", "")
-            result = self._review_llm(topic, context, regulator)
+        domain = urlparse(url).netloc.replace('.', '_')
+
+        # ✅ Updates reviewed in earlier runs keep their stored decision
+        keys = {i: decision_store.decision_key(row.get("link"), row.get("topic")) for i, row in df.iterrows()}
+        seen = decision_store.lookup(keys.values()) if input_obj.skip_seen else {}
+        reviews = {i: seen[key] for i, key in keys.items()
+                   if key in seen and not str(seen[key]["reason"]).startswith(exclusion_classifier.LOCAL_REASON_PREFIX)}
+        if seen:
+            print(f"♻️ {len(reviews)} of {len(df)} rows reviewed in earlier runs")
+
+        # ✅ Obvious rows are decided locally; only the uncertain band goes to the LLM
+        new_rows = df.drop(index=list(reviews))
+        model = exclusion_classifier.load_model() if input_obj.local_classifier and not new_rows.empty else None
+        if model:
+            local = exclusion_classifier.classify(model, new_rows, input_obj.include_threshold, input_obj.exclude_threshold)
+            print(f"🧠 {len(local)} of {len(new_rows)} new rows decided locally, {len(new_rows) - len(local)} sent to the LLM")
+            reviews.update(local)
+        pending = df.drop(index=list(reviews))
+
+        if pending.empty:
+            pass
+        elif input_obj.batch:
+            reviews.update(self._review_batch(pending, f"{domain}_exclusion", input_obj.bypass_cache, input_obj.concurrency))
+        elif input_obj.rows_per_request > 1:
+            reviews.update(self._review_packed(pending, input_obj.rows_per_request, input_obj.bypass_cache, input_obj.concurrency))
+        else:
+            reviews.update(self._review_rows(pending, list(pending.index), input_obj.bypass_cache, input_obj.concurrency))
+
+        errored = sum(1 for result in reviews.values() if result.get("recommendation") == "Error")
+        if errored:
+            print(f"❗ {errored} of {len(df)} rows could not be reviewed and are marked as Error")
+
+        for i, result in reviews.items():
             df.at[i, "Recommendation"] = result.get("recommendation", "Exclude")
             df.at[i, "Reason"] = result.get("reason", "No reason provided")
 
-        # ✅ Convert 'link' to Excel-formatted clickable hyperlinks
-        df["Link"] = df["link"].apply(
-            lambda x: f'=HYPERLINK("{x}", "Open Link")' if pd.notna(x) and str(x).startswith("http") else ""
-        )
+        # Local classifier guesses are not stored: the next run should classify (or review) them afresh
+        decision_store.record([
+            {**df.loc[i, ["link", "topic", "regulator"]].to_dict(), **reviews[i]}
+            for i in df.index
+            if i in reviews and not str(reviews[i].get("reason", "")).startswith(exclusion_classifier.LOCAL_REASON_PREFIX)
+        ])
+        status = [decision_store.previous_status(seen.get(keys[i])) for i in df.index]
+
+        # ✅ 'Link' becomes a native hyperlink cell in the workbook
+        df["Link"] = df["link"].apply(lambda x: str(x) if pd.notna(x) and str(x).startswith("http") else "")
         df.drop(columns=["link"], inplace=True)
 
         # ✅ Add editable action column with dropdown
         df["action"] = ""
+        # Kept last so Link stays in column G for the phase 2 readers
+        df["Status"] = status
 
-        domain = urlparse(url).netloc.replace('.', '_')
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         output_path = OUTPUT_DIR / f"{domain}_llm_exclusion_checked_{timestamp}.xlsx"
 
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            df.to_excel(writer, index=False, sheet_name="Exclusion Results")
-            workbook = writer.book
-            sheet = writer.sheets["Exclusion Results"]
-
-            # Find column index of 'action'
-            action_col_idx = df.columns.get_loc("action") + 1
-            action_col_letter = get_column_letter(action_col_idx)
-
-            # ✅ Working dropdown logic
-            dv = DataValidation(
-                type="list",
-                formula1='"summarize,custom prompt,no action"',
-                allow_blank=True,
-                showDropDown=False  # must be False to show the dropdown arrow
-            )
-            dv.error = "Invalid input. Choose from summarize, custom prompt, or no action."
-            dv.errorTitle = "Invalid Action"
-
-            # Apply to rows 2–101 (100 rows)
-            dv.add(f"{action_col_letter}2:{action_col_letter}101")
-            sheet.add_data_validation(dv)
+        written = excel_writer.write_workbook(
+            df, output_path,
+            sheet_name="Exclusion Results",
+            link_column="Link",
+            dropdowns={"action": ACTION_OPTIONS},
+            sidecars=input_obj.sidecars
+        )
 
         print(f"✅ Exclusion results saved to: {output_path}")
 
         return LLMExclusionOutput(
             url=url,
-            exclusion_file=str(output_path)
+            exclusion_file=str(output_path),
+            sidecar_files={fmt: path for fmt, path in written.items() if fmt != "xlsx"}
         ).dict()
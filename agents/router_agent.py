@@ -1,16 +1,22 @@
 # router_agent.py
 
 import os
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
 from urllib.parse import urlparse
 from dotenv import load_dotenv
 from openai import OpenAI
 from crewai import Agent
+from tools import llm_cache, route_sniffer
+from tools.http_fetcher import fetch_url
 
 # Load environment variables
 load_dotenv()
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
+# URLs routed at once by route_many (the shared HTTP session keeps 16 connections)
+MAX_ROUTE_WORKERS = 8
+
 class RouterAgent(Agent):
     def __init__(self):
         super().__init__(
@@ -20,20 +26,7 @@ class RouterAgent(Agent):
             backstory="You intelligently decide how to process a URL using heuristics and LLM if needed."
         )
 
-    def _looks_like_rss(self, url: str) -> bool:
-        # Basic heuristic check
-        return url.endswith(".xml") or "rss" in url.lower()
-
-    def _fetch_preview(self, url: str) -> str:
-        try:
-            resp = requests.get(url, timeout=5)
-            text = resp.text[:2000]  # Just a preview
-            return text
-        except Exception as e:
-            print(f"⚠️ Error fetching URL: {e}")
-            return ""
-
-    def _llm_classify(self, url: str, text_preview: str) -> str:
+    def _llm_classify(self, url: str, text_preview: str, bypass_cache: bool = False) -> str:
         prompt = f"""
 You are a smart URL classifier.
 
@@ -48,7 +41,9 @@ Content Preview:
 """
 
         try:
-            response = client.chat.completions.create(
+            response = llm_cache.chat_completion(
+                client,
+                bypass=bypass_cache,
                 model="gpt-4o-mini",
                 messages=[
                     {"role": "system", "content": "Classify the type of URL."},
@@ -63,18 +58,58 @@ Content Preview:
             print(f"⚠️ LLM classification failed: {e}")
             return "web"  # Default to web if LLM fails
 
-    def run(self, input_data: dict) -> dict:
-        url = input_data["url"]
+    def route(self, url: str, bypass_cache: bool = False) -> Dict:
+        """
+        Route one URL: {"route": "rss" | "web", "source", "reason", "feed_url"}.
+        Cached decision first, then Content-Type / root element sniffing, then how
+        ambiguous URLs on the same domain went, and only then the LLM.
+        """
+        # 1. Cached decision for this URL
+        if not bypass_cache:
+            cached = route_sniffer.get_route(url)
+            if cached:
+                return {**cached, "source": f"cache ({cached['source']})"}
+
+        # 2. Deterministic sniffing; fetched through the shared HTTP session so the scraper can reuse the response
+        response = fetch_url(url, timeout=5)
+        reachable = response is not None and response["status"] in (200, 304)
+        decision = route_sniffer.sniff(response) if reachable else None
+        if decision:
+            decision["source"] = "sniff"
+            route_sniffer.set_route(url, decision)
+            return decision
+
+        # 3. Unreachable: fall back to the URL itself, without caching a guess
+        if not reachable:
+            if route_sniffer.looks_like_feed_url(url):
+                return {"route": "rss", "source": "url heuristic", "reason": "unreachable, feed-like URL", "feed_url": url}
+            return {"route": "web", "source": "url heuristic", "reason": "unreachable", "feed_url": None}
 
-        # 1. Heuristic check
-        if self._looks_like_rss(url):
-            return {"route": "rss"}
+        # 4. Ambiguous content: reuse the domain's last verdict before asking the LLM
+        domain = urlparse(url).netloc
+        previous = None if bypass_cache else route_sniffer.get_domain_route(domain)
+        if previous:
+            decision = {"route": previous["route"], "source": "domain cache",
+                        "reason": f"ambiguous content; {domain} routed {previous['route']} before", "feed_url": None}
+        else:
+            preview = response["text"][:2000]  # Just a preview
+            route = self._llm_classify(url, preview, bypass_cache)
+            decision = {"route": route, "source": "llm", "reason": "LLM classification of the content preview",
+                        "feed_url": url if route == "rss" else None}
+        route_sniffer.set_route(url, decision, domain_wide=decision["source"] == "llm")
+        return decision
 
-        # 2. Fetch preview
-        preview = self._fetch_preview(url)
+    def route_many(self, urls: List[str], bypass_cache: bool = False) -> Dict[str, Dict]:
+        """Route several URLs concurrently; returns url -> decision in input order."""
+        urls = list(dict.fromkeys(urls))
+        with ThreadPoolExecutor(max_workers=MAX_ROUTE_WORKERS) as pool:
+            decisions = list(pool.map(lambda url: self.route(url, bypass_cache), urls))
+        routes = [d["route"] for d in decisions]
+        print(f"🔁 RouterAgent routed {len(urls)} URLs: {routes.count('rss')} rss, {routes.count('web')} web")
+        return dict(zip(urls, decisions))
 
-        # 3. Use LLM to classify
-        route = self._llm_classify(url, preview)
-        print(f"🔁 RouterAgent selected route: {route}")
-        return {"route": route}
- 	
\ No newline at end of file
+    def run(self, input_data: dict) -> dict:
+        url = input_data["url"]
+        decision = self.route(url, input_data.get("bypass_cache", False))
+        print(f"🔁 RouterAgent selected route: {decision['route']} ({decision['source']}: {decision['reason']})")
+        return {"route": decision["route"], "feed_url": decision.get("feed_url")}
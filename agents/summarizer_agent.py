@@ -1,25 +1,21 @@
 from crewai import Agent
 from pydantic import BaseModel
-from pathlib import Path
-from urllib.parse import urlparse
 import os
 from openai import OpenAI
 from dotenv import load_dotenv
-from datetime import datetime
+from tools import artifact_store, batch_runner, llm_cache
 
 # Load .env
 load_dotenv("C:/Users/hp/Documents/Agent Router Tools/.env")
 
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
-
 # Input/Output Schemas
 class SummarizerInput(BaseModel):
     text: str | None = None
     source_url: str | None = None
     extracted_text: str | None = None
     url: str | None = None
+    prompt: str | None = None  # analyst's custom instruction, replacing the default summary request
+    bypass_cache: bool = False
 
 class SummarizerOutput(BaseModel):
     source_url: str
@@ -35,19 +31,26 @@ class SummarizerAgent(Agent):
             backstory="You are a regulatory analyst summarizing updates for compliance professionals at global banks."
         )
 
-    def run(self, input_data: dict) -> dict:
+    def _inputs(self, input_data: dict) -> tuple:
         # Accept flexible inputs
         if "text" in input_data and "source_url" in input_data:
-            text = input_data["text"]
-            source_url = input_data["source_url"]
-        elif "extracted_text" in input_data and "url" in input_data:
-            text = input_data["extracted_text"]
-            source_url = input_data["url"]
-        else:
-            raise ValueError("❌ Input must include ('text' + 'source_url') or ('extracted_text' + 'url')")
+            return input_data["text"], input_data["source_url"]
+        if "extracted_text" in input_data and "url" in input_data:
+            return input_data["extracted_text"], input_data["url"]
+        raise ValueError("❌ Input must include ('text' + 'source_url') or ('extracted_text' + 'url')")
+
+    def _request(self, text: str, custom_prompt: str | None = None) -> dict:
+        if custom_prompt:
+            prompt = f"""
+You are a regulatory analyst focused on large global financial institutions such as Wells Fargo.
+
+{custom_prompt}
 
-        # Prompt
-        prompt = f"""
+Content:
+{text}
+"""
+        else:
+            prompt = f"""
 You are a regulatory analyst focused on large global financial institutions such as Wells Fargo.
 
 Summarize the following content from a regulatory update. Your summary should highlight:
@@ -61,25 +64,52 @@ Respond in 2–4 sentences. Be precise and compliance-focused.
 Content:
 {text}
 """
+        return {
+            "model": "gpt-4o-mini",
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 0.3,
+        }
 
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3,
-        )
-        summary = response.choices[0].message.content.strip()
-
-        domain = urlparse(source_url).netloc.replace(".", "_")
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        summary_file = OUTPUT_DIR / f"{domain}_summary_{timestamp}.txt"
-        with open(summary_file, "w", encoding="utf-8") as f:
-            f.write(summary)
+    def _save(self, source_url: str, summary: str) -> dict:
+        summary_file = artifact_store.put(source_url, "summary", summary, suffix=".txt")
 
         print(f"✅ Saved summary to: {summary_file}")
 
         return {
             "source_url": source_url,
             "summary": summary,
-            "summary_file": str(summary_file)
+            "summary_file": summary_file
         }
+
+    def run(self, input_data: dict) -> dict:
+        text, source_url = self._inputs(input_data)
+
+        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        response = llm_cache.chat_completion(
+            client,
+            bypass=input_data.get("bypass_cache", False),
+            **self._request(text, input_data.get("prompt"))
+        )
+        summary = response.choices[0].message.content.strip()
+        return self._save(source_url, summary)
+
+    def run_batch(self, inputs: list, job_name: str = "summaries", bypass_cache: bool = False) -> list:
+        """
+        Summarize many texts in one Batch API job, for nightly runs. Returns one output per
+        input, in order; items the batch could not answer are summarized one by one.
+        """
+        items = [self._inputs(input_data) for input_data in inputs]
+        requests = [
+            {"custom_id": f"item-{i}", "params": self._request(text, input_data.get("prompt"))}
+            for i, ((text, _), input_data) in enumerate(zip(items, inputs))
+        ]
+        answers = batch_runner.run_batch(requests, job_name, bypass_cache=bypass_cache)
+
+        outputs = []
+        for i, ((_, source_url), input_data) in enumerate(zip(items, inputs)):
+            summary = answers.get(f"item-{i}")
+            if summary is None:
+                outputs.append(self.run(input_data))
+            else:
+                outputs.append(self._save(source_url, summary.strip()))
+        return outputs
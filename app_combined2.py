@@ -4,7 +4,6 @@ import streamlit as st
 import pandas as pd
 from io import BytesIO
 from tempfile import NamedTemporaryFile
-from openpyxl import load_workbook
 from pathlib import Path
 import asyncio
 from urllib.parse import urlparse
@@ -12,9 +11,9 @@ import os
 
 from phase1_web_pipeline import app as langgraph_app
 from tools.scraper_tool import scraper_tool
-from tools.cleaner_tool import cleaner_tool
-from tools.html_extractor_tool import html_extractor_tool
+from tools.clean_extract_tool import clean_extract_tool
 from agents.summarizer_agent import SummarizerAgent
+from tools import decision_store, excel_writer
 
 st.set_page_config(page_title="Combined Regulatory Analyzer", layout="wide")
 st.title("🔄 Combined Regulatory Horizon Analyzer")
@@ -40,28 +39,13 @@ if run_button and url_input:
             st.error(f"❌ Failed to process URL: {str(e)}")
 
 # Step 2: Display output table and run summarization
-def extract_hyperlinks_from_excel_column(path, column_letter="G"):
-    wb = load_workbook(path, data_only=False)
-    sheet = wb.sheetnames[0]
-    ws = wb[sheet]
-    links = []
-    for cell in ws[column_letter]:
-        val = cell.value
-        if isinstance(val, str) and val.startswith('=HYPERLINK('):
-            try:
-                url = val.split('"')[1]
-                if not url.startswith(('http://', 'https://')):
-                    url = 'https://' + url
-                links.append(url)
-            except IndexError:
-                links.append("")
-        else:
-            links.append("")
-    return links
-
 if output_excel_path:
     try:
-        real_links = extract_hyperlinks_from_excel_column(output_excel_path, column_letter="G")
+        # One link per data row (header skipped), so links line up with the DataFrame rows
+        real_links = [
+            "" if not url else url if url.startswith(('http://', 'https://')) else 'https://' + url
+            for url in excel_writer.read_links(output_excel_path, column_letter="G")
+        ]
         df = pd.read_excel(output_excel_path, engine="openpyxl")
         df["Link"] = real_links[:len(df)] + [""] * (len(df) - len(real_links))
 
@@ -108,6 +92,17 @@ if "edited_df" in st.session_state:
         results = []
         df = st.session_state["edited_df"]
         new_outputs = []
+        decision_store.record_actions(df)
+
+        # Scrape every selected link concurrently before summarizing
+        pending_urls = list(dict.fromkeys(
+            str(row.get("Link", "")).strip() for _, row in df.iterrows()
+            if (str(row.get("action", "")).strip().lower() == "summarize"
+                or str(row.get("action", "")).strip().lower().startswith("custom:"))
+            and str(row.get("phase2_output", "")).strip().lower() in ["", "skipped", "⏭️ skipped"]
+            and str(row.get("Link", "")).strip()
+        ))
+        scraped_pages = dict(zip(pending_urls, scraper_tool.fetch_many(pending_urls)))
 
         for idx, row in df.iterrows():
             action = str(row.get("action", "")).strip().lower()
@@ -120,9 +115,8 @@ if "edited_df" in st.session_state:
                     continue
 
                 try:
-                    scraped = scraper_tool.run(url=url)
-                    cleaned = cleaner_tool.run(url=url, scraped_html=scraped["scraped_html"])
-                    extracted = html_extractor_tool.run(url=url, cleaned_file=cleaned["cleaned_file"])
+                    scraped = scraped_pages.get(url) or scraper_tool.run(url=url)
+                    extracted = clean_extract_tool.run(url=url, scraped_html=scraped["scraped_html"])
 
                     if action == "summarize":
                         summary = summarizer.run({
@@ -131,10 +125,10 @@ if "edited_df" in st.session_state:
                         })
                     else:
                         prompt = action[7:].strip()
-                        summarizer.goal = prompt
                         summary = summarizer.run({
                             "extracted_text": extracted["extracted_text"],
-                            "url": url
+                            "url": url,
+                            "prompt": prompt
                         })
 
                     new_outputs.append(summary.get("summary", "✅ Success but empty"))
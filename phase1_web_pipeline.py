@@ -8,30 +8,44 @@ from urllib.parse import urlparse
 from tools.scraper_tool import ScraperTool
 from tools.cleaner_tool import CleanerTool
 from tools.html_extractor_tool import HTMLExtractorTool
+from tools.clean_extract_tool import CleanExtractTool
 from tools.llm_extractor_tool import LLMExtractorTool
+from tools.rss_fetcher_tool import RSSFetcherTool, save_feed_states
 from agents.llm_exclusion_agent import LLMExclusionAgent
 from agents.router_agent import RouterAgent
+from tools import extraction_snapshot, http_cache
+from tools.streaming_extractor import STREAMING_THRESHOLD_CHARS
 
 # Initialize tools and agents
 scraper_tool = ScraperTool()
 cleaner_tool = CleanerTool()
 html_extractor_tool = HTMLExtractorTool()
+clean_extract_tool = CleanExtractTool()
 llm_extractor_tool = LLMExtractorTool()
+rss_fetcher_tool = RSSFetcherTool()
 exclusion_agent = LLMExclusionAgent()
 router_agent = RouterAgent()
 
+# Parse once and extract in memory instead of cleaner -> file -> HTML extractor -> file
+USE_FUSED_CLEAN_EXTRACT = True
+# Keep the cleaned HTML / extracted text on disk for debugging
+SAVE_INTERMEDIATE_FILES = False
+
 # Define shared state
 class State(TypedDict):
     url: str
     route: str
+    feed_url: str
     scraper_input: dict
     scraper_output: dict
+    clean_extract_output: dict
     cleaner_input: dict
     cleaner_output: dict
     html_extractor_input: dict
     html_extractor_output: dict
     llm_extractor_input: dict
     llm_extractor_output: dict
+    rss_output: dict
     exclusion_input: dict
     exclusion_output: dict
     final_output: dict
@@ -41,19 +55,24 @@ class State(TypedDict):
 def router_node(state: State) -> State:
     route = router_agent.run({"url": state["url"]})
     print(f"🧭 Routing URL via RouterAgent... ➤ {route}")
-    return {"route": route["route"]}
+    return {"route": route["route"], "feed_url": route.get("feed_url")}
 
 
-# Node: Scraper
-def scraper_node(state: State) -> State:
+# Node: Scraper (async so the graph's ainvoke path doesn't block on the browser)
+async def scraper_node(state: State) -> State:
     input_dict = state.get("scraper_input", {"url": state["url"]})
-    output = scraper_tool.run(**input_dict)
+    output = await scraper_tool._arun(**input_dict)
+
+    # Very large pages are streamed from the stored file instead of kept in state; this bounds the
+    # HTML and DOM, while the LLM extractor still reads the page's visible text from extracted_file
+    if USE_FUSED_CLEAN_EXTRACT and len(output["scraped_html"]) > STREAMING_THRESHOLD_CHARS:
+        cleaner_input = {"url": output["url"], "scraped_file": output["scraped_file"]}
+    else:
+        cleaner_input = {"url": output["url"], "scraped_html": output["scraped_html"]}
+
     return {
-        "scraper_output": output,
-        "cleaner_input": {
-            "url": output["url"],
-            "scraped_html": output["scraped_html"]
-        }
+        "scraper_output": {k: v for k, v in output.items() if k not in ("html", "scraped_html")},
+        "cleaner_input": cleaner_input
     }
 
 # Node: Cleaner
@@ -63,7 +82,30 @@ def cleaner_node(state: State) -> State:
         "cleaner_output": output,
         "html_extractor_input": {
             "url": output["url"],
-            "cleaned_file": output["cleaned_file"]
+            "cleaned_file": output["cleaned_file"],
+            "use_template": True
+        }
+    }
+
+# Node: Fused Cleaner + HTML Extractor (in memory)
+def clean_extract_node(state: State) -> State:
+    output = clean_extract_tool.run(
+        save_files=SAVE_INTERMEDIATE_FILES,
+        use_template=True,
+        **state["cleaner_input"]
+    )
+    return {
+        "clean_extract_output": {k: v for k, v in output.items() if k not in ("extracted_text", "link_records", "listing_items")},
+        "llm_extractor_input": {
+            "url": output["url"],
+            "extracted_text": output["extracted_text"],
+            "extracted_file": output["extracted_file"],
+            "extracted_links": output["extracted_links"],
+            "link_records": output["link_records"],
+            "listing_items": output["listing_items"],
+            "listing_confidence": output["listing_confidence"],
+            "content_fingerprint": output["content_fingerprint"],
+            "template_mode": output["template_mode"]
         }
     }
 
@@ -74,13 +116,19 @@ def html_extractor_node(state: State) -> State:
         "html_extractor_output": output,
         "llm_extractor_input": {
             "url": output["url"],
-            "extracted_file": output["extracted_file"]
+            "extracted_file": output["extracted_file"],
+            "link_records": output["link_records"],
+            "listing_items": output["listing_items"],
+            "listing_confidence": output["listing_confidence"],
+            "content_fingerprint": output["content_fingerprint"],
+            "template_mode": output["template_mode"]
         }
     }
 
 # Node: LLM Extractor
 def llm_extractor_node(state: State) -> State:
-    output = llm_extractor_tool.run(**state["llm_extractor_input"])
+    # The snapshot is saved by the exclusion node, once the run's results are remembered
+    output = llm_extractor_tool.run(save_snapshot=False, **state["llm_extractor_input"])
     return {
         "llm_extractor_output": output,
         "exclusion_input": {
@@ -89,6 +137,51 @@ def llm_extractor_node(state: State) -> State:
         }
     }
 
+# Node: RSS feed, entries map straight to records (no browser, cleaning or LLM extraction)
+def rss_node(state: State) -> State:
+    # Poll the feed the router found (e.g. after a redirect); feed state is saved by the exclusion node
+    output = rss_fetcher_tool.run(url=state.get("feed_url") or state["url"], save_state=False)
+    return {
+        "rss_output": output,
+        "exclusion_input": {
+            "url": state["url"],
+            "extracted_file": output["output_file"]
+        }
+    }
+
+# Node: Unchanged page, reuse the previous run's results
+def cached_results_node(state: State) -> State:
+    previous = http_cache.previous_results(state["url"])
+    print(f"♻️ Page unchanged since last run, reusing: {previous['exclusion_file']}")
+    return {
+        "final_output": {
+            "output_file": previous["exclusion_file"],
+            "data": {"url": state["url"], "exclusion_file": previous["exclusion_file"]},
+            "from_cache": True
+        }
+    }
+
+def route_after_scrape(state: State) -> str:
+    # Compare against the page the last completed run was built from, not the last fetch:
+    # a run that failed after fetching must not turn the next 304 into stale results
+    digest = state["scraper_output"].get("digest")
+    if digest and http_cache.previous_results(state["url"], digest):
+        return "cached"
+    return "fresh"
+
+def route_after_rss(state: State) -> str:
+    # 304 from the feed: nothing new to review
+    if state["rss_output"].get("not_modified") and http_cache.previous_results(state["url"]):
+        return "cached"
+    return "fresh"
+
+def route_after_extract(state: State) -> str:
+    # Same main content as the last run (only chrome, ads or timestamps changed): nothing to re-extract
+    fingerprint = state["llm_extractor_input"].get("content_fingerprint")
+    if extraction_snapshot.is_unchanged(state["url"], fingerprint) and http_cache.previous_results(state["url"]):
+        return "cached"
+    return "fresh"
+
 # ✅ Updated Node: Exclusion Agent with output file detection
 def exclusion_node(state: State) -> State:
     print("Using Tool: llm_exclusion_agent")
@@ -109,6 +202,18 @@ def exclusion_node(state: State) -> State:
     except Exception as e:
         print(f"⚠️ Could not detect output file: {e}")
 
+    http_cache.remember_results(
+        state["url"],
+        llm_output_file=state["exclusion_input"]["extracted_file"],
+        exclusion_file=output.get("exclusion_file") or latest_file,
+        digest=state.get("scraper_output", {}).get("digest")
+    )
+    # Only now can the next run treat this extraction / these feed entries as done
+    snapshot = state.get("llm_extractor_output", {}).get("snapshot")
+    if snapshot:
+        extraction_snapshot.save(**snapshot)
+    save_feed_states(state.get("rss_output", {}).get("feed_states"))
+
     return {
         "final_output": {
             "output_file": latest_file if latest_file else "",
@@ -122,24 +227,57 @@ graph = StateGraph(State)
 # Add nodes
 graph.add_node("router", router_node)
 graph.add_node("scraper", scraper_node)
-graph.add_node("cleaner", cleaner_node)
-graph.add_node("html_extractor", html_extractor_node)
+if USE_FUSED_CLEAN_EXTRACT:
+    graph.add_node("clean_extract", clean_extract_node)
+else:
+    graph.add_node("cleaner", cleaner_node)
+    graph.add_node("html_extractor", html_extractor_node)
 graph.add_node("llm_extractor", llm_extractor_node)
+graph.add_node("rss", rss_node)
 graph.add_node("exclusion", exclusion_node)
+graph.add_node("cached", cached_results_node)
 
 # Define conditional route branching
 graph.add_conditional_edges(
     "router",
     lambda state: state["route"],
     {
-        "web": "scraper"
+        "web": "scraper",
+        "rss": "rss"
+    }
+)
+
+# RSS path: feed records go straight to exclusion (an unchanged feed reuses the previous results)
+graph.add_conditional_edges(
+    "rss",
+    route_after_rss,
+    {
+        "fresh": "exclusion",
+        "cached": "cached"
     }
 )
 
-# Web path
-graph.add_edge("scraper", "cleaner")
-graph.add_edge("cleaner", "html_extractor")
-graph.add_edge("html_extractor", "llm_extractor")
+# Web path (a 304 / unchanged page skips straight to the previous results)
+graph.add_conditional_edges(
+    "scraper",
+    route_after_scrape,
+    {
+        "fresh": "clean_extract" if USE_FUSED_CLEAN_EXTRACT else "cleaner",
+        "cached": "cached"
+    }
+)
+# A page whose extracted content is unchanged skips the LLM and exclusion steps too
+extract_node = "clean_extract" if USE_FUSED_CLEAN_EXTRACT else "html_extractor"
+if not USE_FUSED_CLEAN_EXTRACT:
+    graph.add_edge("cleaner", "html_extractor")
+graph.add_conditional_edges(
+    extract_node,
+    route_after_extract,
+    {
+        "fresh": "llm_extractor",
+        "cached": "cached"
+    }
+)
 graph.add_edge("llm_extractor", "exclusion")
 
 # Set entry point
@@ -1,64 +1,72 @@
 from pathlib import Path
 import pandas as pd
-import openpyxl
-import re
 import os
 
 # === Import Tools and Agent ===
 from tools.scraper_tool import scraper_tool
-from tools.cleaner_tool import cleaner_tool
-from tools.html_extractor_tool import html_extractor_tool
+from tools.clean_extract_tool import clean_extract_tool
 from agents.summarizer_agent import SummarizerAgent  # Updated path
+from tools import decision_store, excel_writer
 
 # === Setup ===
 INPUT_FOLDER = Path(r"C:/Users/hp/Documents/Agent Router Tools/regulatory_outputs/site_outputs")
 INPUT_FILE = [f for f in INPUT_FOLDER.glob("*.xlsx") if "phase2_output" not in f.name][-1]
 OUTPUT_FILE = INPUT_FOLDER / INPUT_FILE.with_stem(INPUT_FILE.stem + "_phase2_output").name
 
-# === Step 1: Load Excel with openpyxl to extract hyperlink formulas ===
-wb = openpyxl.load_workbook(INPUT_FILE)
-sheet = wb.active
-
-# Extract real hyperlinks from column G (Excel column "G" = index 6)
-extracted_urls = []
-for row in sheet.iter_rows(min_row=2, min_col=7, max_col=7):
-    cell = row[0]
-    formula = cell.value
-    if isinstance(formula, str):
-        match = re.search(r'HYPERLINK\("([^"]+)"', formula)
-        if match:
-            extracted_urls.append(match.group(1))
-        else:
-            extracted_urls.append(None)
-    else:
-        extracted_urls.append(None)
+# === Step 1: Extract real hyperlinks from column G ===
+# (native hyperlink cells, or =HYPERLINK formulas in workbooks written before)
+extracted_urls = excel_writer.read_links(INPUT_FILE, column_letter="G")
 
 # === Step 2: Load DataFrame and apply URLs ===
 df = pd.read_excel(INPUT_FILE)
 df["action"] = df["action"].astype(str).fillna("")
 df["Link"] = extracted_urls  # Replace with actual links
 
+# Remember the analyst's choices so later runs can show them for previously reviewed updates
+print(f"📝 Recorded {decision_store.record_actions(df)} analyst actions")
+
 # === Agent ===
 summarizer = SummarizerAgent()
 
-# === Step 3: Execute Pipeline ===
+# Nightly runs: summarize every row in one Batch API job instead of one request per row
+USE_BATCH_MODE = False
+
+# === Step 3: Scrape all actionable links concurrently ===
+def is_actionable(action: str) -> bool:
+    return bool(action) and action.lower() not in ["skip", "nan"]
+
+urls_to_scrape = list(dict.fromkeys(
+    row.get("Link") for _, row in df.iterrows()
+    if is_actionable(row["action"].strip()) and row.get("Link")
+))
+scraped_pages = dict(zip(urls_to_scrape, scraper_tool.fetch_many(urls_to_scrape)))
+
+# === Step 4: Execute Pipeline ===
 results = []
+batch_inputs = {}  # result index -> summarizer input, filled in batch mode
 for idx, row in df.iterrows():
     action = row["action"].strip()
     url = row.get("Link", "")
 
-    if not action or action.lower() in ["skip", "nan"]:
+    if not is_actionable(action):
         results.append(None)
         continue
 
     try:
-        # Step 1: Scrape
-        scrape_result = scraper_tool.run(url=url)
-        cleaned_result = cleaner_tool.run(url=url, scraped_html=scrape_result["scraped_html"])
-        extracted_result = html_extractor_tool.run(url=url, cleaned_file=cleaned_result["cleaned_file"])
+        # Step 1: Scrape (already fetched above)
+        scrape_result = scraped_pages.get(url) or scraper_tool.run(url=url)
+        extracted_result = clean_extract_tool.run(url=url, scraped_html=scrape_result["scraped_html"])
 
         # Step 2: Summarize or Custom Prompt
-        if action.lower() == "summarize":
+        if USE_BATCH_MODE and (action.lower() == "summarize" or action.lower().startswith("custom:")):
+            batch_inputs[len(results)] = {
+                "extracted_text": extracted_result["extracted_text"],
+                "url": url,
+                # The analyst's custom prompt travels with the batch request
+                "prompt": action[7:].strip() if action.lower().startswith("custom:") else None
+            }
+            results.append(None)
+        elif action.lower() == "summarize":
             summary_output = summarizer.run({
                 "extracted_text": extracted_result["extracted_text"],
                 "url": url
@@ -66,10 +74,10 @@ for idx, row in df.iterrows():
             results.append(summary_output["summary"])
         elif action.lower().startswith("custom:"):
             prompt = action[7:].strip()
-            summarizer.goal = prompt
             summary_output = summarizer.run({
                 "extracted_text": extracted_result["extracted_text"],
-                "url": url
+                "url": url,
+                "prompt": prompt
             })
             results.append(summary_output["summary"])
         else:
@@ -78,7 +86,16 @@ for idx, row in df.iterrows():
     except Exception as e:
         results.append(f"❌ Error: {str(e)}")
 
-# === Step 4: Save ===
+if batch_inputs:
+    try:
+        outputs = summarizer.run_batch(list(batch_inputs.values()), job_name=INPUT_FILE.stem)
+        for position, summary_output in zip(batch_inputs, outputs):
+            results[position] = summary_output["summary"]
+    except Exception as e:
+        for position in batch_inputs:
+            results[position] = f"❌ Error: {str(e)}"
+
+# === Step 5: Save ===
 df["phase2_output"] = results
 df.to_excel(OUTPUT_FILE, index=False)
 print(f"✅ Phase 2 output saved to: {OUTPUT_FILE}")
@@ -0,0 +1,220 @@
+import codecs
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+
+try:
+    import zstandard
+except ImportError:  # gzip fallback keeps the store usable without the extra dependency
+    zstandard = None
+
+# Content-addressed artifacts: <ARTIFACT_DIR>/<ab>/<sha256><suffix>.zst|.gz
+ARTIFACT_DIR = Path("regulatory_outputs/artifacts")
+ARTIFACT_DIR.mkdir(parents=True, exist_ok=True)
+MANIFEST_DB = ARTIFACT_DIR / "manifest.sqlite"
+
+# Retention
+MAX_AGE_DAYS = 30
+MAX_STORE_BYTES = 1024 * 1024 * 1024
+RETENTION_INTERVAL_SECONDS = 3600
+
+_lock = threading.Lock()
+_last_retention = 0.0
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(MANIFEST_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS artifacts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT NOT NULL,
+            stage TEXT NOT NULL,
+            digest TEXT NOT NULL,
+            path TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_url_stage ON artifacts (url, stage, created_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_artifacts_digest ON artifacts (digest)")
+    return conn
+
+
+@contextmanager
+def _db():
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def _compress(data: bytes) -> bytes:
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def _compressed_suffix() -> str:
+    return ".zst" if zstandard is not None else ".gz"
+
+
+def put(url: str, stage: str, content: Union[str, bytes], suffix: str = ".txt", compress: bool = True) -> str:
+    """
+    Store `content` for (url, stage) and return the artifact path. Identical content is
+    stored once, no matter how many URLs or runs produce it.
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    digest = hashlib.sha256(data).hexdigest()
+    path = ARTIFACT_DIR / digest[:2] / (digest + suffix + (_compressed_suffix() if compress else ""))
+
+    if path.exists():
+        os.utime(path)  # keep a deduplicated blob from looking orphaned to retention
+    else:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(_compress(data) if compress else data)
+        os.replace(tmp_path, path)
+
+    with _db() as conn:
+        conn.execute(
+            "INSERT INTO artifacts (url, stage, digest, path, size, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, stage, digest, str(path), path.stat().st_size, time.time())
+        )
+
+    _maybe_enforce_retention()
+    return str(path)
+
+
+def put_stream(url: str, stage: str, chunks: Iterable[str], suffix: str = ".txt") -> str:
+    """Like `put`, but compresses and hashes text chunks as they arrive instead of holding them all."""
+    tmp_path = ARTIFACT_DIR / f"stream.{os.getpid()}.{threading.get_ident()}.tmp"
+    hasher = hashlib.sha256()
+    try:
+        with open(tmp_path, "wb") as raw:
+            if zstandard is not None:
+                writer = zstandard.ZstdCompressor(level=10).stream_writer(raw, closefd=False)
+            else:
+                writer = gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6)
+            with writer:
+                for chunk in chunks:
+                    data = chunk.encode("utf-8")
+                    hasher.update(data)
+                    writer.write(data)
+    except BaseException:
+        # A failed or interrupted stream (e.g. a parse error mid-page) must not leave the tmp file behind
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    digest = hasher.hexdigest()
+    path = ARTIFACT_DIR / digest[:2] / (digest + suffix + _compressed_suffix())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_path, path)
+
+    with _db() as conn:
+        conn.execute(
+            "INSERT INTO artifacts (url, stage, digest, path, size, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+            (url, stage, digest, str(path), path.stat().st_size, time.time())
+        )
+
+    _maybe_enforce_retention()
+    return str(path)
+
+
+def iter_text(path: str, chunk_chars: int = 64 * 1024) -> Iterator[str]:
+    """Stream an artifact's text in chunks without decompressing it all into memory."""
+    with open(path, "rb") as raw:
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            stream = zstandard.ZstdDecompressor().stream_reader(raw)
+        elif path.endswith(".gz"):
+            stream = gzip.GzipFile(fileobj=raw, mode="rb")
+        else:
+            stream = raw
+        decoder = codecs.getincrementaldecoder("utf-8-sig")()
+        try:
+            while True:
+                data = stream.read(chunk_chars)
+                if not data:
+                    break
+                text = decoder.decode(data)
+                if text:
+                    yield text
+        finally:
+            if stream is not raw:
+                stream.close()
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def read_bytes(path: str) -> bytes:
+    """Read an artifact (or any plain file written before the store existed)."""
+    raw = Path(path).read_bytes()
+    if path.endswith(".zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is required to read {path}")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(raw)
+    if path.endswith(".gz"):
+        return gzip.decompress(raw)
+    return raw
+
+
+def read_text(path: str) -> str:
+    return read_bytes(path).decode("utf-8-sig")
+
+
+def latest(url: str, stage: str) -> Optional[str]:
+    """Path of the most recent artifact for (url, stage), if any."""
+    with _db() as conn:
+        row = conn.execute(
+            "SELECT path FROM artifacts WHERE url = ? AND stage = ? ORDER BY created_at DESC LIMIT 1",
+            (url, stage)
+        ).fetchone()
+    return row[0] if row else None
+
+
+def enforce_retention(max_age_days: float = MAX_AGE_DAYS, max_bytes: int = MAX_STORE_BYTES) -> int:
+    """Drop manifest entries past the age limit, then oldest blobs past the size limit. Returns files removed."""
+    removed = 0
+    with _db() as conn:
+        conn.execute("DELETE FROM artifacts WHERE created_at < ?", (time.time() - max_age_days * 86400,))
+
+        # One row per blob with its newest reference
+        blobs = conn.execute(
+            "SELECT path, MAX(size), MAX(created_at) FROM artifacts GROUP BY path ORDER BY MAX(created_at) DESC"
+        ).fetchall()
+        total = 0
+        for path, size, _ in blobs:
+            total += size
+            if total > max_bytes:
+                conn.execute("DELETE FROM artifacts WHERE path = ?", (path,))
+
+        live = {row[0] for row in conn.execute("SELECT DISTINCT path FROM artifacts")}
+
+    # Skip files touched in the last minute: a concurrent put may not have reached the manifest yet
+    cutoff = time.time() - 60
+    for blob in ARTIFACT_DIR.glob("??/*"):
+        if str(blob) not in live and blob.stat().st_mtime < cutoff:
+            blob.unlink(missing_ok=True)
+            removed += 1
+    return removed
+
+
+def _maybe_enforce_retention():
+    global _last_retention
+    if time.time() - _last_retention < RETENTION_INTERVAL_SECONDS:
+        return
+    _last_retention = time.time()
+    removed = enforce_retention()
+    if removed:
+        print(f"🧹 Artifact store retention removed {removed} files")
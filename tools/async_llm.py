@@ -0,0 +1,120 @@
+import asyncio
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+from typing import Callable, Optional
+import openai
+from openai.types.chat import ChatCompletion
+from tools import llm_cache
+
+# Concurrent requests per run, and the retry policy for 429 / 5xx / network errors
+MAX_CONCURRENT_REQUESTS = 8
+MAX_ATTEMPTS = 5
+BASE_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+# Upper bound for a single API call
+REQUEST_TIMEOUT_SECONDS = 30
+
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.InternalServerError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    asyncio.TimeoutError,
+)
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Server-requested delay from Retry-After / retry-after-ms headers, if any."""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+class TimeBudget:
+    """
+    Seconds a caller may spend on requests in flight and on backoff, shared across calls
+    (e.g. one row's parse retries). Time spent queued for the semaphore is not counted.
+    """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.spent = 0.0
+
+    def remaining(self) -> float:
+        return self.seconds - self.spent
+
+
+def backoff_seconds(attempt: int, error: Optional[Exception] = None) -> float:
+    """Retry-After when the server sends one, else exponential backoff with full jitter."""
+    requested = retry_after_seconds(error) if error is not None else None
+    if requested is not None:
+        return min(requested, MAX_BACKOFF_SECONDS) + random.uniform(0, BASE_BACKOFF_SECONDS)
+    return random.uniform(0, min(MAX_BACKOFF_SECONDS, BASE_BACKOFF_SECONDS * 2 ** attempt))
+
+
+async def achat_completion(client: openai.AsyncOpenAI, semaphore: asyncio.Semaphore, bypass: bool = False,
+                           timeout: float = REQUEST_TIMEOUT_SECONDS, validate: Optional[Callable] = None,
+                           budget: Optional[TimeBudget] = None, **params) -> ChatCompletion:
+    """
+    Cached chat completion on an AsyncOpenAI client, holding `semaphore` while the
+    request is in flight and retrying transient failures. Raises the last error, or
+    asyncio.TimeoutError once `budget` is used up. Only answers passing
+    `llm_cache.is_valid(response, validate)` are cached.
+    """
+    # The cache is sqlite behind a lock: keep its I/O off the event loop
+    if not bypass:
+        cached = await asyncio.to_thread(llm_cache.lookup, params, validate=validate)
+        if cached is not None:
+            return cached
+
+    loop = asyncio.get_running_loop()
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            async with semaphore:
+                # The budget starts once a slot is held: queued requests don't time out
+                limit = timeout if budget is None else min(timeout, budget.remaining())
+                if limit <= 0:
+                    raise asyncio.TimeoutError("time budget used up")
+                started = loop.time()
+                try:
+                    response = await asyncio.wait_for(client.chat.completions.create(**params), limit)
+                finally:
+                    if budget is not None:
+                        budget.spent += loop.time() - started
+            await asyncio.to_thread(llm_cache.store, params, response, validate)
+            return response
+        except RETRYABLE_ERRORS as e:
+            delay = backoff_seconds(attempt, e)
+            if attempt == MAX_ATTEMPTS - 1 or (budget is not None and budget.remaining() <= delay):
+                raise
+            print(f"⏳ {type(e).__name__}; retrying in {delay:.1f}s (attempt {attempt + 2}/{MAX_ATTEMPTS})")
+            await asyncio.sleep(delay)  # outside the semaphore, so other rows keep going
+            if budget is not None:
+                budget.spent += delay
+
+
+def run_sync(coro):
+    """Run a coroutine from sync code, even if this thread already runs an event loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
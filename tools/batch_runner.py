@@ -0,0 +1,145 @@
+import hashlib
+import io
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from openai import OpenAI
+from openai.types.chat import ChatCompletion
+from tools import llm_cache
+
+# Request files and per-job resume state for Batch API jobs
+BATCH_DIR = Path("regulatory_outputs/batches")
+BATCH_DIR.mkdir(parents=True, exist_ok=True)
+
+POLL_SECONDS = 30
+MAX_WAIT_SECONDS = 24 * 3600
+TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Point at tools/batch_stub_server.py (e.g. http://127.0.0.1:8765/v1) to run batch jobs offline
+BATCH_API_BASE_URL = os.getenv("BATCH_API_BASE_URL")
+
+
+def _client() -> OpenAI:
+    if BATCH_API_BASE_URL:
+        return OpenAI(api_key=os.getenv("OPENAI_API_KEY") or "stub", base_url=BATCH_API_BASE_URL)
+    return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def _jsonl(requests: List[Dict]) -> bytes:
+    lines = [
+        json.dumps({"custom_id": r["custom_id"], "method": "POST", "url": "/v1/chat/completions", "body": r["params"]})
+        for r in requests
+    ]
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _load_state(path: Path) -> Dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save_state(path: Path, state: Dict):
+    path.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def run_batch(requests: List[Dict], job_name: str, bypass_cache: bool = False,
+              poll_seconds: Optional[float] = None, max_wait_seconds: float = MAX_WAIT_SECONDS,
+              client: Optional[OpenAI] = None) -> Dict[str, Optional[str]]:
+    """
+    Run chat completions through the Batch API. `requests` are {"custom_id", "params"} dicts,
+    where params are the usual chat.completions.create arguments. Returns custom_id -> answer
+    text (None for requests that failed), so callers can join results back by id.
+
+    Requests already in the LLM cache are not resubmitted. A job is identified by its
+    name and pending requests, so rerunning the same job after a crash resumes polling
+    the submitted batch instead of paying for it twice.
+    """
+    results: Dict[str, Optional[str]] = {}
+    pending = []
+    for request in requests:
+        cached = None if bypass_cache else llm_cache.lookup(request["params"])
+        if cached is not None:
+            results[request["custom_id"]] = cached.choices[0].message.content
+        else:
+            pending.append(request)
+    if not pending:
+        print(f"♻️ Batch {job_name}: all {len(requests)} requests answered from cache")
+        return results
+
+    payload = _jsonl(pending)
+    job_id = f"{job_name}_{hashlib.sha256(payload).hexdigest()[:12]}"
+    state_path = BATCH_DIR / f"{job_id}.json"
+    state = _load_state(state_path)
+    client = client or _client()
+
+    if state.get("batch_id"):
+        print(f"🔁 Resuming batch {state['batch_id']} for {job_id}")
+    else:
+        input_path = BATCH_DIR / f"{job_id}.jsonl"
+        input_path.write_bytes(payload)
+        uploaded = client.files.create(file=(input_path.name, io.BytesIO(payload)), purpose="batch")
+        batch = client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+            metadata={"job": job_name}
+        )
+        state = {
+            "batch_id": batch.id,
+            "input_file_id": uploaded.id,
+            "input_path": str(input_path),
+            "requests": len(pending),
+            "submitted_at": time.time(),
+            "status": batch.status,
+        }
+        _save_state(state_path, state)
+        print(f"📤 Submitted batch {batch.id} with {len(pending)} requests ({len(requests) - len(pending)} cached)")
+
+    # Poll until the batch finishes; the state file lets a crashed run pick up from here
+    deadline = state["submitted_at"] + max_wait_seconds
+    while True:
+        batch = client.batches.retrieve(state["batch_id"])
+        if batch.status != state.get("status"):
+            state["status"] = batch.status
+            _save_state(state_path, state)
+            print(f"⏳ Batch {batch.id}: {batch.status}")
+        if batch.status in TERMINAL_STATUSES or time.time() > deadline:
+            break
+        time.sleep(poll_seconds or POLL_SECONDS)
+
+    if batch.status != "completed":
+        # Forget the job so the next run submits a fresh one
+        print(f"⚠️ Batch {batch.id} ended as {batch.status}; {len(pending)} requests unanswered")
+        state_path.unlink(missing_ok=True)
+        Path(state["input_path"]).unlink(missing_ok=True)
+        results.update({r["custom_id"]: None for r in pending})
+        return results
+
+    params_by_id = {r["custom_id"]: r["params"] for r in pending}
+    failed = 0
+    output = client.files.content(batch.output_file_id).text if batch.output_file_id else ""
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        custom_id = record.get("custom_id")
+        response = record.get("response") or {}
+        if custom_id not in params_by_id or record.get("error") or response.get("status_code") != 200:
+            continue
+        completion = ChatCompletion.model_validate(response["body"])
+        llm_cache.store(params_by_id[custom_id], completion)
+        results[custom_id] = completion.choices[0].message.content
+    for custom_id in params_by_id:
+        if custom_id not in results:
+            results[custom_id] = None
+            failed += 1
+
+    # Answers now live in the LLM cache; the job files are no longer needed
+    state_path.unlink(missing_ok=True)
+    Path(state["input_path"]).unlink(missing_ok=True)
+    print(f"✅ Batch {batch.id} joined: {len(pending) - failed} answered, {failed} failed")
+    return results
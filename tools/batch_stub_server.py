@@ -0,0 +1,153 @@
+# batch_stub_server.py
+#
+# Local stand-in for the OpenAI Files and Batches endpoints used by
+# tools/batch_runner.py, so batch mode can be exercised offline:
+#
+#   python tools/batch_stub_server.py 8765
+#   set BATCH_API_BASE_URL=http://127.0.0.1:8765/v1   (export on Linux/macOS)
+#
+# Batches complete after COMPLETE_AFTER_SECONDS with canned answers: exclusion
+# prompts get an Include/Exclude JSON verdict, anything else a short summary.
+
+import email
+import json
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+COMPLETE_AFTER_SECONDS = 2
+RELEVANT_WORDS = ("capital", "liquidity", "risk", "bank", "rule", "guidance", "supervis", "complian")
+
+_files = {}
+_batches = {}
+_lock = threading.Lock()
+
+
+def _new_id(prefix: str) -> str:
+    return f"{prefix}-{uuid.uuid4().hex[:16]}"
+
+
+def fake_completion(body: dict) -> dict:
+    prompt = body["messages"][-1]["content"]
+    if '"recommendation"' in prompt:
+        relevant = any(word in prompt.lower() for word in RELEVANT_WORDS)
+        content = json.dumps({
+            "recommendation": "Include" if relevant else "Exclude",
+            "reason": "Stub verdict based on keywords."
+        })
+    else:
+        content = "Stub summary: " + " ".join(prompt.split())[-200:]
+    return {
+        "id": _new_id("chatcmpl"),
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "gpt-4o-mini"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4,
+                  "total_tokens": (len(prompt) + len(content)) // 4},
+    }
+
+
+def _file_object(file_id: str) -> dict:
+    f = _files[file_id]
+    return {"id": file_id, "object": "file", "bytes": len(f["content"]), "created_at": f["created_at"],
+            "filename": f["filename"], "purpose": f["purpose"], "status": "processed"}
+
+
+def _process(batch_id: str):
+    time.sleep(COMPLETE_AFTER_SECONDS)
+    with _lock:
+        batch = _batches[batch_id]
+        batch["status"] = "in_progress"
+        lines = _files[batch["input_file_id"]]["content"].decode("utf-8").splitlines()
+    output = []
+    for line in lines:
+        if line.strip():
+            request = json.loads(line)
+            output.append(json.dumps({
+                "id": _new_id("batch_req"),
+                "custom_id": request["custom_id"],
+                "response": {"status_code": 200, "request_id": _new_id("req"), "body": fake_completion(request["body"])},
+                "error": None,
+            }))
+    with _lock:
+        output_id = _new_id("file")
+        _files[output_id] = {"content": ("\n".join(output) + "\n").encode("utf-8"), "filename": f"{batch_id}_output.jsonl",
+                             "purpose": "batch_output", "created_at": int(time.time())}
+        batch.update(status="completed", output_file_id=output_id, completed_at=int(time.time()),
+                     request_counts={"total": len(output), "completed": len(output), "failed": 0})
+
+
+class BatchStubHandler(BaseHTTPRequestHandler):
+    def _send(self, payload, status: int = 200, raw: bool = False):
+        body = payload if raw else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/octet-stream" if raw else "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/v1/files":
+            # Multipart upload: parse it as a MIME message
+            message = email.message_from_bytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode("utf-8") + body
+            )
+            fields, content, filename = {}, b"", "input.jsonl"
+            for part in message.get_payload():
+                if part.get_filename():
+                    content, filename = part.get_payload(decode=True), part.get_filename()
+                else:
+                    fields[part.get_param("name", header="content-disposition")] = part.get_payload()
+            file_id = _new_id("file")
+            with _lock:
+                _files[file_id] = {"content": content, "filename": filename,
+                                   "purpose": fields.get("purpose", "batch"), "created_at": int(time.time())}
+                return self._send(_file_object(file_id))
+        if self.path == "/v1/batches":
+            request = json.loads(body)
+            batch_id = _new_id("batch")
+            with _lock:
+                _batches[batch_id] = {
+                    "id": batch_id, "object": "batch", "endpoint": request["endpoint"],
+                    "input_file_id": request["input_file_id"], "completion_window": request["completion_window"],
+                    "status": "validating", "created_at": int(time.time()), "metadata": request.get("metadata"),
+                    "request_counts": {"total": 0, "completed": 0, "failed": 0},
+                }
+                payload = dict(_batches[batch_id])
+            threading.Thread(target=_process, args=(batch_id,), daemon=True).start()
+            return self._send(payload)
+        self._send({"error": {"message": f"Unknown endpoint {self.path}"}}, status=404)
+
+    def do_GET(self):
+        parts = self.path.strip("/").split("/")
+        with _lock:
+            if parts[:2] == ["v1", "batches"] and len(parts) == 3 and parts[2] in _batches:
+                return self._send(_batches[parts[2]])
+            if parts[:2] == ["v1", "files"] and len(parts) == 4 and parts[3] == "content" and parts[2] in _files:
+                return self._send(_files[parts[2]]["content"], raw=True)
+            if parts[:2] == ["v1", "files"] and len(parts) == 3 and parts[2] in _files:
+                return self._send(_file_object(parts[2]))
+        self._send({"error": {"message": f"Not found: {self.path}"}}, status=404)
+
+    def log_message(self, format, *args):
+        pass  # keep the console for the pipeline's own output
+
+
+def serve(port: int = 8765) -> ThreadingHTTPServer:
+    """
+    Start the stub in a background thread and return the server (call .shutdown() to stop).
+    Port 0 picks a free port; read it back from server.server_address[1].
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), BatchStubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    print(f"🧪 Batch stub listening on http://127.0.0.1:{port}/v1")
+    ThreadingHTTPServer(("127.0.0.1", port), BatchStubHandler).serve_forever()
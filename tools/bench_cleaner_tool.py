@@ -0,0 +1,65 @@
+# bench_cleaner_tool.py
+#
+# Compares the BeautifulSoup and lxml cleaning engines on synthetic regulator
+# listing pages of increasing size, and checks both keep the same visible text.
+
+import sys
+import os
+import time
+
+# Ensure parent folder is on path so tools can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from lxml import html as lxml_html
+from tools.cleaner_tool import clean_html_bs4, clean_html_lxml
+
+
+def synthetic_listing_page(items: int, depth: int = 8) -> str:
+    """A press-release index: chrome, scripts, deep wrappers and many empty nodes."""
+    open_wrappers = "".join(f'<div class="wrap-{d}"><span class="icon"></span>' for d in range(depth))
+    close_wrappers = "</div>" * depth
+    rows = []
+    for i in range(items):
+        rows.append(
+            f'<li class="item">{open_wrappers}'
+            f'<span class="date">{1 + i % 28} June 2025</span>'
+            f'<a href="/press/p{i}.htm">Press release {i}: Basel Committee publishes update (consultation)</a>'
+            f'<p class="teaser">Summary of release {i}.<img src="/i{i}.png"><i></i></p>'
+            f'{close_wrappers}</li>'
+        )
+    return (
+        "<!DOCTYPE html><html><head><title>Press releases</title>"
+        "<style>.x{color:red}</style><script>var tracking = 1;</script></head><body>"
+        "<header><nav><a href='/'>Home</a><a href='/about'>About</a></nav></header>"
+        f"<main><h1>Press releases</h1><ul class='list'>{''.join(rows)}</ul></main>"
+        "<aside>Related links</aside><footer>Copyright</footer>"
+        "<script>window.analytics = {};</script></body></html>"
+    )
+
+
+def visible_text(cleaned_html: str) -> str:
+    # prettify() adds whitespace between nodes, so compare the stripped text nodes
+    root = lxml_html.document_fromstring(cleaned_html)
+    return " ".join(t.strip() for t in root.itertext() if t.strip())
+
+
+def time_engine(engine, page: str, repeat: int = 3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = engine(page)
+        best = min(best, time.perf_counter() - start)
+    return best, output
+
+
+if __name__ == "__main__":
+    print(f"{'items':>6} {'page KB':>8} {'bs4 s':>8} {'lxml s':>8} {'speedup':>8} {'bs4 KB':>8} {'lxml KB':>8}  same text")
+    for items in (100, 500, 2000):
+        page = synthetic_listing_page(items)
+        bs4_time, bs4_out = time_engine(clean_html_bs4, page, repeat=1 if items > 500 else 3)
+        lxml_time, lxml_out = time_engine(clean_html_lxml, page)
+        same = visible_text(bs4_out) == visible_text(lxml_out)
+        print(
+            f"{items:>6} {len(page) // 1024:>8} {bs4_time:>8.3f} {lxml_time:>8.3f} "
+            f"{bs4_time / lxml_time:>7.1f}x {len(bs4_out) // 1024:>8} {len(lxml_out) // 1024:>8}  {same}"
+        )
@@ -0,0 +1,73 @@
+# bench_link_index.py
+#
+# Compares difflib fuzzy matching (topic vs. raw URLs, the old fallback) with the
+# anchor-text LinkIndex on synthetic pages with thousands of links. Topics are
+# reworded the way the LLM tends to shorten or rephrase titles.
+
+import sys
+import os
+import random
+import time
+from difflib import get_close_matches
+
+# Ensure parent folder is on path so tools can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.link_index import LinkIndex
+
+SUBJECTS = ["Basel Committee", "FSB", "Federal Reserve Board", "OCC", "FDIC", "EBA", "IOSCO", "CPMI"]
+ACTIONS = ["publishes", "consults on", "finalises", "issues guidance on", "reports on", "announces"]
+TOPICS = [
+    "liquidity risk", "climate-related financial risks", "crypto-asset exposures", "operational resilience",
+    "interest rate risk in the banking book", "third-party risk management", "capital buffers",
+    "stablecoin arrangements", "cyber incident reporting", "leverage ratio", "margin requirements",
+]
+
+
+def synthetic_anchors(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    anchors = []
+    for i in range(count):
+        title = f"{rng.choice(SUBJECTS)} {rng.choice(ACTIONS)} {rng.choice(TOPICS)} - statement {i} ({2015 + i % 10})"
+        href = f"https://www.example.org/press/p{i:05d}.htm"
+        anchors.append({"text": title, "href": href, "block_text": f"{title} Press release {i}"})
+        # Listing pages repeat each item with a generic "Read more" link
+        anchors.append({"text": "Read more", "href": href, "block_text": f"{title} Read more"})
+    return anchors
+
+
+def reworded(title: str, rng: random.Random) -> str:
+    words = title.replace("(", "").replace(")", "").split()
+    if rng.random() < 0.5:
+        words = [w for w in words if w not in ("on", "the", "in")]
+    if rng.random() < 0.3:
+        words = words[:-1]  # the LLM often drops the year
+    return " ".join(words).lower()
+
+
+if __name__ == "__main__":
+    rng = random.Random(1)
+    print(f"{'links':>6} {'difflib s':>10} {'index s':>8} {'build s':>8} {'difflib ok':>11} {'index ok':>9}")
+    for count in (500, 2000, 5000):
+        anchors = synthetic_anchors(count)
+        titles = [a for a in anchors if a["text"] != "Read more"]
+        sample = rng.sample(titles, 100)
+        queries = [(reworded(a["text"], rng), a["href"]) for a in sample]
+        links = list(dict.fromkeys(a["href"] for a in anchors))
+
+        start = time.perf_counter()
+        difflib_hits = 0
+        for query, expected in queries:
+            match = get_close_matches(query, links, n=1, cutoff=0.3)
+            difflib_hits += bool(match) and match[0] == expected
+        difflib_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index = LinkIndex.from_link_records(anchors)
+        build_time = time.perf_counter() - start
+        start = time.perf_counter()
+        index_hits = sum(index.resolve(query) == expected for query, expected in queries)
+        index_time = time.perf_counter() - start
+
+        print(f"{count:>6} {difflib_time:>10.3f} {index_time:>8.3f} {build_time:>8.3f} "
+              f"{difflib_hits:>10}% {index_hits:>8}%")
@@ -0,0 +1,72 @@
+# bench_streaming_extractor.py
+#
+# Peak-memory comparison of tree-based vs streaming extraction on a synthetic
+# ~50 MB regulator archive page. Each mode runs in its own subprocess so the
+# reported peak RSS is not polluted by the other.
+
+import sys
+import os
+import subprocess
+import time
+
+# Ensure parent folder is on path so tools can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+TARGET_MB = 50
+
+
+def synthetic_archive_chunks(target_mb: int = TARGET_MB):
+    """Yield a huge press-release archive page chunk by chunk, never holding it whole."""
+    yield (
+        "<!DOCTYPE html><html><head><title>Archive</title><script>var a = 1;</script></head><body>"
+        "<header><nav><a href='/'>Home</a></nav></header><main><ul>"
+    )
+    produced, i = 0, 0
+    while produced < target_mb * 1024 * 1024:
+        rows = "".join(
+            f'<li><div class="row"><span class="date">{1 + n % 28} March 2019</span>'
+            f'<a href="/archive/r{n}.htm">Release {n}: supervisory statement on liquidity (update)</a>'
+            f'<p>Context for release {n}.<script>track({n});</script></p><span></span></div></li>'
+            for n in range(i, i + 500)
+        )
+        i += 500
+        produced += len(rows)
+        yield rows
+    yield "</ul></main><footer>Footer</footer></body></html>"
+
+
+def peak_rss_mb() -> float:
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024)
+
+
+def run_mode(mode: str):
+    from tools.streaming_extractor import iter_segments, iter_extracted_text
+    from tools.cleaner_tool import parse_html, clean_tree
+    from tools.html_extractor_tool import extract_from_tree
+
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+    if mode == "streaming":
+        chars, link_list = 0, []
+        segments = iter_segments(synthetic_archive_chunks(), "https://www.example.gov/")
+        for piece in iter_extracted_text(segments, link_list):
+            chars += len(piece)
+        links = len(set(link_list))
+    else:
+        page = "".join(synthetic_archive_chunks())
+        text, link_list, _ = extract_from_tree(clean_tree(parse_html(page)), "https://www.example.gov/")
+        chars, links = len(text), len(link_list)
+    elapsed = time.perf_counter() - start
+    print(f"{mode:>10} {elapsed:>8.1f} {peak_rss_mb() - baseline:>14.0f} {links:>8} {chars:>12}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        run_mode(sys.argv[1])
+    else:
+        print(f"Synthetic page: ~{TARGET_MB} MB")
+        print(f"{'mode':>10} {'time s':>8} {'peak RSS +MB':>14} {'links':>8} {'text chars':>12}")
+        for mode in ("tree", "streaming"):
+            subprocess.run([sys.executable, __file__, mode], check=True)
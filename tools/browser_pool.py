@@ -0,0 +1,176 @@
+import asyncio
+import atexit
+import sys
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from playwright.async_api import async_playwright
+
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+# Pool settings
+MAX_CONTEXTS = 4             # concurrent browser contexts (one page each)
+MAX_PAGES_PER_CONTEXT = 50   # recycle a context after this many navigations
+
+
+class _Slot:
+    """A reusable browser context with a single page."""
+
+    def __init__(self, context, page):
+        self.context = context
+        self.page = page
+        self.uses = 0
+
+    def is_healthy(self) -> bool:
+        return not self.page.is_closed()
+
+    async def close(self):
+        try:
+            await self.context.close()
+        except Exception:
+            pass
+
+
+class BrowserPool:
+    """
+    Process-wide pool of headless Chromium pages.
+
+    Playwright objects are bound to the event loop that created them, so the pool
+    owns a background event loop thread. Synchronous callers use `run()`, async
+    callers use `arun()`; both execute the coroutine on the pool's loop.
+    """
+
+    def __init__(self, max_contexts: int = MAX_CONTEXTS, max_pages_per_context: int = MAX_PAGES_PER_CONTEXT, headless: bool = True):
+        self.max_contexts = max_contexts
+        self.max_pages_per_context = max_pages_per_context
+        self.headless = headless
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._idle: List[_Slot] = []
+
+    # --- Event loop thread ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._thread_lock:
+            if self._loop is None or not self._thread.is_alive():
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="browser-pool", daemon=True)
+                self._thread.start()
+            return self._loop
+
+    def run(self, coro):
+        """Run a coroutine on the pool loop and block until it finishes."""
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+    async def arun(self, coro):
+        """Await a coroutine scheduled on the pool loop from any other event loop."""
+        loop = self._ensure_loop()
+        try:
+            if asyncio.get_running_loop() is loop:
+                return await coro
+        except RuntimeError:
+            pass
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+    # --- Browser lifecycle (pool loop only) ---
+    async def _ensure_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+            self._slots = asyncio.Semaphore(self.max_contexts)
+
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            # Browser crashed or was never started: drop stale slots and relaunch
+            if self._browser is not None:
+                print("⚠️ Browser disconnected, relaunching Chromium...")
+                self._idle.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless)
+            print("🚀 Launched shared Chromium browser")
+            return self._browser
+
+    async def _acquire_slot(self) -> _Slot:
+        browser = await self._ensure_browser()
+        while self._idle:
+            slot = self._idle.pop()
+            if slot.is_healthy():
+                return slot
+            await slot.close()
+        context = await browser.new_context()
+        page = await context.new_page()
+        return _Slot(context, page)
+
+    async def _release_slot(self, slot: _Slot, failed: bool):
+        slot.uses += 1
+        if failed or slot.uses >= self.max_pages_per_context or not slot.is_healthy():
+            await slot.close()
+        else:
+            self._idle.append(slot)
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a page from the pool. Must be used on the pool loop (see `run`/`arun`)."""
+        await self._ensure_browser()
+        async with self._slots:
+            slot = await self._acquire_slot()
+            failed = False
+            try:
+                yield slot.page
+            except BaseException:
+                failed = True
+                raise
+            finally:
+                await self._release_slot(slot, failed)
+
+    async def _close(self):
+        for slot in self._idle:
+            await slot.close()
+        self._idle.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self):
+        """Close all contexts, the browser and the pool loop thread."""
+        with self._thread_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+        if loop is None or not thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result(timeout=30)
+        except Exception as e:
+            print(f"⚠️ Browser pool shutdown error: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+_browser_pool: Optional[BrowserPool] = None
+_browser_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Return the shared process-wide browser pool, creating it on first use."""
+    global _browser_pool
+    with _browser_pool_lock:
+        if _browser_pool is None:
+            _browser_pool = BrowserPool()
+            atexit.register(_browser_pool.shutdown)
+        return _browser_pool
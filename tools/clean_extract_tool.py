@@ -0,0 +1,94 @@
+from pydantic import BaseModel, Field
+from crewai.tools import BaseTool
+from typing import Dict, Optional
+from tools import artifact_store
+from tools.cleaner_tool import parse_html, clean_tree
+from tools.html_extractor_tool import LinkRecord, extract_from_tree
+from tools import extraction_snapshot, template_cache
+from tools.streaming_extractor import iter_segments, iter_string_chunks, iter_extracted_text
+from lxml import html as lxml_html
+
+
+class CleanExtractInput(BaseModel):
+    url: str = Field(..., description="The original URL of the page")
+    scraped_html: Optional[str] = Field(None, description="The raw HTML content to clean and extract from")
+    scraped_file: Optional[str] = Field(None, description="Path to the scraped HTML, streamed instead of loaded")
+    save_files: bool = Field(False, description="Also store the cleaned HTML and extracted text, for debugging")
+    streaming: Optional[bool] = Field(None, description="Force streaming mode on/off (default: stream only when given scraped_file alone)")
+    use_template: bool = Field(False, description="Apply the domain's learned listing template (phase 1 listing pages only)")
+
+
+class CleanExtractTool(BaseTool):
+    name: str = "clean_extract_tool"
+    description: str = "Cleans raw HTML and extracts visible text and links in one pass, in memory"
+    args_schema: type = CleanExtractInput
+
+    def _run(self, url: str, scraped_html: Optional[str] = None, scraped_file: Optional[str] = None,
+             save_files: bool = False, streaming: Optional[bool] = None, use_template: bool = False) -> Dict:
+        if scraped_html is None and scraped_file is None:
+            raise ValueError("❌ Provide scraped_html or scraped_file")
+        # HTML already in memory is extracted in memory, so callers get extracted_text back;
+        # streaming (text only in extracted_file) is for pages the caller left on disk
+        if streaming is None:
+            streaming = scraped_html is None
+        if streaming:
+            return self._run_streaming(url, scraped_html, scraped_file)
+
+        # Parse once and hand the cleaned tree straight to extraction
+        root = clean_tree(parse_html(scraped_html))
+        visible_text, links, records = extract_from_tree(root, url)
+        template_mode = "fused" if use_template else None
+        listing = template_cache.find_listing(root, url, template_mode)
+
+        cleaned_file = extracted_file = None
+        if save_files:
+            cleaned_file = artifact_store.put(url, "cleaned", lxml_html.tostring(root, encoding="unicode"), suffix=".html")
+            extracted_file = artifact_store.put(url, "extracted", visible_text, suffix=".txt")
+            print(f"✅ Saved cleaned HTML to: {cleaned_file} and extracted text to: {extracted_file}")
+
+        print(f"✅ Cleaned and extracted {len(visible_text)} chars, {len(links)} links from: {url}")
+
+        return {
+            "url": url,
+            "extracted_text": visible_text,
+            "extracted_links": links,
+            "link_records": [r.model_dump() for r in records],
+            "listing_items": listing["items"],
+            "listing_confidence": listing["confidence"],
+            "content_fingerprint": extraction_snapshot.fingerprint(visible_text),
+            "template_mode": template_mode,
+            "cleaned_file": cleaned_file,
+            "extracted_file": extracted_file
+        }
+
+    def _run_streaming(self, url: str, scraped_html: Optional[str], scraped_file: Optional[str]) -> Dict:
+        # No DOM and no HTML string: boilerplate is dropped while tokenizing and text goes straight to disk.
+        # Consumers read the (much smaller) visible text from extracted_file.
+        chunks = iter_string_chunks(scraped_html) if scraped_html is not None else artifact_store.iter_text(scraped_file)
+        links = []
+        anchors = []
+        content_fingerprint = extraction_snapshot.ContentFingerprint()
+        extracted_file = artifact_store.put_stream(
+            url, "extracted",
+            content_fingerprint.wrap(iter_extracted_text(iter_segments(chunks, url), links, anchors)),
+            suffix=".txt"
+        )
+        links = list(dict.fromkeys(links))
+        records = [LinkRecord(text=text, href=href, position=i) for i, (text, href) in enumerate(anchors)]
+
+        print(f"✅ Stream-extracted {len(links)} links from: {url} to: {extracted_file}")
+
+        return {
+            "url": url,
+            "extracted_text": None,
+            "extracted_links": links,
+            "link_records": [r.model_dump() for r in records],
+            "listing_items": [],
+            "listing_confidence": 0.0,
+            "content_fingerprint": content_fingerprint.hexdigest(),
+            "template_mode": None,
+            "cleaned_file": None,
+            "extracted_file": extracted_file
+        }
+
+clean_extract_tool = CleanExtractTool()
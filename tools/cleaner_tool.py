@@ -1,17 +1,91 @@
+import threading
 from bs4 import BeautifulSoup
-from pathlib import Path
-from urllib.parse import urlparse
+from lxml import etree, html as lxml_html
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
 from typing import Dict
-
-# Output folder
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from tools import artifact_store
 
 # Tags to remove from HTML
 TAGS_TO_REMOVE = ["script", "style", "noscript", "footer", "header", "nav", "aside"]
 
+# Empty tags that are kept (unless their parent is removed)
+KEEP_EMPTY_TAGS = {"br", "hr"}
+
+
+def clean_html_bs4(raw_html: str) -> str:
+    """Original BeautifulSoup cleaner, kept for comparison and as a fallback engine."""
+    soup = BeautifulSoup(raw_html, "html.parser")
+    for tag in TAGS_TO_REMOVE:
+        for element in soup.find_all(tag):
+            element.decompose()
+    for tag in soup.find_all():
+        if not tag.get_text(strip=True) and tag.name not in KEEP_EMPTY_TAGS:
+            tag.decompose()
+    return soup.prettify()
+
+
+# lxml parsers must not be shared between threads
+_parsers = threading.local()
+
+
+def _html_parser():
+    if not hasattr(_parsers, "parser"):
+        # libxml2 silently truncates documents nested deeper than 256 levels unless huge_tree is set
+        _parsers.parser = lxml_html.HTMLParser(huge_tree=True)
+    return _parsers.parser
+
+
+def parse_html(raw_html: str):
+    """Parse an HTML document with lxml, tolerating empty input and encoding declarations."""
+    if not raw_html.strip():
+        return lxml_html.document_fromstring("<html><body></body></html>", parser=_html_parser())
+    try:
+        return lxml_html.document_fromstring(raw_html, parser=_html_parser())
+    except ValueError:
+        # Unicode strings with an <?xml encoding=...?> declaration must be parsed as bytes
+        return lxml_html.document_fromstring(raw_html.encode("utf-8"), parser=_html_parser())
+
+
+def _drop(element):
+    """Remove an element but keep its tail text, which belongs to the parent."""
+    parent = element.getparent()
+    if element.tail:
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or "") + element.tail
+        else:
+            parent.text = (parent.text or "") + element.tail
+    parent.remove(element)
+
+
+def clean_tree(root):
+    """
+    Remove boilerplate subtrees and prune elements without visible text, in place.
+    Elements are visited children-first, so each one is decided from its own text,
+    its children's tails and whether any child had text: linear in document size.
+    """
+    etree.strip_elements(root, *TAGS_TO_REMOVE, with_tail=False)
+
+    has_text = set()
+    for element in reversed(list(root.iter())):
+        parent = element.getparent()
+        if parent is not None and element.tail and element.tail.strip():
+            has_text.add(parent)
+        if not isinstance(element.tag, str):
+            continue  # comments and processing instructions carry no visible text
+        if element in has_text or (element.text and element.text.strip()):
+            if parent is not None:
+                has_text.add(parent)
+        elif parent is not None and element.tag not in KEEP_EMPTY_TAGS:
+            _drop(element)
+    return root
+
+
+def clean_html_lxml(raw_html: str) -> str:
+    return lxml_html.tostring(clean_tree(parse_html(raw_html)), encoding="unicode")
+
+
 class CleanerInput(BaseModel):
     url: str = Field(..., description="The original URL of the page")
     scraped_html: str = Field(..., description="The raw HTML content to be cleaned")
@@ -20,31 +94,22 @@ class CleanerTool(BaseTool):
     name: str = "cleaner_tool"
     description: str = "Cleans raw HTML by removing unnecessary tags and outputs cleaned HTML and saved file path"
     args_schema: type = CleanerInput
+    engine: str = "lxml"  # "lxml" (compact, linear time) or "bs4" (original prettified output)
 
     def _run(self, url: str, scraped_html: str) -> Dict:
-        def clean_html_content(raw_html: str) -> str:
-            soup = BeautifulSoup(raw_html, "html.parser")
-            for tag in TAGS_TO_REMOVE:
-                for element in soup.find_all(tag):
-                    element.decompose()
-            for tag in soup.find_all():
-                if not tag.get_text(strip=True) and tag.name not in ["br", "hr"]:
-                    tag.decompose()
-            return soup.prettify()
-
-        cleaned_html = clean_html_content(scraped_html)
-
-        domain = urlparse(url).netloc.replace('.', '_')
-        output_path = OUTPUT_DIR / f"{domain}_cleaned.html"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(cleaned_html)
+        if self.engine == "bs4":
+            cleaned_html = clean_html_bs4(scraped_html)
+        else:
+            cleaned_html = clean_html_lxml(scraped_html)
+
+        output_path = artifact_store.put(url, "cleaned", cleaned_html, suffix=".html")
 
         print(f"✅ Cleaned HTML saved to: {output_path}")
 
         return {
             "url": url,
             "cleaned_html": cleaned_html,
-            "cleaned_file": str(output_path)
+            "cleaned_file": output_path
         }
 
 cleaner_tool = CleanerTool()
@@ -0,0 +1,144 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlparse, urlunparse
+import pandas as pd
+
+# Exclusion decisions per update (normalized link + topic hash), so reruns only review new items
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+DECISIONS_DB = CACHE_DIR / "exclusion_decisions.sqlite"
+
+# Query parameters that vary between visits without changing the page
+TRACKING_PARAMS = {"gclid", "fbclid", "mc_cid", "mc_eid", "_ga"}
+# Recommendations that are worth remembering; errored rows are reviewed again next run
+FINAL_RECOMMENDATIONS = {"Include", "Exclude"}
+NO_ACTIONS = {"", "nan", "none", "no action", "skip", "custom:<your prompt>"}
+
+_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(DECISIONS_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS decisions (
+            key TEXT PRIMARY KEY,
+            link TEXT NOT NULL,
+            topic_hash TEXT NOT NULL,
+            topic TEXT NOT NULL,
+            regulator TEXT NOT NULL,
+            recommendation TEXT NOT NULL,
+            reason TEXT NOT NULL,
+            action TEXT,
+            action_at REAL,
+            first_seen REAL NOT NULL,
+            last_seen REAL NOT NULL,
+            times_seen INTEGER NOT NULL DEFAULT 1
+        )
+    """)
+    return conn
+
+
+@contextmanager
+def _db():
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def normalize_link(link) -> str:
+    """Lower-case host without www., no fragment, tracking parameters or trailing slash, sorted query."""
+    link = str(link).strip() if pd.notnull(link) else ""
+    if not link.lower().startswith(("http://", "https://")):
+        return link
+    parts = urlparse(link)
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = sorted(
+        (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not name.lower().startswith("utm_") and name.lower() not in TRACKING_PARAMS
+    )
+    return urlunparse(("https", host, parts.path.rstrip("/") or "/", "", urlencode(query), ""))
+
+
+def topic_hash(topic) -> str:
+    topic = str(topic) if pd.notnull(topic) else ""
+    return hashlib.sha256(" ".join(topic.casefold().split()).encode("utf-8")).hexdigest()[:16]
+
+
+def decision_key(link, topic) -> str:
+    return f"{normalize_link(link)}#{topic_hash(topic)}"
+
+
+def lookup(keys: Iterable[str]) -> Dict[str, Dict]:
+    """Stored decisions for the given keys (unknown keys are left out)."""
+    keys = list(dict.fromkeys(keys))
+    found = {}
+    with _db() as conn:
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = conn.execute(
+                f"SELECT key, recommendation, reason, action, first_seen, times_seen FROM decisions "
+                f"WHERE key IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            for key, recommendation, reason, action, first_seen, times_seen in rows:
+                found[key] = {"recommendation": recommendation, "reason": reason, "action": action,
+                              "first_seen": first_seen, "times_seen": times_seen}
+    return found
+
+
+def record(decisions: List[Dict]):
+    """
+    Store {"link", "topic", "regulator", "recommendation", "reason"} decisions. A decision
+    already on file is refreshed (last_seen, times_seen) but its analyst action is kept.
+    """
+    now = time.time()
+    with _db() as conn:
+        for d in decisions:
+            if d.get("recommendation") not in FINAL_RECOMMENDATIONS:
+                continue
+            conn.execute(
+                "INSERT INTO decisions (key, link, topic_hash, topic, regulator, recommendation, reason, first_seen, last_seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET recommendation = excluded.recommendation, reason = excluded.reason, "
+                "last_seen = excluded.last_seen, times_seen = times_seen + 1",
+                (decision_key(d.get("link"), d.get("topic")), normalize_link(d.get("link")), topic_hash(d.get("topic")),
+                 str(d.get("topic", "")), str(d.get("regulator", "")), d["recommendation"], str(d.get("reason", "")), now, now)
+            )
+
+
+def record_actions(df: pd.DataFrame, link_column: str = "Link") -> int:
+    """Remember the analyst's action for each reviewed row of a phase 1 workbook; returns rows updated."""
+    if "action" not in df.columns or link_column not in df.columns or "topic" not in df.columns:
+        return 0
+    now = time.time()
+    updated = 0
+    with _db() as conn:
+        for _, row in df.iterrows():
+            action = str(row.get("action", "")).strip()
+            if action.lower() in NO_ACTIONS:
+                continue
+            cursor = conn.execute(
+                "UPDATE decisions SET action = ?, action_at = ? WHERE key = ?",
+                (action, now, decision_key(row.get(link_column), row.get("topic")))
+            )
+            updated += cursor.rowcount
+    return updated
+
+
+def previous_status(decision: Optional[Dict]) -> str:
+    """Value for the workbook's Status column."""
+    if decision is None:
+        return "new"
+    if decision.get("action"):
+        return f"previously reviewed ({decision['action']})"
+    return "previously reviewed"
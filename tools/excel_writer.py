@@ -0,0 +1,171 @@
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import pandas as pd
+
+# xlsxwriter streams rows to disk (constant_memory); openpyxl's write-only mode is the fallback
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.worksheet.datavalidation import DataValidation
+from openpyxl.utils import get_column_letter
+
+LINK_TEXT = "Open Link"
+# Excel allows at most this many hyperlinks per sheet; further links are written as plain URLs
+MAX_HYPERLINKS = 65530
+SIDECAR_FORMATS = ("csv", "parquet")
+
+_HYPERLINK_FORMULA = re.compile(r'HYPERLINK\("([^"]+)"', re.IGNORECASE)
+
+
+def _is_url(value) -> bool:
+    return isinstance(value, str) and value.startswith(("http://", "https://"))
+
+
+def _cell_value(value):
+    if value is None or (not isinstance(value, (list, dict)) and pd.isna(value)):
+        return None
+    if hasattr(value, "item"):  # numpy scalars
+        return value.item()
+    return value
+
+
+def _write_xlsxwriter(df: pd.DataFrame, path: Path, sheet_name: str, link_column: Optional[str],
+                      dropdowns: Dict[str, List[str]]):
+    workbook = xlsxwriter.Workbook(str(path), {
+        "constant_memory": True,
+        # Scraped topics are data: never turn them into formulas or auto-links
+        "strings_to_formulas": False,
+        "strings_to_urls": False,
+        "nan_inf_to_errors": True,
+    })
+    sheet = workbook.add_worksheet(sheet_name)
+    header = workbook.add_format({"bold": True})
+    link_format = workbook.get_default_url_format()
+    columns = list(df.columns)
+    link_idx = columns.index(link_column) if link_column in columns else None
+
+    for col, name in enumerate(columns):
+        sheet.write_string(0, col, str(name), header)
+    links = 0
+    for row, values in enumerate(df.itertuples(index=False, name=None), start=1):
+        for col, value in enumerate(values):
+            value = _cell_value(value)
+            if col == link_idx and _is_url(value) and links < MAX_HYPERLINKS:
+                sheet.write_url(row, col, value, link_format, string=LINK_TEXT)
+                links += 1
+            elif value is not None:
+                sheet.write(row, col, value)
+
+    for column, options in dropdowns.items():
+        if column in columns and len(df):
+            col = columns.index(column)
+            sheet.data_validation(1, col, len(df), col, {
+                "validate": "list",
+                "source": options,
+                "ignore_blank": True,
+                "error_title": "Invalid Action",
+                "error_message": f"Invalid input. Choose from {', '.join(options)}.",
+            })
+    workbook.close()
+
+
+def _write_openpyxl(df: pd.DataFrame, path: Path, sheet_name: str, link_column: Optional[str],
+                    dropdowns: Dict[str, List[str]]):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    columns = list(df.columns)
+    link_idx = columns.index(link_column) if link_column in columns else None
+
+    # Write-only sheets take their validations before any row is written
+    for column, options in dropdowns.items():
+        if column in columns and len(df):
+            letter = get_column_letter(columns.index(column) + 1)
+            dv = DataValidation(
+                type="list",
+                formula1=f'"{",".join(options)}"',
+                allow_blank=True,
+                showDropDown=False  # must be False to show the dropdown arrow
+            )
+            dv.error = f"Invalid input. Choose from {', '.join(options)}."
+            dv.errorTitle = "Invalid Action"
+            dv.add(f"{letter}2:{letter}{len(df) + 1}")
+            sheet.data_validations.append(dv)
+
+    sheet.append([str(name) for name in columns])
+    links = 0
+    for values in df.itertuples(index=False, name=None):
+        row = []
+        for col, value in enumerate(values):
+            value = _cell_value(value)
+            if col == link_idx and _is_url(value) and links < MAX_HYPERLINKS:
+                cell = WriteOnlyCell(sheet, value=LINK_TEXT)
+                cell.hyperlink = value
+                cell.style = "Hyperlink"
+                row.append(cell)
+                links += 1
+            elif isinstance(value, str) and value.startswith("="):
+                # Keep scraped text that looks like a formula as text
+                cell = WriteOnlyCell(sheet, value=value)
+                cell.data_type = "s"
+                row.append(cell)
+            else:
+                row.append(value)
+        sheet.append(row)
+    workbook.save(path)
+
+
+def write_sidecars(df: pd.DataFrame, path: Path, formats: Iterable[str]) -> Dict[str, str]:
+    """Machine-readable copies of the sheet next to the workbook (plain URLs, no formatting)."""
+    written = {}
+    for fmt in formats:
+        target = Path(path).with_suffix(f".{fmt}")
+        if fmt == "csv":
+            df.to_csv(target, index=False)
+        elif fmt == "parquet":
+            try:
+                df.to_parquet(target, index=False)
+            except ImportError as e:
+                print(f"⚠️ Parquet sidecar skipped ({e})")
+                continue
+        else:
+            print(f"⚠️ Unknown sidecar format '{fmt}', expected one of {SIDECAR_FORMATS}")
+            continue
+        written[fmt] = str(target)
+    return written
+
+
+def write_workbook(df: pd.DataFrame, path, sheet_name: str = "Sheet1", link_column: Optional[str] = None,
+                   dropdowns: Optional[Dict[str, List[str]]] = None, sidecars: Iterable[str] = ()) -> Dict[str, str]:
+    """
+    Stream `df` to an XLSX file. URLs in `link_column` become native hyperlink cells,
+    and each column in `dropdowns` gets a list validation covering exactly the written
+    rows. Returns {"xlsx": path, <sidecar format>: path, ...}.
+    """
+    path = Path(path)
+    dropdowns = dropdowns or {}
+    if xlsxwriter is not None:
+        _write_xlsxwriter(df, path, sheet_name, link_column, dropdowns)
+    else:
+        _write_openpyxl(df, path, sheet_name, link_column, dropdowns)
+    return {"xlsx": str(path), **write_sidecars(df, path, sidecars)}
+
+
+def cell_link(cell) -> Optional[str]:
+    """URL behind a cell: a native hyperlink, or the target of a =HYPERLINK(...) formula in older workbooks."""
+    if cell.hyperlink is not None and cell.hyperlink.target:
+        return cell.hyperlink.target
+    if isinstance(cell.value, str):
+        match = _HYPERLINK_FORMULA.search(cell.value)
+        if match:
+            return match.group(1)
+    return None
+
+
+def read_links(path, column_letter: str = "G") -> List[Optional[str]]:
+    """URLs of one column for every data row (header skipped), None where a row has no link."""
+    sheet = load_workbook(path).worksheets[0]
+    return [cell_link(cell) for cell in sheet[column_letter][1:]]
@@ -0,0 +1,273 @@
+# exclusion_classifier.py
+#
+# Local Include/Exclude pre-classifier for LLMExclusionAgent. It is trained on the
+# Recommendation column of past *_llm_exclusion_checked_*.xlsx outputs; rows it is
+# confident about are decided locally and only the uncertain band goes to the LLM.
+#
+#   python tools/exclusion_classifier.py train      # retrain from history
+#   python tools/exclusion_classifier.py evaluate   # offline evaluation report
+
+import json
+import pickle
+import sys
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+import pandas as pd
+
+try:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.model_selection import StratifiedKFold, cross_val_predict
+    from sklearn.pipeline import make_pipeline, make_union
+except ImportError:  # scikit-learn is optional; without it every row goes to the LLM
+    TfidfVectorizer = None
+
+# Past exclusion outputs are the training history; the model and report sit with the caches
+HISTORY_DIR = Path("regulatory_outputs/site_outputs")
+HISTORY_GLOB = "*_llm_exclusion_checked_*.xlsx"
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+MODEL_FILE = CACHE_DIR / "exclusion_classifier.pkl"
+REPORT_FILE = CACHE_DIR / "exclusion_classifier_report.json"
+# Touched when training finds too little history, so runs wait RETRAIN_AFTER_SECONDS before trying again
+TRAIN_ATTEMPT_FILE = CACHE_DIR / "exclusion_classifier.attempted"
+
+# Decide locally when P(Include) >= INCLUDE_THRESHOLD or P(Exclude) >= EXCLUDE_THRESHOLD
+INCLUDE_THRESHOLD = 0.9
+EXCLUDE_THRESHOLD = 0.9
+# Below these amounts of labelled history the classifier stays off
+MIN_TRAINING_ROWS = 50
+MIN_CLASS_ROWS = 10
+EVALUATION_FOLDS = 5
+# Every run adds an output file; retrain on the new history at most this often
+RETRAIN_AFTER_SECONDS = 24 * 3600
+
+LABELS = ("Include", "Exclude")
+# Reasons of locally decided rows start with this, so they never become training labels
+LOCAL_REASON_PREFIX = "🤖 Local classifier"
+
+_lock = threading.Lock()
+
+
+def available() -> bool:
+    return TfidfVectorizer is not None
+
+
+def row_text(topic, context, regulator) -> str:
+    parts = [str(value).strip() for value in (regulator, topic, context) if pd.notnull(value)]
+    return " | ".join(part for part in parts if part)
+
+
+def load_history(history_dir: Path = HISTORY_DIR) -> pd.DataFrame:
+    """
+    Labelled rows from past exclusion outputs. "Error" and blank recommendations are
+    unlabelled, and rows the classifier decided itself are skipped. When the same
+    update was reviewed more than once, the most recent verdict wins.
+    """
+    frames = []
+    for path in sorted(history_dir.glob(HISTORY_GLOB), key=lambda p: p.stat().st_mtime):
+        try:
+            frame = pd.read_excel(path, sheet_name=0)
+        except Exception as e:
+            print(f"⚠️ Skipping unreadable history file {path.name}: {e}")
+            continue
+        if not {"topic", "Recommendation"}.issubset(frame.columns):
+            continue
+        for column in ("additional_context", "regulator", "Reason"):
+            if column not in frame.columns:
+                frame[column] = ""
+        frames.append(frame[["topic", "additional_context", "regulator", "Recommendation", "Reason"]])
+    if not frames:
+        return pd.DataFrame(columns=["text", "label"])
+
+    history = pd.concat(frames, ignore_index=True)
+    history = history[history["Recommendation"].isin(LABELS)]
+    history = history[~history["Reason"].astype(str).str.startswith(LOCAL_REASON_PREFIX)]
+    history["text"] = [
+        row_text(topic, context, regulator)
+        for topic, context, regulator in zip(history["topic"], history["additional_context"], history["regulator"])
+    ]
+    history = history[history["text"] != ""].drop_duplicates(subset="text", keep="last")
+    return history.rename(columns={"Recommendation": "label"})[["text", "label"]].reset_index(drop=True)
+
+
+def _enough(history: pd.DataFrame) -> bool:
+    counts = history["label"].value_counts()
+    return len(history) >= MIN_TRAINING_ROWS and all(counts.get(label, 0) >= MIN_CLASS_ROWS for label in LABELS)
+
+
+def _pipeline():
+    # Word n-grams catch "speech", "vacancy", "capital rule"; character n-grams survive typos and inflections
+    features = make_union(
+        TfidfVectorizer(ngram_range=(1, 2), sublinear_tf=True, min_df=1, strip_accents="unicode"),
+        TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True, min_df=2),
+    )
+    return make_pipeline(features, LogisticRegression(max_iter=1000, class_weight="balanced"))
+
+
+def train(history_dir: Path = HISTORY_DIR) -> Optional[Dict]:
+    """Fit the classifier on all labelled history and save it. Returns None if there is too little history."""
+    if not available():
+        print("⚠️ scikit-learn is not installed; local exclusion classifier disabled")
+        return None
+    history = load_history(history_dir)
+    if not _enough(history):
+        print(f"⚠️ Only {len(history)} labelled rows in history; local exclusion classifier not trained")
+        with _lock:
+            TRAIN_ATTEMPT_FILE.touch()
+        return None
+
+    pipeline = _pipeline().fit(history["text"], history["label"])
+    model = {
+        "pipeline": pipeline,
+        "trained_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": len(history),
+        "labels": history["label"].value_counts().to_dict(),
+    }
+    with _lock:
+        MODEL_FILE.write_bytes(pickle.dumps(model))
+        TRAIN_ATTEMPT_FILE.unlink(missing_ok=True)
+    print(f"🧠 Exclusion classifier trained on {len(history)} rows {model['labels']}")
+    return model
+
+
+def _history_mtime(history_dir: Path) -> float:
+    return max((p.stat().st_mtime for p in history_dir.glob(HISTORY_GLOB)), default=0.0)
+
+
+def _up_to_date(path: Path, history_dir: Path) -> bool:
+    return path.exists() and path.stat().st_mtime + RETRAIN_AFTER_SECONDS >= _history_mtime(history_dir)
+
+
+def load_model(history_dir: Path = HISTORY_DIR) -> Optional[Dict]:
+    """
+    The saved classifier, retrained first once it is a day older than the newest exclusion
+    output. A failed attempt (too little history) is retried on the same schedule; until
+    then the older classifier, if any, is kept in use.
+    """
+    if not available():
+        return None
+    model = None
+    with _lock:
+        if MODEL_FILE.exists():
+            try:
+                model = pickle.loads(MODEL_FILE.read_bytes())
+            except Exception as e:  # e.g. pickled by another scikit-learn version
+                print(f"⚠️ Could not load exclusion classifier ({e}); retraining")
+        if model and _up_to_date(MODEL_FILE, history_dir):
+            return model
+        if _up_to_date(TRAIN_ATTEMPT_FILE, history_dir):
+            return model
+    return train(history_dir) or model
+
+
+def include_probability(model: Dict, texts: List[str]) -> List[float]:
+    pipeline = model["pipeline"]
+    column = list(pipeline.classes_).index("Include")
+    return [float(p) for p in pipeline.predict_proba(texts)[:, column]]
+
+
+def decide(p_include: float, include_threshold: float = INCLUDE_THRESHOLD,
+           exclude_threshold: float = EXCLUDE_THRESHOLD) -> Optional[str]:
+    """Local verdict for a row, or None when it falls in the uncertain band."""
+    if p_include >= include_threshold:
+        return "Include"
+    if 1 - p_include >= exclude_threshold:
+        return "Exclude"
+    return None
+
+
+def classify(model: Dict, df: pd.DataFrame, include_threshold: float = INCLUDE_THRESHOLD,
+             exclude_threshold: float = EXCLUDE_THRESHOLD) -> Dict:
+    """Row index -> {"recommendation", "reason"} for the rows the classifier is confident about."""
+    if df.empty:
+        return {}
+    texts = [
+        row_text(row.get("topic", ""), row.get("additional_context", ""), row.get("regulator", ""))
+        for _, row in df.iterrows()
+    ]
+    results = {}
+    for i, p_include in zip(df.index, include_probability(model, texts)):
+        verdict = decide(p_include, include_threshold, exclude_threshold)
+        if verdict:
+            confidence = p_include if verdict == "Include" else 1 - p_include
+            results[i] = {
+                "recommendation": verdict,
+                "reason": f"{LOCAL_REASON_PREFIX} ({confidence:.2f} confidence, trained on {model['rows']} past decisions)"
+            }
+    return results
+
+
+def evaluate(history_dir: Path = HISTORY_DIR, include_threshold: float = INCLUDE_THRESHOLD,
+             exclude_threshold: float = EXCLUDE_THRESHOLD) -> Optional[Dict]:
+    """
+    Cross-validated report on the labelled history: how many rows would be decided
+    locally at the configured thresholds, how often those local verdicts agree with the
+    recorded ones, and the same for a sweep of alternative thresholds.
+    """
+    if not available():
+        print("⚠️ scikit-learn is not installed; nothing to evaluate")
+        return None
+    history = load_history(history_dir)
+    if not _enough(history):
+        print(f"⚠️ Only {len(history)} labelled rows in history; need {MIN_TRAINING_ROWS} "
+              f"with {MIN_CLASS_ROWS} per label")
+        return None
+
+    folds = StratifiedKFold(n_splits=EVALUATION_FOLDS, shuffle=True, random_state=0)
+    probabilities = cross_val_predict(_pipeline(), history["text"], history["label"], cv=folds, method="predict_proba")
+    classes = sorted(LABELS)  # predict_proba columns follow the sorted class labels
+    p_include = probabilities[:, classes.index("Include")]
+    labels = list(history["label"])
+
+    def at(include_t: float, exclude_t: float) -> Dict:
+        decided = [(decide(p, include_t, exclude_t), label) for p, label in zip(p_include, labels)]
+        decided = [(verdict, label) for verdict, label in decided if verdict]
+        correct = sum(verdict == label for verdict, label in decided)
+        # Wrongly excluded relevant updates are the expensive mistake for compliance
+        missed = sum(verdict == "Exclude" and label == "Include" for verdict, label in decided)
+        return {
+            "include_threshold": include_t,
+            "exclude_threshold": exclude_t,
+            "decided_locally": len(decided),
+            "coverage": round(len(decided) / len(labels), 3),
+            "local_accuracy": round(correct / len(decided), 3) if decided else None,
+            "wrongly_excluded": missed,
+            "llm_calls_saved": len(decided),
+        }
+
+    overall = sum((p >= 0.5) == (label == "Include") for p, label in zip(p_include, labels))
+    report = {
+        "evaluated_at": datetime.now().isoformat(timespec="seconds"),
+        "rows": len(history),
+        "labels": history["label"].value_counts().to_dict(),
+        "folds": EVALUATION_FOLDS,
+        "accuracy_at_0_5": round(overall / len(labels), 3),
+        "configured": at(include_threshold, exclude_threshold),
+        "sweep": [at(t, t) for t in (0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 0.98)],
+    }
+    REPORT_FILE.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return report
+
+
+def print_report(report: Dict):
+    print(f"📊 {report['rows']} labelled rows {report['labels']}, {report['folds']}-fold CV, "
+          f"accuracy at 0.5: {report['accuracy_at_0_5']:.1%}")
+    print(f"{'include t':>9} {'exclude t':>9} {'coverage':>9} {'local acc':>9} {'wrong excl':>10}")
+    for label, row in [("configured", report["configured"])] + [("", row) for row in report["sweep"]]:
+        accuracy = f"{row['local_accuracy']:.1%}" if row["local_accuracy"] is not None else "-"
+        print(f"{row['include_threshold']:>9} {row['exclude_threshold']:>9} {row['coverage']:>9.1%} "
+              f"{accuracy:>9} {row['wrongly_excluded']:>10}  {label}")
+    print(f"📝 Report saved to {REPORT_FILE}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "evaluate"
+    if command == "train":
+        train()
+    else:
+        report = evaluate()
+        if report:
+            print_report(report)
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+# Per-URL snapshot of the last extraction: content fingerprint, segment hashes and records
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+SNAPSHOT_DB = CACHE_DIR / "extraction_snapshots.sqlite"
+
+# Above this share of new segments the page is re-extracted whole (a redesign, not an update)
+MAX_CHANGED_RATIO = 0.5
+
+_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(SNAPSHOT_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS snapshots (
+            url TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            segments TEXT NOT NULL,
+            records TEXT NOT NULL,
+            updated_at REAL NOT NULL
+        )
+    """)
+    return conn
+
+
+@contextmanager
+def _db():
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+class ContentFingerprint:
+    """Whitespace-insensitive SHA-256 of extracted text, fed whole or piece by piece."""
+
+    def __init__(self, text: str = ""):
+        self._hash = hashlib.sha256()
+        self.update(text)
+
+    def update(self, piece: str):
+        self._hash.update("".join(piece.split()).encode("utf-8"))
+
+    def wrap(self, pieces: Iterable[str]) -> Iterator[str]:
+        """Pass pieces through unchanged while hashing them (for streaming extraction)."""
+        for piece in pieces:
+            self.update(piece)
+            yield piece
+
+    def hexdigest(self) -> str:
+        return self._hash.hexdigest()
+
+
+def fingerprint(text: str) -> str:
+    return ContentFingerprint(text).hexdigest()
+
+
+def segment_hash(segment: str) -> str:
+    return hashlib.sha1(" ".join(segment.split()).encode("utf-8")).hexdigest()
+
+
+def load(url: str) -> Optional[Dict]:
+    with _db() as conn:
+        row = conn.execute(
+            "SELECT fingerprint, segments, records FROM snapshots WHERE url = ?", (url,)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"fingerprint": row[0], "segments": json.loads(row[1]), "records": json.loads(row[2])}
+
+
+def save(url: str, content_fingerprint: str, segment_hashes: List[str], records: List[Dict]):
+    with _db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO snapshots (url, fingerprint, segments, records, updated_at) VALUES (?, ?, ?, ?, ?)",
+            (url, content_fingerprint, json.dumps(segment_hashes), json.dumps(records, default=str), time.time())
+        )
+
+
+def is_unchanged(url: str, content_fingerprint: Optional[str]) -> bool:
+    if not content_fingerprint:
+        return False
+    with _db() as conn:
+        row = conn.execute("SELECT fingerprint FROM snapshots WHERE url = ?", (url,)).fetchone()
+    return row is not None and row[0] == content_fingerprint
+
+
+def changed_segments(segment_hashes: List[str], snapshot: Dict) -> Optional[List[int]]:
+    """
+    Indices of the segments to re-extract, or None if too much changed for an incremental run.
+    A segment holds one item's title plus the previous item's trailing context, so the
+    segment after each new one is re-sent as well.
+    """
+    known = set(snapshot["segments"])
+    new = [i for i, h in enumerate(segment_hashes) if h not in known]
+    if len(new) > MAX_CHANGED_RATIO * len(segment_hashes):
+        return None
+    return sorted(set(new) | {i + 1 for i in new if i + 1 < len(segment_hashes)})
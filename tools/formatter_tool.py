@@ -1,13 +1,9 @@
 import pdfkit
 from pathlib import Path
-from urllib.parse import urlparse
 from pydantic import BaseModel, Field
 from crewai.tools import BaseTool
 from typing import Dict
-
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from tools import artifact_store
 
 
 class FormatterInput(BaseModel):
@@ -21,9 +17,6 @@ class FormatterTool(BaseTool):
     args_schema: type = FormatterInput
 
     def _run(self, url: str, cleaned_file: str) -> Dict:
-        domain = urlparse(url).netloc.replace('.', '_')
-        pdf_output_path = OUTPUT_DIR / f"{domain}_formatted.pdf"
-
         wkhtmltopdf_path = r"C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe"
         if not Path(wkhtmltopdf_path).exists():
             raise FileNotFoundError(f"wkhtmltopdf not found at: {wkhtmltopdf_path}")
@@ -35,7 +28,9 @@ class FormatterTool(BaseTool):
         }
 
         try:
-            pdfkit.from_file(cleaned_file, str(pdf_output_path), configuration=config, options=options)
+            pdf_bytes = pdfkit.from_string(artifact_store.read_text(cleaned_file), False, configuration=config, options=options)
+            # PDFs are already compressed; store them as-is so they open directly
+            pdf_output_path = artifact_store.put(url, "formatted", pdf_bytes, suffix=".pdf", compress=False)
             print(f"✅ PDF created: {pdf_output_path}")
         except Exception as e:
             print(f"❌ PDF conversion failed for {cleaned_file}: {e}")
@@ -44,7 +39,7 @@ class FormatterTool(BaseTool):
         return {
             "url": url,
             "cleaned_file": cleaned_file,
-            "pdf_file": str(pdf_output_path)
+            "pdf_file": pdf_output_path
         }
 
 formatter_tool = FormatterTool()
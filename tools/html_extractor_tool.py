@@ -1,19 +1,121 @@
 from pydantic import BaseModel, Field
-from bs4 import BeautifulSoup
-from bs4.element import Tag, NavigableString
-from urllib.parse import urlparse, urljoin
-from pathlib import Path
+from lxml import etree
+from collections import Counter
+from urllib.parse import urljoin
 from typing import List, Dict
 from crewai.tools import BaseTool
+from tools import artifact_store
+from tools.cleaner_tool import TAGS_TO_REMOVE, parse_html
+from tools.streaming_extractor import iter_segments, iter_extracted_text
+from tools import extraction_snapshot, template_cache
 
-# ✅ Output directory
-OUTPUT_DIR = Path(r"C:\Users\hp\Documents\Agent Router Tools\regulatory_outputs\site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Ancestors whose text is reported as an anchor's surrounding context
+BLOCK_TAGS = {
+    "p", "li", "dd", "dt", "td", "th", "tr", "div", "section", "article",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "figure", "caption",
+}
+MAX_BLOCK_TEXT_CHARS = 500
+# A block with more links than this is a listing or page wrapper, not the anchor's own item
+MAX_BLOCK_ANCHORS = 5
+
+
+class LinkRecord(BaseModel):
+    text: str                # visible anchor text
+    href: str                # absolute URL
+    position: int            # index of the anchor among extracted links, in document order
+    xpath: str = ""          # DOM path of the anchor (empty in streaming mode)
+    block_text: str = ""     # text of the nearest enclosing block element
+
+
+def _child_paths(node, path: str) -> List[tuple]:
+    """(child, xpath) for each child, numbering same-tag siblings like lxml's getpath."""
+    tags = Counter(child.tag for child in node if isinstance(child.tag, str))
+    seen = Counter()
+    children = []
+    for child in node:
+        if isinstance(child.tag, str):
+            seen[child.tag] += 1
+            step = child.tag if tags[child.tag] == 1 else f"{child.tag}[{seen[child.tag]}]"
+            children.append((child, f"{path}/{step}"))
+        else:
+            children.append((child, ""))  # comments have no anchors
+    return children
+
+
+def extract_from_tree(root, base_url: str = "") -> tuple[str, List[str], List[LinkRecord]]:
+    """
+    Extract visible text, links and link records from an already cleaned lxml tree.
+    Anchors are rendered as "text (href)" in the text, matching HTMLExtractorTool's format.
+    """
+    start = root.find(".//body")
+    if start is None:
+        start = root
+    tree = root.getroottree()
+
+    result = []
+    links = []
+    records = []
+    block_texts = {}
+
+    def add(text):
+        text = text.strip() if text else ""
+        if text:
+            result.append(text)
+
+    def block_text(anchor, text: str) -> str:
+        # Nearest block ancestor with text besides the anchor's own ("Read more" -> its card),
+        # but never a container of many links, whose text would be the whole listing or page
+        block = anchor.getparent()
+        while block is not None and block is not start:
+            if block.tag in BLOCK_TAGS:
+                if block not in block_texts:
+                    block_texts[block] = (" ".join(" ".join(block.itertext()).split()), sum(1 for _ in block.iter("a")))
+                full_text, anchors = block_texts[block]
+                if anchors > MAX_BLOCK_ANCHORS:
+                    return ""
+                if len(full_text) > len(text):
+                    return full_text[:MAX_BLOCK_TEXT_CHARS]
+            block = block.getparent()
+        return ""
+
+    # Explicit stack instead of recursion; (node, closing, xpath) entries emit tails after subtrees.
+    # XPaths are built on the way down (same form as getpath, which is linear in siblings per call)
+    stack = [(start, False, tree.getpath(start))]
+    while stack:
+        node, closing, path = stack.pop()
+        if closing:
+            if node is not start:
+                add(node.tail)
+            continue
+        stack.append((node, True, path))
+        if not isinstance(node.tag, str):
+            continue  # comments: only their tail is visible
+        if node.tag == "a" and node.get("href"):
+            text = " ".join(node.text_content().split())
+            if text:
+                href = urljoin(base_url, node.get("href"))
+                result.append(f"{text} ({href})")
+                links.append(href)
+                records.append(LinkRecord(
+                    text=text,
+                    href=href,
+                    position=len(records),
+                    xpath=path,
+                    block_text=block_text(node, text)
+                ))
+            continue
+        add(node.text)
+        for child, child_path in reversed(_child_paths(node, path)):
+            stack.append((child, False, child_path))
+
+    return " ".join(result), list(dict.fromkeys(links)), records
 
 # ✅ Input schema
 class HTMLExtractorInput(BaseModel):
     url: str = Field(..., description="The URL of the page")
     cleaned_file: str = Field(..., description="The path to the cleaned HTML file")
+    streaming: bool = Field(False, description="Tokenize the file incrementally instead of building a tree (for very large pages)")
+    use_template: bool = Field(False, description="Apply the domain's learned listing template (phase 1 listing pages only)")
 
 # ✅ Tool class
 class HTMLExtractorTool(BaseTool):
@@ -21,43 +123,38 @@ class HTMLExtractorTool(BaseTool):
     description: str = "Extracts visible text and links from cleaned HTML content"
     args_schema: type = HTMLExtractorInput
 
-    def _run(self, url: str, cleaned_file: str) -> Dict:
-        def extract_visible_text_and_links(html_path: str, base_url: str = "") -> tuple[str, List[str]]:
-            with open(html_path, "r", encoding="utf-8") as f:
-                soup = BeautifulSoup(f, "html.parser")
-
-            for tag in soup(["script", "style", "noscript", "footer", "header", "nav", "aside"]):
-                tag.decompose()
-
-            result = []
-
-            def traverse(node):
-                if isinstance(node, NavigableString):
-                    text = node.strip()
-                    if text:
-                        result.append(text)
-                elif isinstance(node, Tag):
-                    if node.name == "a" and node.get("href"):
-                        text = node.get_text(strip=True)
-                        href = urljoin(base_url, node["href"])
-                        if text:
-                            result.append(f"{text} ({href})")
-                    else:
-                        for child in node.children:
-                            traverse(child)
-
-            traverse(soup.body or soup)
-            visible_text = " ".join(result)
-            links = [part.split(" (")[-1].rstrip(")") for part in result if " (" in part]
-            return visible_text, list(set(links))
+    def _run(self, url: str, cleaned_file: str, streaming: bool = False, use_template: bool = False) -> Dict:
+        if streaming:
+            print(f"🔍 Stream-extracting from: {cleaned_file}")
+            links = []
+            anchors = []
+            content_fingerprint = extraction_snapshot.ContentFingerprint()
+            segments = iter_segments(artifact_store.iter_text(cleaned_file), url)
+            output_path = artifact_store.put_stream(
+                url, "extracted", content_fingerprint.wrap(iter_extracted_text(segments, links, anchors)), suffix=".txt"
+            )
+            records = [LinkRecord(text=text, href=href, position=i) for i, (text, href) in enumerate(anchors)]
+            print(f"✅ Saved extracted content to: {output_path}")
+            return {
+                "url": url,
+                "extracted_text": None,
+                "extracted_links": list(dict.fromkeys(links)),
+                "link_records": [r.model_dump() for r in records],
+                "listing_items": [],
+                "listing_confidence": 0.0,
+                "content_fingerprint": content_fingerprint.hexdigest(),
+                "template_mode": None,
+                "extracted_file": output_path
+            }
 
         print(f"🔍 Extracting from: {cleaned_file}")
-        visible_text, links = extract_visible_text_and_links(cleaned_file, url)
+        root = parse_html(artifact_store.read_text(cleaned_file))
+        etree.strip_elements(root, *TAGS_TO_REMOVE, with_tail=False)
+        visible_text, links, records = extract_from_tree(root, url)
+        template_mode = "unfused" if use_template else None
+        listing = template_cache.find_listing(root, url, template_mode)
 
-        domain = urlparse(url).netloc.replace(".", "_")
-        output_path = OUTPUT_DIR / f"{domain}_extracted.txt"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(visible_text)
+        output_path = artifact_store.put(url, "extracted", visible_text, suffix=".txt")
 
         print(f"✅ Saved extracted content to: {output_path}")
 
@@ -65,7 +162,12 @@ class HTMLExtractorTool(BaseTool):
             "url": url,
             "extracted_text": visible_text,
             "extracted_links": links,
-            "extracted_file": str(output_path)
+            "link_records": [r.model_dump() for r in records],
+            "listing_items": listing["items"],
+            "listing_confidence": listing["confidence"],
+            "content_fingerprint": extraction_snapshot.fingerprint(visible_text),
+            "template_mode": template_mode,
+            "extracted_file": output_path
         }
 
 html_extractor_tool = HTMLExtractorTool()
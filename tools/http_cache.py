@@ -0,0 +1,164 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Optional
+
+# Persistent cache of page validators/bodies and of each URL's last pipeline results
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+HTTP_CACHE_DB = CACHE_DIR / "http_cache.sqlite"
+
+CACHE_TTL_SECONDS = 30 * 24 * 3600     # entries older than this are refetched unconditionally
+MAX_CACHE_BYTES = 200 * 1024 * 1024    # compressed bodies beyond this are evicted, least recently used first
+
+_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(HTTP_CACHE_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            content_type TEXT,
+            digest TEXT NOT NULL,
+            body BLOB,
+            size INTEGER NOT NULL,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS run_results (
+            url TEXT PRIMARY KEY,
+            llm_output_file TEXT,
+            exclusion_file TEXT,
+            digest TEXT,
+            updated_at REAL NOT NULL
+        )
+    """)
+    # Databases created before run_results kept the page digest
+    if "digest" not in {row[1] for row in conn.execute("PRAGMA table_info(run_results)")}:
+        conn.execute("ALTER TABLE run_results ADD COLUMN digest TEXT")
+    return conn
+
+
+@contextmanager
+def _db():
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def body_digest(body: str) -> str:
+    return hashlib.sha256(body.encode("utf-8")).hexdigest()
+
+
+def get_entry(url: str) -> Optional[Dict]:
+    """Return the cached validators and body for a URL, or None if missing or expired."""
+    with _db() as conn:
+        row = conn.execute(
+            "SELECT etag, last_modified, content_type, digest, body, stored_at FROM pages WHERE url = ?", (url,)
+        ).fetchone()
+        if row is None:
+            return None
+        if time.time() - row[5] > CACHE_TTL_SECONDS:
+            conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+            return None
+        conn.execute("UPDATE pages SET accessed_at = ? WHERE url = ?", (time.time(), url))
+    return {
+        "etag": row[0],
+        "last_modified": row[1],
+        "content_type": row[2],
+        "digest": row[3],
+        "body": zlib.decompress(row[4]).decode("utf-8") if row[4] is not None else None,
+    }
+
+
+def conditional_headers(entry: Optional[Dict]) -> Dict[str, str]:
+    if not entry or entry["body"] is None:
+        return {}
+    headers = {}
+    if entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def store(url: str, body: str, etag: Optional[str] = None, last_modified: Optional[str] = None,
+          content_type: Optional[str] = None) -> bool:
+    """
+    Store a freshly downloaded body. Returns True if its digest matches the previous
+    one, i.e. the content is unchanged even though the server sent a full response.
+    """
+    digest = body_digest(body)
+    blob = zlib.compress(body.encode("utf-8"))
+    now = time.time()
+    with _db() as conn:
+        row = conn.execute("SELECT digest FROM pages WHERE url = ?", (url,)).fetchone()
+        conn.execute(
+            "INSERT OR REPLACE INTO pages (url, etag, last_modified, content_type, digest, body, size, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (url, etag, last_modified, content_type, digest, blob, len(blob), now, now)
+        )
+        _evict(conn)
+    return row is not None and row[0] == digest
+
+
+def touch(url: str):
+    """Mark a cached entry as revalidated (after a 304)."""
+    with _db() as conn:
+        conn.execute("UPDATE pages SET stored_at = ?, accessed_at = ? WHERE url = ?", (time.time(), time.time(), url))
+
+
+def _evict(conn: sqlite3.Connection):
+    conn.execute("DELETE FROM pages WHERE stored_at < ?", (time.time() - CACHE_TTL_SECONDS,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    for url, size in conn.execute("SELECT url, size FROM pages ORDER BY accessed_at").fetchall():
+        conn.execute("DELETE FROM pages WHERE url = ?", (url,))
+        total -= size
+        if total <= MAX_CACHE_BYTES:
+            break
+
+
+# --- Previous pipeline results, reused when a page has not changed ---
+def remember_results(url: str, llm_output_file: Optional[str] = None, exclusion_file: Optional[str] = None,
+                     digest: Optional[str] = None):
+    """
+    Record a completed run's output files, with the digest of the page they were built from.
+    Called only once the whole pipeline has succeeded, so a failed run is never reused.
+    """
+    with _db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO run_results (url, llm_output_file, exclusion_file, digest, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (url, llm_output_file, exclusion_file, digest, time.time())
+        )
+
+
+def previous_results(url: str, digest: Optional[str] = None) -> Optional[Dict]:
+    """
+    Return the last run's output files for a URL if they still exist on disk. With a
+    digest, only if that run was built from a page with the same digest.
+    """
+    with _db() as conn:
+        row = conn.execute(
+            "SELECT llm_output_file, exclusion_file, digest FROM run_results WHERE url = ?", (url,)
+        ).fetchone()
+    if row is None or not row[1] or not Path(row[1]).exists():
+        return None
+    if digest is not None and row[2] != digest:
+        return None
+    return {"llm_output_file": row[0], "exclusion_file": row[1], "digest": row[2]}
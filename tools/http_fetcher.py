@@ -0,0 +1,160 @@
+import json
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from tools import http_cache
+
+# Per-domain fetch decisions live next to the other scraper caches
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+FETCH_TIERS_FILE = CACHE_DIR / "fetch_tiers.json"
+
+# Re-probe a domain's tier after this long, in case the site changed
+TIER_TTL = timedelta(days=7)
+# Responses fetched in this process are reused for this many seconds (e.g. router preview -> scraper)
+RECENT_TTL_SECONDS = 120
+MAX_RECENT_RESPONSES = 256
+
+# Heuristics for "this page needs a browser"
+MIN_BODY_CHARS = 500
+MIN_ANCHORS = 10
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+# Shared keep-alive session
+_session = requests.Session()
+_session.headers.update({"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"})
+_adapter = HTTPAdapter(pool_connections=16, pool_maxsize=16)
+_session.mount("http://", _adapter)
+_session.mount("https://", _adapter)
+
+_recent: Dict[str, tuple] = {}
+_lock = threading.Lock()
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+def _decode(resp: requests.Response) -> str:
+    """
+    Response body as text. Without a charset in the Content-Type, requests assumes
+    ISO-8859-1 for text/*; use the page's <meta charset> or a detected encoding instead.
+    """
+    if "charset" not in resp.headers.get("Content-Type", "").lower():
+        declared = _META_CHARSET.search(resp.content[:4096])
+        resp.encoding = declared.group(1).decode("ascii") if declared else resp.apparent_encoding
+    try:
+        return resp.text
+    except LookupError:  # unknown charset name in the page
+        resp.encoding = resp.apparent_encoding
+        return resp.text
+
+
+def _remember(url: str, result: Dict):
+    """Keep a response for RECENT_TTL_SECONDS, dropping expired ones and the oldest beyond MAX_RECENT_RESPONSES."""
+    now = time.monotonic()
+    with _lock:
+        for key in [k for k, (fetched_at, _) in _recent.items() if now - fetched_at >= RECENT_TTL_SECONDS]:
+            del _recent[key]
+        _recent.pop(url, None)
+        _recent[url] = (now, result)
+        while len(_recent) > MAX_RECENT_RESPONSES:
+            del _recent[next(iter(_recent))]
+
+
+def fetch_url(url: str, timeout: float = 15) -> Optional[Dict]:
+    """
+    GET a URL over the shared pooled session. Returns a dict with status, headers,
+    text, the body's `digest` and a `not_modified` flag (unchanged since the previous
+    fetch), or None on network errors. Recent responses are reused.
+    """
+    with _lock:
+        cached = _recent.get(url)
+    if cached and time.monotonic() - cached[0] < RECENT_TTL_SECONDS:
+        return cached[1]
+
+    # Revalidate against the persistent cache with If-None-Match / If-Modified-Since
+    entry = http_cache.get_entry(url)
+    try:
+        resp = _session.get(url, timeout=timeout, headers=http_cache.conditional_headers(entry))
+    except Exception as e:
+        print(f"⚠️ HTTP fetch failed for {url}: {e}")
+        return None
+
+    if resp.status_code == 304 and entry is not None:
+        http_cache.touch(url)
+        text, content_type, not_modified = entry["body"], entry["content_type"] or "", True
+        digest = entry["digest"]
+        print(f"♻️ Not modified since last fetch: {url}")
+    else:
+        text, content_type, not_modified = _decode(resp), resp.headers.get("Content-Type", ""), False
+        digest = http_cache.body_digest(text)
+        if resp.status_code == 200:
+            not_modified = http_cache.store(
+                url, text, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), content_type
+            )
+
+    result = {
+        "url": url,
+        "status": resp.status_code,
+        "headers": dict(resp.headers),
+        "content_type": content_type,
+        "text": text,
+        "digest": digest,
+        "not_modified": not_modified,
+    }
+    _remember(url, result)
+    return result
+
+
+def is_html_page(response: Dict) -> bool:
+    """True for a 200 text/html response, the only kind that says anything about a domain's fetch tier."""
+    return response["status"] == 200 and "text/html" in response["content_type"].lower()
+
+
+def looks_js_dependent(response: Dict) -> bool:
+    """True if an HTTP response is unlikely to contain the rendered page content."""
+    if response["status"] not in (200, 304) or "html" not in response["content_type"].lower():
+        return True
+
+    html = response["text"]
+    body = re.search(r"<body[^>]*>(.*)</body>", html, flags=re.IGNORECASE | re.DOTALL)
+    body_html = body.group(1) if body else html
+    body_text = re.sub(r"<script.*?</script>|<style.*?</style>|<[^>]+>", " ", body_html, flags=re.IGNORECASE | re.DOTALL)
+    if len(body_text.split()) * 6 < MIN_BODY_CHARS:
+        return True
+
+    noscript = re.search(r"<noscript[^>]*>.*?enable javascript.*?</noscript>", html, flags=re.IGNORECASE | re.DOTALL)
+    anchors = len(re.findall(r"<a\s[^>]*href", html, flags=re.IGNORECASE))
+    return anchors < MIN_ANCHORS or (noscript is not None and anchors < 2 * MIN_ANCHORS)
+
+
+def _load_tiers() -> Dict:
+    try:
+        return json.loads(FETCH_TIERS_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def get_fetch_tier(domain: str) -> Optional[str]:
+    """Return "http" or "browser" for a domain, or None if unknown or stale."""
+    with _lock:
+        entry = _load_tiers().get(domain)
+    if not entry or datetime.now() - datetime.fromisoformat(entry["updated"]) > TIER_TTL:
+        return None
+    return entry["tier"]
+
+
+def set_fetch_tier(domain: str, tier: str):
+    with _lock:
+        tiers = _load_tiers()
+        if tiers.get(domain, {}).get("tier") != tier:
+            print(f"📝 Fetch tier for {domain}: {tier}")
+        tiers[domain] = {"tier": tier, "updated": datetime.now().isoformat(timespec="seconds")}
+        FETCH_TIERS_FILE.write_text(json.dumps(tiers, indent=2), encoding="utf-8")
@@ -0,0 +1,124 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote, urlparse
+
+# Below this score a topic is left without a link rather than given a wrong one
+MIN_SCORE = 0.35
+# Weight of word overlap vs. character-trigram similarity in the final score
+TOKEN_WEIGHT = 0.6
+# Candidates scored in full per lookup, chosen by shared words
+MAX_CANDIDATES = 50
+# Anchors with fewer content words than this ("Read more", "PDF") are indexed with their block text
+MIN_ANCHOR_TOKENS = 2
+# Link boilerplate that says nothing about the target; not counted as content words
+GENERIC_ANCHOR_WORDS = {"read", "more", "click", "here", "view", "details", "download", "learn", "full", "story"}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "in", "is", "it", "its",
+    "of", "on", "or", "the", "to", "with", "www", "htm", "html", "pdf", "aspx", "php", "https", "http",
+}
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(_WORD.findall(text.lower()))
+
+
+def _tokens(text: str) -> set:
+    return {t for t in _WORD.findall(text.lower()) if t not in STOPWORDS}
+
+
+def _trigrams(text: str) -> set:
+    padded = f"  {_normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _slug_text(href: str) -> str:
+    """Words in the URL path, e.g. /press/2025/basel-iii-update.htm -> "press 2025 basel iii update"."""
+    return re.sub(r"[/_\-.]+", " ", unquote(urlparse(href).path))
+
+
+class LinkIndex:
+    """
+    Inverted index from anchor text (plus URL slug words) to href. Lookups fully score only
+    a shortlist of anchors sharing words (or rare trigrams) with the query, so cost follows
+    the matches, not the page size.
+    """
+
+    def __init__(self, anchors: Iterable[Tuple[str, str, str]]):
+        self.hrefs: List[str] = []
+        self.doc_tokens: List[set] = []
+        self.doc_trigrams: List[set] = []
+        self.token_postings: Dict[str, List[int]] = defaultdict(list)
+        self.trigram_postings: Dict[str, List[int]] = defaultdict(list)
+
+        seen = set()
+        for text, href, block_text in anchors:
+            if not href or (text, href) in seen:
+                continue
+            seen.add((text, href))
+            tokens = _tokens(text)
+            if len(tokens - GENERIC_ANCHOR_WORDS) < MIN_ANCHOR_TOKENS and block_text:
+                text = f"{text} {block_text}"
+                tokens = _tokens(text)
+            doc = len(self.hrefs)
+            self.hrefs.append(href)
+            self.doc_tokens.append(tokens | _tokens(_slug_text(href)))
+            self.doc_trigrams.append(_trigrams(text))
+            for token in self.doc_tokens[doc]:
+                self.token_postings[token].append(doc)
+            for trigram in self.doc_trigrams[doc]:
+                self.trigram_postings[trigram].append(doc)
+
+        total = len(self.hrefs)
+        self.idf = {t: math.log(1 + total / len(docs)) for t, docs in self.token_postings.items()}
+
+    @classmethod
+    def from_link_records(cls, link_records: List[Dict]) -> "LinkIndex":
+        return cls((r.get("text", ""), r.get("href", ""), r.get("block_text", "")) for r in link_records)
+
+    @classmethod
+    def from_links(cls, links: List[str]) -> "LinkIndex":
+        # No anchor text known: the URL slug is all there is to match on
+        return cls(("", href, "") for href in links)
+
+    def search(self, query: str, k: int = 5) -> List[Tuple[str, float]]:
+        """Return up to k (href, score) pairs, best first."""
+        query_tokens = _tokens(query)
+        query_trigrams = _trigrams(query)
+        if not query_tokens and not query_trigrams:
+            return []
+
+        # Shortlist by shared words (rare words count most); fall back to trigrams for typos
+        shared = Counter()
+        for token in query_tokens:
+            for doc in self.token_postings.get(token, ()):
+                shared[doc] += self.idf[token]
+        if not shared:
+            common = max(MAX_CANDIDATES, len(self.hrefs) // 10)
+            for trigram in query_trigrams:
+                postings = self.trigram_postings.get(trigram, ())
+                if len(postings) <= common:
+                    for doc in postings:
+                        shared[doc] += 1
+
+        query_weight = sum(self.idf.get(t, math.log(1 + len(self.hrefs))) for t in query_tokens) or 1.0
+        best: Dict[str, float] = {}
+        for doc, _ in shared.most_common(MAX_CANDIDATES):
+            token_score = sum(self.idf[t] for t in query_tokens & self.doc_tokens[doc]) / query_weight
+            trigrams = self.doc_trigrams[doc]
+            trigram_score = 2 * len(query_trigrams & trigrams) / (len(query_trigrams) + len(trigrams)) if trigrams else 0.0
+            score = TOKEN_WEIGHT * token_score + (1 - TOKEN_WEIGHT) * trigram_score
+            href = self.hrefs[doc]
+            if score > best.get(href, 0.0):
+                best[href] = score
+        return sorted(best.items(), key=lambda item: item[1], reverse=True)[:k]
+
+    def resolve(self, query: str, min_score: float = MIN_SCORE) -> Optional[str]:
+        matches = self.search(query, k=1)
+        if matches and matches[0][1] >= min_score:
+            return matches[0][0]
+        return None
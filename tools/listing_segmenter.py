@@ -0,0 +1,201 @@
+import re
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Optional
+from urllib.parse import urljoin, urlparse
+
+# Listings with fewer repeated items than this are left to the LLM
+MIN_ITEMS = 3
+# LLMExtractorTool skips the LLM when segmentation is at least this confident
+CONFIDENCE_THRESHOLD = 0.6
+MAX_CONTEXT_CHARS = 500
+
+# Known issuers by domain; anything else falls back to the bare domain
+REGULATORS_BY_DOMAIN = {
+    "bis.org": "BIS",
+    "federalreserve.gov": "Federal Reserve",
+    "occ.gov": "OCC",
+    "occ.treas.gov": "OCC",
+    "fdic.gov": "FDIC",
+    "sec.gov": "SEC",
+    "cftc.gov": "CFTC",
+    "consumerfinance.gov": "CFPB",
+    "fincen.gov": "FinCEN",
+    "treasury.gov": "U.S. Treasury",
+    "fsb.org": "FSB",
+    "eba.europa.eu": "EBA",
+    "ecb.europa.eu": "ECB",
+    "bankofengland.co.uk": "Bank of England",
+    "fca.org.uk": "FCA",
+    "iosco.org": "IOSCO",
+}
+
+# Field order of numeric dates like 04/06/2025: day first outside the US. Domains not listed
+# fall back to their TLD (.gov/.us month first, country TLDs and .eu day first, else unknown)
+DAY_FIRST_BY_DOMAIN = {
+    "bis.org": True,
+    "fsb.org": True,
+    "iosco.org": True,
+}
+
+_MONTHS = r"(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)[a-z]*\.?"
+_MONTH_NUMBERS = {m: i for i, m in enumerate(
+    ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"], start=1
+)}
+
+def _slash_ymd(g, day_first: Optional[bool]) -> Optional[tuple]:
+    first, second, year = int(g[0]), int(g[1]), int(g[2])
+    if first > 12 or (day_first and second <= 12):
+        return year, second, first
+    if second > 12 or day_first is False:
+        return year, first, second
+    return None  # both orders valid and the site's convention is unknown
+
+
+# (pattern, function turning the match groups and the day-first flag into (year, month, day) or None)
+DATE_PATTERNS = [
+    (re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b"),
+     lambda g, day_first: (int(g[0]), int(g[1]), int(g[2]))),
+    (re.compile(rf"\b(\d{{1,2}}) ({_MONTHS}) (\d{{4}})\b", re.IGNORECASE),
+     lambda g, day_first: (int(g[2]), _MONTH_NUMBERS[g[1][:3].lower()], int(g[0]))),
+    (re.compile(rf"\b({_MONTHS}) (\d{{1,2}}),? (\d{{4}})\b", re.IGNORECASE),
+     lambda g, day_first: (int(g[2]), _MONTH_NUMBERS[g[0][:3].lower()], int(g[1]))),
+    (re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b"),
+     _slash_ymd),
+    (re.compile(r"\b(\d{1,2})\.(\d{1,2})\.(\d{4})\b"),
+     lambda g, day_first: (int(g[2]), int(g[1]), int(g[0]))),
+]
+
+
+def find_date(text: str, day_first: Optional[bool] = None) -> Optional[tuple]:
+    """
+    Return (YYYY-MM-DD, matched text) for the first recognizable date in `text`.
+    Numeric d/d/yyyy dates are read in `day_first` order (see `day_first_for`); when
+    that is None, only dates with a field above 12 are read and ambiguous ones skipped.
+    """
+    for pattern, to_ymd in DATE_PATTERNS:
+        for match in pattern.finditer(text):
+            ymd = to_ymd(match.groups(), day_first)
+            if ymd is None:
+                continue
+            try:
+                return datetime(*ymd).strftime("%Y-%m-%d"), match.group(0)
+            except ValueError:
+                continue
+    return None
+
+
+def has_date(text: str) -> bool:
+    """True if `text` contains something date-shaped, whatever its field order."""
+    return any(pattern.search(text) for pattern, _ in DATE_PATTERNS)
+
+
+def day_first_for(url: str) -> Optional[bool]:
+    """Whether numeric dates on this site put the day first; None if unknown."""
+    host = urlparse(url).netloc.split(":")[0].lower()
+    for domain, day_first in DAY_FIRST_BY_DOMAIN.items():
+        if host == domain or host.endswith("." + domain):
+            return day_first
+    tld = host.rsplit(".", 1)[-1]
+    if tld in ("gov", "mil", "us"):
+        return False
+    if tld == "eu" or (len(tld) == 2 and tld.isalpha()):
+        return True
+    return None
+
+
+def regulator_for(url: str) -> str:
+    host = urlparse(url).netloc.split(":")[0].lower()
+    for domain, name in REGULATORS_BY_DOMAIN.items():
+        if host == domain or host.endswith("." + domain):
+            return name
+    return host[4:] if host.startswith("www.") else host
+
+
+def _signature(element) -> tuple:
+    return element.tag, element.get("class", "")
+
+
+def _text(element) -> str:
+    # Join text nodes with spaces: adjacent blocks ("1 June 2025" + "Press release") must not fuse
+    return " ".join(" ".join(element.itertext()).split())
+
+
+def _item_record(item, base_url: str, regulator: str) -> Optional[Dict]:
+    anchors = [a for a in item.iter("a") if a.get("href") and _text(a)]
+    if not anchors:
+        return None
+    # The title link is the one with the most text
+    title = max(anchors, key=lambda a: len(_text(a)))
+    return item_record(item, title, base_url, regulator)
+
+
+def item_record(item, title, base_url: str, regulator: str, date_element=None) -> Dict:
+    """Build an update record from a listing item and its title anchor."""
+    topic = _text(title)
+    text = _text(item)
+
+    # A known date element wins; otherwise take the first date anywhere in the item
+    day_first = day_first_for(base_url)
+    date = find_date(_text(date_element), day_first) if date_element is not None else None
+    date = date or find_date(text, day_first)
+    context = text.replace(topic, " ", 1)
+    if date:
+        context = context.replace(date[1], " ", 1)
+    return {
+        "date": date[0] if date else "",
+        "topic": topic,
+        "additional_context": " ".join(context.split())[:MAX_CONTEXT_CHARS],
+        "link": urljoin(base_url, title.get("href")),
+        "regulator": regulator,
+    }
+
+
+def segment_listing(root, base_url: str) -> Dict:
+    """
+    Detect the dominant run of repeated sibling subtrees (date + title + link blocks)
+    in a cleaned lxml tree and turn it into update records.
+    Returns {"items": [...], "confidence": 0..1, "container": item xpath pattern or None}.
+    """
+    body = root.find(".//body")
+    body = body if body is not None else root
+    page_dates = sum(1 for _ in _iter_dates(_text(body)))
+    regulator = regulator_for(base_url)
+
+    best = {"items": [], "confidence": 0.0, "container": None}
+    for parent in body.iter():
+        if not isinstance(parent.tag, str) or len(parent) < MIN_ITEMS:
+            continue
+
+        groups = defaultdict(list)
+        for child in parent:
+            if isinstance(child.tag, str):
+                groups[_signature(child)].append(child)
+
+        for siblings in groups.values():
+            if len(siblings) < MIN_ITEMS:
+                continue
+            items = [r for r in (_item_record(s, base_url, regulator) for s in siblings) if r]
+            if len(items) < MIN_ITEMS:
+                continue
+
+            link_coverage = len(items) / len(siblings)
+            dated = sum(1 for item in items if item["date"])
+            date_coverage = dated / len(items)
+            # Share of the page's dates that this listing accounts for
+            page_coverage = min(1.0, dated / page_dates) if page_dates else 0.0
+            size_factor = min(1.0, len(items) / (2 * MIN_ITEMS))
+            confidence = date_coverage * link_coverage * (0.5 + 0.5 * page_coverage) * size_factor
+
+            if confidence > best["confidence"] or (confidence and confidence == best["confidence"] and len(items) > len(best["items"])):
+                best = {
+                    "items": items,
+                    "confidence": round(confidence, 3),
+                    "container": f"{root.getroottree().getpath(parent)}/{siblings[0].tag}",
+                }
+    return best
+
+
+def _iter_dates(text: str):
+    for pattern, _ in DATE_PATTERNS:
+        yield from pattern.finditer(text)
@@ -0,0 +1,161 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from openai.types.chat import ChatCompletion
+
+# Shared cache of chat completions, keyed on model + messages + parameters
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+LLM_CACHE_DB = CACHE_DIR / "llm_cache.sqlite"
+
+CACHE_TTL_SECONDS = 7 * 24 * 3600      # answers older than this are asked again
+MAX_CACHE_BYTES = 100 * 1024 * 1024    # compressed responses beyond this are evicted, least recently used first
+
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _connect() -> sqlite3.Connection:
+    conn = sqlite3.connect(LLM_CACHE_DB, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            response BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0,
+            stored_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )
+    """)
+    return conn
+
+
+@contextmanager
+def _db():
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+
+def cache_key(params: Dict) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _lookup(key: str, ttl: float) -> Optional[ChatCompletion]:
+    with _db() as conn:
+        row = conn.execute("SELECT response, stored_at FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[1] > ttl:
+            return None
+        conn.execute("UPDATE responses SET hits = hits + 1, accessed_at = ? WHERE key = ?", (time.time(), key))
+    return ChatCompletion.model_validate_json(zlib.decompress(row[0]))
+
+
+def _store(key: str, model: str, response: ChatCompletion):
+    blob = zlib.compress(response.model_dump_json().encode("utf-8"))
+    now = time.time()
+    with _db() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, size, hits, stored_at, accessed_at) "
+            "VALUES (?, ?, ?, ?, 0, ?, ?)",
+            (key, model, blob, len(blob), now, now)
+        )
+        _evict(conn)
+
+
+def _evict(conn: sqlite3.Connection):
+    conn.execute("DELETE FROM responses WHERE stored_at < ?", (time.time() - CACHE_TTL_SECONDS,))
+    total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+    if total <= MAX_CACHE_BYTES:
+        return
+    for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+        conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+        total -= size
+        if total <= MAX_CACHE_BYTES:
+            break
+
+
+def is_valid(response: ChatCompletion, validate: Optional[Callable] = None) -> bool:
+    """
+    True for answers worth caching: every choice finished with "stop" (not cut off by
+    max_tokens or a content filter) and `validate(response)`, if given, does not raise.
+    """
+    if not response.choices or any(choice.finish_reason != "stop" for choice in response.choices):
+        return False
+    if validate is not None:
+        try:
+            validate(response)
+        except Exception:
+            return False
+    return True
+
+
+def lookup(params: Dict, ttl: float = CACHE_TTL_SECONDS, validate: Optional[Callable] = None) -> Optional[ChatCompletion]:
+    """Cached answer for a request, e.g. to skip it when building a batch job."""
+    cached = _lookup(cache_key(params), ttl)
+    if cached is not None and not is_valid(cached, validate):
+        cached = None  # stored before validation existed, or by a caller with looser checks
+    _count("hits" if cached is not None else "misses")
+    return cached
+
+
+def store(params: Dict, response: ChatCompletion, validate: Optional[Callable] = None) -> bool:
+    """Cache an answer obtained outside chat_completion (e.g. from a batch job), if it is valid."""
+    if not is_valid(response, validate):
+        return False
+    _store(cache_key(params), params.get("model", ""), response)
+    return True
+
+
+def chat_completion(client, bypass: bool = False, ttl: float = CACHE_TTL_SECONDS,
+                    validate: Optional[Callable] = None, **params) -> ChatCompletion:
+    """
+    Drop-in for client.chat.completions.create(**params) that answers repeated requests
+    from the cache. bypass=True always calls the API (and refreshes the cached answer).
+    Failed calls, truncated answers and answers `validate` rejects (e.g. the caller's
+    JSON parser raising) are returned but never cached, so a retry asks again.
+    """
+    if bypass:
+        _count("bypassed")
+    else:
+        cached = lookup(params, ttl, validate)
+        if cached is not None:
+            return cached
+
+    response = client.chat.completions.create(**params)
+    store(params, response, validate)
+    return response
+
+
+def stats() -> Dict:
+    """Hit/miss counters for this process, plus the size of the persistent cache."""
+    with _db() as conn:
+        entries, size, lifetime_hits = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(hits), 0) FROM responses"
+        ).fetchone()
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters["hits"] + counters["misses"]
+    return {
+        **counters,
+        "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+        "entries": entries,
+        "bytes": size,
+        "lifetime_hits": lifetime_hits,
+    }
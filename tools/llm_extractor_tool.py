@@ -2,47 +2,26 @@ import os
 import re
 import json
 import pandas as pd
-from datetime import datetime
-from pathlib import Path
-from urllib.parse import urlparse
-from difflib import get_close_matches
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field
-from typing import List, Dict
+from typing import List, Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
 from crewai.tools import BaseTool
+from tools import artifact_store, extraction_snapshot, llm_cache, template_cache
+from tools.link_index import LinkIndex
+from tools.listing_segmenter import CONFIDENCE_THRESHOLD
+from tools.text_chunker import LINK_MARKER, count_tokens, item_boundaries, split_items, split_on_items
 
 # Load API key
 load_dotenv("C:/Users/hp/Documents/Agent Router Tools/.env")
 client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-# Output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+# Concurrent LLM calls per page, and the answer budget per call
+MAX_PARALLEL_CHUNKS = 4
+MAX_OUTPUT_TOKENS = 4096
 
-# Input model
-class LLMExtractorInput(BaseModel):
-    url: str = Field(..., description="Original URL")
-    extracted_file: str = Field(..., description="Path to .txt file generated by HTML Extractor")
-
-# Tool
-class LLMExtractorTool(BaseTool):
-    name: str = "llm_extractor_tool"
-    description: str = "Extracts structured regulatory updates from extracted text and inferred links"
-    args_schema: type = LLMExtractorInput
-
-    def _run(self, url: str, extracted_file: str) -> Dict:
-        if not os.path.exists(extracted_file):
-            raise FileNotFoundError(f"❌ Extracted .txt file not found: {extracted_file}")
-
-        with open(extracted_file, "r", encoding="utf-8") as f:
-            extracted_text = f.read()
-
-        # Extract links using regex
-        extracted_links = re.findall(r'\((https?://[^\s)]+)\)', extracted_text)
-
-        # Construct prompt for LLM
-        prompt = f"""
+PROMPT_TEMPLATE = """
 You are a regulatory update extraction assistant.
 
 From the following DOCUMENT CONTENT, extract each distinct regulatory update.
@@ -56,53 +35,223 @@ Return the output as a strict JSON array of objects, each with the following key
 ⚠️ Do not include any explanatory text or markdown. Output must start with [ and end with ].
 ⚠️ Ensure all string values are wrapped in double quotes. Escape any internal quotes.
 
-Known links to choose from: {json.dumps(extracted_links)}
+Known links to choose from: {links}
 
 DOCUMENT CONTENT:
 \"\"\"
-{extracted_text}
+{text}
 \"\"\"
 """
 
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You extract structured regulatory updates from documents."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,
-                max_tokens=4096
+
+class TruncatedOutput(Exception):
+    pass
+
+
+def _parse_items(response) -> List[dict]:
+    choice = response.choices[0]
+    if choice.finish_reason == "length":
+        raise TruncatedOutput("answer hit max_tokens")
+    raw = choice.message.content.strip()
+    cleaned = re.sub(r"^```json|```$", "", raw.strip(), flags=re.MULTILINE).strip()
+    return json.loads(cleaned)
+
+
+def _call_llm(text: str, links: List[str], bypass_cache: bool = False) -> List[dict]:
+    response = llm_cache.chat_completion(
+        client,
+        bypass=bypass_cache,
+        validate=_parse_items,
+        model="gpt-4o-mini",
+        messages=[
+            {"role": "system", "content": "You extract structured regulatory updates from documents."},
+            {"role": "user", "content": PROMPT_TEMPLATE.format(links=json.dumps(links), text=text)}
+        ],
+        temperature=0.2,
+        max_tokens=MAX_OUTPUT_TOKENS
+    )
+    return _parse_items(response)
+
+
+def _extract_chunk(chunk: str, all_links: List[str], retries: int = 1, bypass_cache: bool = False) -> tuple[List[dict], bool]:
+    """
+    Extract one chunk; a truncated or malformed answer is retried as two smaller chunks.
+    Returns the items and whether the whole chunk was extracted.
+    """
+    # Only offer the links that occur in this chunk (all links if it has none, e.g. plain prose)
+    links = list(dict.fromkeys(LINK_MARKER.findall(chunk))) or all_links
+    try:
+        return _call_llm(chunk, links, bypass_cache), True
+    except (TruncatedOutput, json.JSONDecodeError) as e:
+        halves = split_on_items(chunk, max_tokens=count_tokens(chunk) // 2 + 1,
+                                max_items=max(1, len(item_boundaries(chunk)) // 2))
+        if retries <= 0 or len(halves) < 2:
+            print(f"⚠️ LLM extraction failed for a chunk: {e}")
+            return [], False
+        print(f"⚠️ {e}; retrying chunk as {len(halves)} smaller chunks")
+        results = [_extract_chunk(half, all_links, retries - 1, bypass_cache) for half in halves]
+        return [item for items, _ in results for item in items], all(ok for _, ok in results)
+    except Exception as e:
+        print(f"⚠️ LLM extraction failed for a chunk: {e}")
+        return [], False
+
+
+def link_key(link) -> str:
+    """Comparable form of a link: the LLM and the page may differ by whitespace or a trailing "/"."""
+    return str(link or "").strip().rstrip("/")
+
+
+def item_key(item: dict):
+    """Items are the same update if they share a link (or, without one, topic and date)."""
+    return link_key(item.get("link")) or (str(item.get("topic", "")).strip().lower(), item.get("date"))
+
+
+def merge_items(results: List[List[dict]]) -> List[dict]:
+    """
+    Merge per-chunk answers of one extraction in page order. The merged item keeps every
+    non-empty field and the longest context, since overlapping chunks may each have seen
+    only part of an item.
+    """
+    merged = {}
+    for items in results:
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            existing = merged.setdefault(item_key(item), dict(item))
+            for field, value in item.items():
+                if value and not existing.get(field):
+                    existing[field] = value
+            if len(str(item.get("additional_context") or "")) > len(str(existing.get("additional_context") or "")):
+                existing["additional_context"] = item["additional_context"]
+    return list(merged.values())
+
+
+# Input model
+class LLMExtractorInput(BaseModel):
+    url: str = Field(..., description="Original URL")
+    extracted_file: Optional[str] = Field(None, description="Path to .txt file generated by HTML Extractor")
+    extracted_text: Optional[str] = Field(None, description="Extracted text passed in memory instead of a file")
+    extracted_links: Optional[List[str]] = Field(None, description="Links found by the extractor, if already known")
+    link_records: Optional[List[dict]] = Field(None, description="Structured anchor records from the HTML extractor")
+    listing_items: Optional[List[dict]] = Field(None, description="Update records found by listing segmentation")
+    listing_confidence: float = Field(0.0, description="Segmentation confidence; at or above the threshold the LLM is skipped")
+    content_fingerprint: Optional[str] = Field(None, description="Fingerprint of the extracted text, computed if missing")
+    bypass_cache: bool = Field(False, description="Always call the LLM instead of reusing cached answers")
+    template_mode: Optional[str] = Field(None, description="Extraction tree the link records came from; set to learn a listing template")
+    save_snapshot: bool = Field(True, description="Store the extraction snapshot now; if False the caller saves the returned snapshot once the run succeeds")
+
+# Tool
+class LLMExtractorTool(BaseTool):
+    name: str = "llm_extractor_tool"
+    description: str = "Extracts structured regulatory updates from extracted text and inferred links"
+    args_schema: type = LLMExtractorInput
+
+    def _run(self, url: str, extracted_file: Optional[str] = None, extracted_text: Optional[str] = None,
+             extracted_links: Optional[List[str]] = None, link_records: Optional[List[dict]] = None,
+             listing_items: Optional[List[dict]] = None, listing_confidence: float = 0.0,
+             content_fingerprint: Optional[str] = None, bypass_cache: bool = False,
+             template_mode: Optional[str] = None, save_snapshot: bool = True) -> Dict:
+        columns = ["date", "topic", "additional_context", "link", "regulator"]
+
+        # Repeated date + title + link blocks were segmented deterministically: no LLM call needed
+        if listing_items and listing_confidence >= CONFIDENCE_THRESHOLD:
+            df = pd.DataFrame(listing_items, columns=columns)
+            snapshot = None
+            if extracted_text is not None:
+                snapshot = self._snapshot(url, extracted_text, content_fingerprint, listing_items, save=save_snapshot)
+            output_path = artifact_store.put(url or "unknown", "llm_output", df.to_csv(index=False), suffix=".csv")
+            print(f"⚡ Listing segmented with confidence {listing_confidence:.2f}, skipped LLM: {len(df)} updates saved to: {output_path}")
+            return {
+                "url": url,
+                "output_file": output_path,
+                "snapshot": snapshot
+            }
+
+        if extracted_text is None:
+            if not extracted_file or not os.path.exists(extracted_file):
+                raise FileNotFoundError(f"❌ Extracted .txt file not found: {extracted_file}")
+            extracted_text = artifact_store.read_text(extracted_file)
+
+        # Extract links using regex, unless the extractor already handed them over
+        if extracted_links is None and link_records:
+            extracted_links = list(dict.fromkeys(r["href"] for r in link_records))
+        if extracted_links is None:
+            extracted_links = LINK_MARKER.findall(extracted_text)
+
+        # Only blocks that are new since the last snapshot go to the LLM
+        segments = split_items(extracted_text)
+        hashes = [extraction_snapshot.segment_hash(s) for s in segments]
+        snapshot = extraction_snapshot.load(url)
+        resend = extraction_snapshot.changed_segments(hashes, snapshot) if snapshot else None
+        if resend is None:
+            parsed, complete = self._extract(extracted_text, extracted_links, bypass_cache)
+        else:
+            print(f"🧩 {len(resend)} of {len(segments)} blocks changed since the last run")
+            new_items, complete = (
+                self._extract(" ".join(segments[i] for i in resend), extracted_links, bypass_cache) if resend else ([], True)
             )
-            raw = response.choices[0].message.content.strip()
-            cleaned = re.sub(r"^```json|```$", "", raw.strip(), flags=re.MULTILINE).strip()
-            parsed = json.loads(cleaned)
-
-            # Patch missing values and fuzzy match if link is blank
-            for item in parsed:
-                if "additional_context" not in item:
-                    item["additional_context"] = ""
-                if "link" not in item or not item["link"].strip():
-                    topic = item.get("topic", "").lower()
-                    match = get_close_matches(topic, extracted_links, n=1, cutoff=0.3)
-                    item["link"] = match[0] if match else ""
-
-            df = pd.DataFrame(parsed, columns=["date", "topic", "additional_context", "link", "regulator"])
-
-        except Exception as e:
-            print(f"⚠️ LLM extraction failed: {e}")
-            df = pd.DataFrame(columns=["date", "topic", "additional_context", "link", "regulator"])
-
-        domain = urlparse(url).netloc.replace('.', '_') if url else "unknown"
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        output_path = OUTPUT_DIR / f"{domain}_llm_output_{timestamp}.csv"
-        df.to_csv(output_path, index=False, encoding="utf-8-sig")
+            # Fresh answers win over stored records; items that left the page are dropped
+            on_page = {link_key(link) for link in extracted_links}
+            kept = [r for r in snapshot["records"] if not link_key(r.get("link")) or link_key(r["link"]) in on_page]
+            fresh = {item_key(item) for item in new_items}
+            parsed = new_items + [r for r in kept if item_key(r) not in fresh]
+            position = {}
+            for i, link in enumerate(extracted_links):
+                position.setdefault(link_key(link), i)
+            parsed.sort(key=lambda item: position.get(link_key(item.get("link")), len(position)))
+
+        # Patch missing values and resolve blank links through the anchor-text index
+        link_index = None
+        for item in parsed:
+            if "additional_context" not in item:
+                item["additional_context"] = ""
+            if not str(item.get("link") or "").strip():
+                if link_index is None:
+                    link_index = LinkIndex.from_link_records(link_records) if link_records else LinkIndex.from_links(extracted_links)
+                item["link"] = link_index.resolve(str(item.get("topic") or "")) or ""
+
+        df = pd.DataFrame(parsed, columns=columns)
+
+        # Remember where the items sit in the page so the next run can skip the LLM (only from a fully answered page)
+        if parsed and complete and link_records and template_mode:
+            template_cache.learn(url, parsed, link_records, template_mode)
+        # A partly failed run is not snapshotted, so its blocks are retried next time
+        new_snapshot = None
+        if parsed and complete:
+            new_snapshot = self._snapshot(url, extracted_text, content_fingerprint, parsed, hashes, save=save_snapshot)
+
+        output_path = artifact_store.put(url or "unknown", "llm_output", df.to_csv(index=False), suffix=".csv")
 
         print(f"✅ LLM-extracted data saved to: {output_path}")
         return {
             "url": url,
-            "output_file": str(output_path)
+            "output_file": output_path,
+            "snapshot": new_snapshot
+        }
+
+    def _extract(self, text: str, links: List[str], bypass_cache: bool = False) -> tuple[List[dict], bool]:
+        chunks = split_on_items(text)
+        if len(chunks) > 1:
+            print(f"✂️ Splitting {count_tokens(text)} tokens into {len(chunks)} chunks")
+
+        # Chunks run concurrently, so latency follows the largest chunk, not the page size
+        with ThreadPoolExecutor(max_workers=MAX_PARALLEL_CHUNKS) as pool:
+            results = list(pool.map(lambda chunk: _extract_chunk(chunk, links, bypass_cache=bypass_cache), chunks))
+        return merge_items([items for items, _ in results]), all(ok for _, ok in results)
+
+    def _snapshot(self, url: str, text: str, content_fingerprint: Optional[str], records: List[dict],
+                  hashes: Optional[List[str]] = None, save: bool = True) -> Dict:
+        if hashes is None:
+            hashes = [extraction_snapshot.segment_hash(s) for s in split_items(text)]
+        snapshot = {
+            "url": url,
+            "content_fingerprint": content_fingerprint or extraction_snapshot.fingerprint(text),
+            "segment_hashes": hashes,
+            "records": records
         }
+        if save:
+            extraction_snapshot.save(**snapshot)
+        return snapshot
 
 # Optional instance
 llm_extractor_tool = LLMExtractorTool()
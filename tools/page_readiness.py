@@ -0,0 +1,153 @@
+import atexit
+import json
+import time
+from pathlib import Path
+from typing import Dict, Tuple
+from urllib.parse import urlparse
+
+# Per-domain readiness stats live next to the other scraper caches
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+READINESS_FILE = CACHE_DIR / "page_readiness.json"
+
+# Upper bound for any readiness strategy, in milliseconds
+READY_TIMEOUT_MS = 10000
+# A page counts as settled after this long without DOM mutations
+DOM_QUIET_MS = 500
+# A mode "still works" if it finds at least this share of the best anchor count seen on the domain
+MIN_ANCHOR_RATIO = 0.9
+# Weight of the newest visit in the running averages
+SMOOTHING = 0.3
+# Stats are written to disk every this many visits, and at exit
+SAVE_EVERY_VISITS = 20
+
+# Optional per-domain selectors that mark the main content as rendered
+READY_SELECTORS: Dict[str, str] = {
+    # "www.example.gov": "div.press-release-list",
+}
+
+# Tried in this order on the first visits to a domain
+STRATEGIES = ["dom_quiet", "network_idle", "selector"]
+
+_DOM_QUIET_JS = """([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quiet;
+    const done = () => { observer.disconnect(); clearTimeout(quiet); clearTimeout(cap); resolve(); };
+    const observer = new MutationObserver(() => { clearTimeout(quiet); quiet = setTimeout(done, quietMs); });
+    observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+    quiet = setTimeout(done, quietMs);
+    const cap = setTimeout(done, timeoutMs);
+})"""
+
+
+async def wait_network_idle(page, timeout_ms: int = READY_TIMEOUT_MS):
+    try:
+        await page.wait_for_load_state("networkidle", timeout=timeout_ms)
+    except Exception:
+        pass  # long-polling pages never go idle; the timeout is the upper bound
+
+
+async def wait_dom_quiet(page, timeout_ms: int = READY_TIMEOUT_MS, quiet_ms: int = DOM_QUIET_MS):
+    try:
+        await page.evaluate(_DOM_QUIET_JS, [quiet_ms, timeout_ms])
+    except Exception:
+        # A client-side redirect destroys the execution context mid-wait; settle on the new page's load
+        try:
+            await page.wait_for_load_state("load", timeout=timeout_ms)
+        except Exception:
+            pass
+
+
+async def wait_selector(page, selector: str, timeout_ms: int = READY_TIMEOUT_MS):
+    try:
+        await page.wait_for_selector(selector, timeout=timeout_ms)
+    except Exception:
+        pass
+
+
+class ReadinessTracker:
+    """Remembers how long each strategy took per domain and how much content it produced."""
+
+    def __init__(self, path: Path = READINESS_FILE):
+        self.path = path
+        try:
+            self.stats = json.loads(path.read_text(encoding="utf-8"))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats = {}
+        self._unsaved = 0
+
+    def _candidates(self, domain: str):
+        return [m for m in STRATEGIES if m != "selector" or domain in READY_SELECTORS]
+
+    def choose(self, domain: str) -> str:
+        modes = self.stats.get(domain, {})
+        candidates = self._candidates(domain)
+
+        # Try every applicable strategy once before settling on one
+        for mode in candidates:
+            if mode not in modes:
+                return mode
+
+        best_anchors = max(modes[m]["avg_anchors"] for m in candidates)
+        working = [m for m in candidates if modes[m]["avg_anchors"] >= MIN_ANCHOR_RATIO * best_anchors]
+        return min(working, key=lambda m: modes[m]["avg_ms"])
+
+    def record(self, domain: str, mode: str, ready_ms: float, anchors: int):
+        entry = self.stats.setdefault(domain, {}).get(mode)
+        if entry is None:
+            entry = {"visits": 0, "avg_ms": ready_ms, "avg_anchors": anchors}
+        else:
+            entry["avg_ms"] += SMOOTHING * (ready_ms - entry["avg_ms"])
+            entry["avg_anchors"] += SMOOTHING * (anchors - entry["avg_anchors"])
+        entry["visits"] += 1
+        entry["last_ms"] = round(ready_ms)
+        self.stats[domain][mode] = entry
+
+        self._unsaved += 1
+        if self._unsaved >= SAVE_EVERY_VISITS:
+            self.save()
+
+    def save(self):
+        if self._unsaved:
+            self.path.write_text(json.dumps(self.stats, indent=2), encoding="utf-8")
+            self._unsaved = 0
+
+
+_tracker = None
+
+
+def get_readiness_tracker() -> ReadinessTracker:
+    global _tracker
+    if _tracker is None:
+        _tracker = ReadinessTracker()
+        atexit.register(_tracker.save)
+    return _tracker
+
+
+async def goto_and_wait(page, url: str, timeout_ms: int = 60000) -> Tuple[str, float]:
+    """
+    Navigate to `url` and wait until the page is ready using the best known strategy
+    for its domain. Returns the strategy used and the measured ready time in ms.
+    """
+    domain = urlparse(url).netloc
+    tracker = get_readiness_tracker()
+    mode = tracker.choose(domain)
+
+    start = time.perf_counter()
+    await page.goto(url, timeout=timeout_ms, wait_until="domcontentloaded")
+    if mode == "network_idle":
+        await wait_network_idle(page)
+    elif mode == "selector":
+        await wait_selector(page, READY_SELECTORS[domain])
+    else:
+        await wait_dom_quiet(page)
+    ready_ms = (time.perf_counter() - start) * 1000
+
+    try:
+        anchors = await page.evaluate("document.querySelectorAll('a[href]').length")
+    except Exception as e:
+        # Still navigating: don't let a half-loaded page skew the domain's stats
+        print(f"⚠️ Could not count links on {url}: {e}")
+        return mode, ready_ms
+    tracker.record(domain, mode, ready_ms, anchors)
+    print(f"⏱️ {domain} ready via {mode} in {ready_ms:.0f} ms ({anchors} links)")
+    return mode, ready_ms
@@ -0,0 +1,112 @@
+from collections import Counter
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Resource types that never reach CleanerTool
+BLOCKED_RESOURCE_TYPES = {"image", "media", "font"}
+
+# Analytics, tag managers and ad networks
+BLOCKED_DOMAINS = [
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "googlesyndication.com",
+    "adservice.google.com",
+    "facebook.net",
+    "connect.facebook.net",
+    "hotjar.com",
+    "newrelic.com",
+    "nr-data.net",
+    "segment.io",
+    "siteimprove.com",
+    "siteimproveanalytics.com",
+    "quantserve.com",
+    "scorecardresearch.com",
+]
+
+# Per-site overrides for pages that break with the default policy, e.g.
+#   "www.example.gov": {"allow_types": ["font"], "allow_domains": ["googletagmanager.com"]},
+#   "www.other.gov": {"disabled": True},
+DOMAIN_OVERRIDES: Dict[str, Dict] = {}
+
+# Blocked requests are never downloaded, so bytes saved are estimated per resource type
+ESTIMATED_BYTES = {
+    "image": 40_000,
+    "media": 500_000,
+    "font": 30_000,
+    "stylesheet": 20_000,
+    "script": 50_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+
+def _matches(host: str, domains) -> bool:
+    return any(host == d or host.endswith("." + d) for d in domains)
+
+
+def block_reason(site_domain: str, resource_type: str, request_url: str) -> Optional[str]:
+    """Return why a request should be blocked for a page on `site_domain`, or None to allow it."""
+    override = DOMAIN_OVERRIDES.get(site_domain, {})
+    if override.get("disabled"):
+        return None
+
+    if resource_type in BLOCKED_RESOURCE_TYPES and resource_type not in override.get("allow_types", []):
+        return resource_type
+
+    host = urlparse(request_url).netloc.split(":")[0]
+    if host != site_domain and _matches(host, BLOCKED_DOMAINS) and not _matches(host, override.get("allow_domains", [])):
+        return "third_party"
+    return None
+
+
+class BlockingStats:
+    """Running counters of blocked requests and estimated bytes saved."""
+
+    def __init__(self):
+        self.requests_seen = 0
+        self.requests_blocked = 0
+        self.bytes_saved = 0
+        self.by_reason = Counter()
+
+    def record(self, resource_type: str, reason: Optional[str]):
+        self.requests_seen += 1
+        if reason:
+            self.requests_blocked += 1
+            self.bytes_saved += ESTIMATED_BYTES.get(resource_type, DEFAULT_ESTIMATED_BYTES)
+            self.by_reason[reason] += 1
+
+    def summary(self) -> Dict:
+        return {
+            "requests_seen": self.requests_seen,
+            "requests_blocked": self.requests_blocked,
+            "estimated_bytes_saved": self.bytes_saved,
+            "blocked_by_reason": dict(self.by_reason),
+        }
+
+
+# Totals across every page scraped by this process
+blocking_stats = BlockingStats()
+
+
+async def install_request_blocking(page, target_url: str) -> BlockingStats:
+    """
+    Route every request of `page` through the blocking policy for `target_url`'s domain.
+    Returns the per-page counters; call `page.unroute("**/*")` before reusing the page.
+    """
+    site_domain = urlparse(target_url).netloc.split(":")[0]
+    page_stats = BlockingStats()
+
+    async def handle(route):
+        request = route.request
+        reason = block_reason(site_domain, request.resource_type, request.url)
+        page_stats.record(request.resource_type, reason)
+        blocking_stats.record(request.resource_type, reason)
+        if reason:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await page.route("**/*", handle)
+    return page_stats
@@ -0,0 +1,110 @@
+import json
+import re
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urljoin, urlparse
+
+# Route decisions per URL (and per domain for pages sniffing could not settle) live with the other caches
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+ROUTES_FILE = CACHE_DIR / "routes.json"
+
+# Re-check a route after this long, in case a site moved its feed or redesigned
+ROUTE_TTL = timedelta(days=7)
+
+FEED_CONTENT_TYPES = ("application/rss+xml", "application/atom+xml", "application/rdf+xml", "application/feed+json")
+FEED_ROOTS = {"rss", "feed", "rdf"}  # <rss>, Atom <feed>, RSS 1.0 <rdf:RDF>
+FEED_SUFFIXES = (".xml", ".rss", ".atom", ".rdf")
+
+# Everything before the root element: BOM (also as decoded by a Latin-1 fallback), XML declaration,
+# processing instructions, comments, doctype
+_PROLOG = re.compile(r"^(?:\ufeff|\xef\xbb\xbf|\s+|<\?.*?\?>|<!--.*?-->|<!DOCTYPE[^>]*>)*", re.IGNORECASE | re.DOTALL)
+_ROOT = re.compile(r"<\s*([A-Za-z_][\w.:-]*)")
+_LINK_TAG = re.compile(r"<link\b[^>]*>", re.IGNORECASE)
+_ATTR = re.compile(r"""([\w-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))""")
+
+_lock = threading.Lock()
+
+
+def root_element(text: str) -> Optional[str]:
+    """Local name of the document's root element, lower-cased (e.g. "rss", "feed", "rdf", "html")."""
+    match = _ROOT.match(text[_PROLOG.match(text).end():] if text else "")
+    return match.group(1).split(":")[-1].lower() if match else None
+
+
+def discover_feeds(html: str, base_url: str) -> List[str]:
+    """Feed URLs advertised with <link rel="alternate" type="application/rss+xml|atom+xml"> in a page's HTML."""
+    feeds = []
+    for tag in _LINK_TAG.findall(html):
+        attrs = {name.lower(): next(v for v in values if v is not None) for name, *values in _ATTR.findall(tag)}
+        rel = attrs.get("rel", "").lower().split()
+        if "alternate" in rel and attrs.get("type", "").lower() in FEED_CONTENT_TYPES and attrs.get("href"):
+            feeds.append(urljoin(base_url, attrs["href"]))
+    return list(dict.fromkeys(feeds))
+
+
+def sniff(response: Dict) -> Optional[Dict]:
+    """
+    Deterministic route for a fetched response (http_fetcher.fetch_url result):
+    {"route", "reason", "feed_url"}, or None when neither the Content-Type nor the
+    document's root element settles it.
+    """
+    content_type = (response.get("content_type") or "").split(";")[0].strip().lower()
+    text = response.get("text") or ""
+    if content_type in FEED_CONTENT_TYPES:
+        return {"route": "rss", "reason": f"Content-Type {content_type}", "feed_url": response["url"]}
+
+    root = root_element(text[:4096])
+    if root in FEED_ROOTS:
+        return {"route": "rss", "reason": f"<{root}> root element", "feed_url": response["url"]}
+    if '"version"' in text[:512] and "jsonfeed.org/version" in text[:512]:
+        return {"route": "rss", "reason": "JSON Feed document", "feed_url": response["url"]}
+
+    if root == "html" or content_type in ("text/html", "application/xhtml+xml"):
+        feeds = discover_feeds(text, response["url"])
+        # The page stays a web page; an advertised feed is reported for callers that prefer it
+        return {"route": "web", "reason": "HTML page", "feed_url": feeds[0] if feeds else None}
+    return None
+
+
+def looks_like_feed_url(url: str) -> bool:
+    """Weak hint from the URL alone, used only when the URL cannot be fetched."""
+    path = urlparse(url).path.lower()
+    return path.endswith(FEED_SUFFIXES) or any(part in ("rss", "feed", "atom") for part in path.split("/"))
+
+
+def _load() -> Dict:
+    try:
+        return json.loads(ROUTES_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _fresh(entry: Optional[Dict]) -> Optional[Dict]:
+    if not entry or datetime.now() - datetime.fromisoformat(entry["updated"]) > ROUTE_TTL:
+        return None
+    return entry
+
+
+def get_route(url: str) -> Optional[Dict]:
+    """Cached {"route", "source", "reason", "feed_url"} for a URL, or None if unknown or stale."""
+    with _lock:
+        return _fresh(_load().get("urls", {}).get(url))
+
+
+def get_domain_route(domain: str) -> Optional[Dict]:
+    """How ambiguous (unsniffable) URLs on a domain were routed last time."""
+    with _lock:
+        return _fresh(_load().get("domains", {}).get(domain))
+
+
+def set_route(url: str, decision: Dict, domain_wide: bool = False):
+    entry = {**decision, "updated": datetime.now().isoformat(timespec="seconds")}
+    with _lock:
+        routes = _load()
+        routes.setdefault("urls", {})[url] = entry
+        if domain_wide:
+            routes.setdefault("domains", {})[urlparse(url).netloc] = entry
+        ROUTES_FILE.write_text(json.dumps(routes, indent=2), encoding="utf-8")
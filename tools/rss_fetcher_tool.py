@@ -1,55 +1,174 @@
+import html
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
 import feedparser
+import pandas as pd
 from pydantic import BaseModel, Field
-from typing import List, Dict
-from urllib.parse import urlparse
-from pathlib import Path
 from crewai.tools import BaseTool
+from tools import artifact_store, http_fetcher
+from tools.listing_segmenter import regulator_for
+
+# Per-feed body digest and last records, so unchanged feeds reuse the records without parsing
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+FEED_STATE_FILE = CACHE_DIR / "feed_state.json"
+
+MAX_PARALLEL_FEEDS = 8
+FEED_TIMEOUT_SECONDS = 15
+MAX_CONTEXT_CHARS = 1000
+COLUMNS = ["date", "topic", "additional_context", "link", "regulator"]
+
+_lock = threading.Lock()
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _load_state() -> Dict:
+    try:
+        return json.loads(FEED_STATE_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_feed_states(entries: Dict[str, Dict]):
+    """Store polled feeds' digests and records (feed_url -> entry), as returned in "feed_states"."""
+    if not entries:
+        return
+    with _lock:
+        state = _load_state()
+        state.update(entries)
+        FEED_STATE_FILE.write_text(json.dumps(state, indent=2), encoding="utf-8")
+
+
+def _plain(text: str) -> str:
+    return " ".join(html.unescape(_TAGS.sub(" ", text or "")).split())
+
 
-# ✅ Absolute path to save RSS outputs
-OUTPUT_DIR = Path(r"C:\Users\hp\Documents\Agent Store 1 - Copy\regulatory_outputs\site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+def entry_record(entry, regulator: str) -> Optional[Dict]:
+    """Map a feedparser entry to the date/topic/additional_context/link/regulator record the LLM extractor produces."""
+    link = entry.get("link") or ""
+    if not link.startswith(("http://", "https://")) and str(entry.get("id", "")).startswith(("http://", "https://")):
+        link = entry["id"]
+    topic = _plain(entry.get("title", ""))
+    if not topic or not link:
+        return None
+
+    parsed_date = entry.get("published_parsed") or entry.get("updated_parsed")
+    if parsed_date:
+        date = time.strftime("%Y-%m-%d", parsed_date)
+    else:
+        date = entry.get("published", "") or entry.get("updated", "")
+
+    summary = entry.get("summary", "") or (entry.get("content") or [{}])[0].get("value", "")
+    return {
+        "date": date,
+        "topic": topic,
+        "additional_context": _plain(summary)[:MAX_CONTEXT_CHARS],
+        "link": link,
+        "regulator": regulator,
+    }
+
+
+def poll_feed(feed_url: str, bypass_cache: bool = False, save_state: bool = True) -> Dict:
+    """
+    Fetch one feed through http_fetcher, which revalidates with ETag / Last-Modified and
+    reuses the response the router fetched moments ago. Returns {"url", "status",
+    "not_modified", "records", "error", "state"}; a body unchanged since the last stored
+    poll returns the records stored then. Otherwise "state" is the entry to store for the
+    next poll; with save_state=False the caller stores it once the records are processed.
+    """
+    with _lock:
+        previous = {} if bypass_cache else _load_state().get(feed_url, {})
+
+    response = http_fetcher.fetch_url(feed_url, timeout=FEED_TIMEOUT_SECONDS)
+    if response is None:
+        return {"url": feed_url, "status": None, "not_modified": False, "records": [], "error": "fetch failed", "state": None}
+    if response["status"] not in (200, 304):
+        print(f"⚠️ Feed {feed_url} returned HTTP {response['status']}")
+        return {"url": feed_url, "status": response["status"], "not_modified": False, "records": [],
+                "error": f"HTTP {response['status']}", "state": None}
+    if previous.get("digest") == response["digest"] and "records" in previous:
+        return {"url": feed_url, "status": response["status"], "not_modified": True, "records": previous["records"],
+                "error": None, "state": None}
+
+    # The body is already decoded: tell feedparser it is UTF-8 so an XML encoding declaration
+    # does not re-decode it; content-location lets it resolve relative entry links
+    media_type = response["content_type"].split(";")[0].strip()
+    response_headers = {
+        "content-type": f"{media_type if 'xml' in media_type else 'application/xml'}; charset=utf-8",
+        "content-location": feed_url,
+    }
+    parsed = feedparser.parse(response["text"].encode("utf-8"), response_headers=response_headers)
+    if parsed.bozo and not parsed.entries:
+        print(f"⚠️ Could not parse feed {feed_url}: {parsed.get('bozo_exception')}")
+        return {"url": feed_url, "status": 200, "not_modified": False, "records": [],
+                "error": str(parsed.get("bozo_exception")), "state": None}
+
+    regulator = regulator_for(feed_url)
+    records = [r for r in (entry_record(entry, regulator) for entry in parsed.entries) if r]
+    state = {
+        "digest": response["digest"],
+        "records": records,
+        "polled_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    if save_state:
+        save_feed_states({feed_url: state})
+    return {"url": feed_url, "status": 200, "not_modified": False, "records": records, "error": None, "state": state}
+
+
+def poll_feeds(feed_urls: List[str], bypass_cache: bool = False, save_state: bool = True) -> List[Dict]:
+    """Poll many feeds concurrently; results come back in input order."""
+    feed_urls = list(dict.fromkeys(feed_urls))
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_FEEDS) as pool:
+        return list(pool.map(lambda feed_url: poll_feed(feed_url, bypass_cache, save_state), feed_urls))
 
 
 class RSSFetcherInput(BaseModel):
     url: str = Field(..., description="URL of the RSS or Atom feed")
+    feed_urls: List[str] = Field(default_factory=list, description="More feeds to poll alongside url, merged into one file")
+    max_entries: Optional[int] = Field(None, description="Keep only the first N records (default: all)")
+    bypass_cache: bool = Field(False, description="Parse the feeds even if unchanged since the last stored poll")
+    save_state: bool = Field(True, description="Store the feeds' digests and records now; if False the caller saves the returned feed_states once the records are processed")
 
 
 class RSSFetcherTool(BaseTool):
     name: str = "rss_fetcher_tool"
-    description: str = "Fetches and parses RSS/Atom feed content for LLM extraction"
+    description: str = "Polls RSS/Atom feeds and maps their entries straight to update records, without scraping or LLM extraction"
     args_schema: type = RSSFetcherInput
 
-    def _run(self, url: str) -> Dict:
-        parsed = feedparser.parse(url)
-        entries = parsed.entries[:25]
-
-        result_lines = []
-        links = []
-
-        for entry in entries:
-            title = entry.get("title", "")
-            summary = entry.get("summary", "") or entry.get("content", [{}])[0].get("value", "")
-            link = entry.get("link", "")
-            date = entry.get("published", "") or entry.get("updated", "")
-            result_lines.append(f"Title: {title}\nDate: {date}\nSummary: {summary}\nLink: {link}\n---\n")
-            if link:
-                links.append(link)
+    def _run(self, url: str, feed_urls: List[str] = None, max_entries: Optional[int] = None,
+             bypass_cache: bool = False, save_state: bool = True) -> Dict:
+        results = poll_feeds([url] + list(feed_urls or []), bypass_cache, save_state)
 
-        visible_text = "\n".join(result_lines)
-        unique_links = list(set(links))
+        records, seen = [], set()
+        for result in results:
+            for record in result["records"]:
+                if record["link"] not in seen:
+                    seen.add(record["link"])
+                    records.append(record)
+        if max_entries:
+            records = records[:max_entries]
 
-        domain = urlparse(url).netloc.replace('.', '_')
-        output_path = OUTPUT_DIR / f"{domain}_rss_extracted.txt"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(visible_text)
+        df = pd.DataFrame(records, columns=COLUMNS)
+        output_path = artifact_store.put(url, "rss_records", df.to_csv(index=False), suffix=".csv")
 
-        print(f"✅ RSS content saved to: {output_path}")
+        unchanged = sum(1 for result in results if result["not_modified"])
+        failed = sum(1 for result in results if result["error"])
+        print(f"✅ {len(records)} RSS records from {len(results)} feeds ({unchanged} unchanged, {failed} failed) saved to: {output_path}")
 
         return {
             "url": url,
-            "extracted_text": visible_text,
-            "extracted_links": unique_links,
-            "extracted_file": str(output_path)
+            "output_file": output_path,
+            "records": len(records),
+            # Nothing new anywhere: the pipeline can reuse the previous run's results
+            "not_modified": unchanged == len(results),
+            "feeds": [{k: v for k, v in result.items() if k not in ("records", "state")} for result in results],
+            "feed_states": {result["url"]: result["state"] for result in results if result["state"]}
         }
 
 rss_fetcher_tool = RSSFetcherTool()
@@ -1,18 +1,109 @@
 from pydantic import BaseModel, Field
-from typing import Dict
+from typing import Dict, List
 import asyncio
-import sys
-from pathlib import Path
 from urllib.parse import urlparse
-from playwright.async_api import async_playwright
 from crewai.tools import BaseTool
+from tools.browser_pool import get_browser_pool
+from tools.page_readiness import goto_and_wait
+from tools.request_blocking import install_request_blocking
+from tools import artifact_store, http_cache
+from tools.http_fetcher import fetch_url, is_html_page, looks_js_dependent, get_fetch_tier, set_fetch_tier
+
+# Concurrency limits for batch scraping
+MAX_CONCURRENT_FETCHES = 8      # global cap on plain HTTP fetches across all hosts
+                                # (browser renders are capped by the pool's MAX_CONTEXTS)
+DEFAULT_PER_HOST_LIMIT = 2      # regulator sites throttle aggressive clients
+PER_HOST_LIMITS = {
+    # "www.example.gov": 1,
+}
+
+# Semaphores live on the browser pool loop and are created on first use
+_global_limit = None
+_host_limits: Dict[str, asyncio.Semaphore] = {}
+
+
+def _host_semaphore(host: str) -> asyncio.Semaphore:
+    if host not in _host_limits:
+        _host_limits[host] = asyncio.Semaphore(PER_HOST_LIMITS.get(host, DEFAULT_PER_HOST_LIMIT))
+    return _host_limits[host]
+
+
+async def _render_in_browser(target_url: str) -> str:
+    async with get_browser_pool().page() as page:
+        page_stats = await install_request_blocking(page, target_url)
+        try:
+            await goto_and_wait(page, target_url, timeout_ms=60000)
+            print(
+                f"🛡️ Blocked {page_stats.requests_blocked}/{page_stats.requests_seen} requests "
+                f"(~{page_stats.bytes_saved // 1024} KB saved)"
+            )
+
+            await page.evaluate(
+                """(base) => {
+                    document.querySelectorAll('a[href]').forEach(a => {
+                        const href = a.getAttribute('href');
+                        if (href && !href.startsWith('http')) {
+                            a.setAttribute('href', new URL(href, base).href);
+                        }
+                    });
+                }""",
+                target_url
+            )
+
+            return await page.content()
+        finally:
+            # Pages are reused across sites, so drop this site's routing policy
+            await page.unroute("**/*")
+
+
+async def fetch_html(target_url: str) -> Dict:
+    """
+    Fetch a page's HTML, trying a plain HTTP GET first and escalating to the pooled
+    browser when the response looks JS-dependent. Runs on the browser pool loop.
+    """
+    global _global_limit
+    if _global_limit is None:
+        _global_limit = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+
+    domain = urlparse(target_url).netloc
+    try:
+        # Host slot first: a URL queued behind its own host must not hold a global slot meanwhile
+        async with _host_semaphore(domain):
+            # Tier 1: plain HTTP, unless this domain is known to need a browser
+            if get_fetch_tier(domain) != "browser":
+                loop = asyncio.get_running_loop()
+                async with _global_limit:
+                    response = await loop.run_in_executor(None, fetch_url, target_url)
+                if response is not None:
+                    # Only a real HTML page decides the tier: a 503 or a PDF says nothing about the domain
+                    if not looks_js_dependent(response):
+                        if is_html_page(response):
+                            set_fetch_tier(domain, "http")
+                        return {"html": response["text"], "fetched_via": "http", "digest": response["digest"],
+                                "not_modified": response["not_modified"]}
+                    if is_html_page(response):
+                        set_fetch_tier(domain, "browser")
+
+            # Tier 2: full browser render, waiting for one of the pool's contexts (not a fetch slot).
+            # Rendered pages can't be revalidated with conditional headers, so compare their
+            # digest under a separate cache key.
+            html = await _render_in_browser(target_url)
+            not_modified = http_cache.store(f"browser:{target_url}", html, content_type="text/html")
+            return {"html": html, "fetched_via": "browser", "digest": http_cache.body_digest(html),
+                    "not_modified": not_modified}
+
+    except Exception as e:
+        return {
+            "html": f"<html><body><h1>Error scraping {target_url}</h1><p>{str(e)}</p></body></html>",
+            "fetched_via": "error",
+            "digest": None,
+            "not_modified": False
+        }
 
-# Create output directory
-OUTPUT_DIR = Path("regulatory_outputs/site_outputs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-if sys.platform.startswith("win"):
-    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+async def fetch_many_html(urls: List[str]) -> List[Dict]:
+    """Fetch many pages concurrently under the global and per-host limits, keeping input order."""
+    return list(await asyncio.gather(*(fetch_html(u) for u in urls)))
 
 
 class ScraperInput(BaseModel):
@@ -24,51 +115,39 @@ class ScraperTool(BaseTool):
     description: str = "Scrapes raw HTML content from the provided URL and saves it as a file"
     args_schema: type = ScraperInput
 
-    def _run(self, url: str) -> Dict:
-        async def fetch_html(target_url: str) -> str:
-            try:
-                async with async_playwright() as p:
-                    browser = await p.chromium.launch(headless=True)
-                    page = await browser.new_page()
-                    await page.goto(target_url, timeout=60000)
-                    await page.wait_for_timeout(5000)
-
-                    await page.evaluate(
-                        """(base) => {
-                            document.querySelectorAll('a[href]').forEach(a => {
-                                const href = a.getAttribute('href');
-                                if (href && !href.startsWith('http')) {
-                                    a.setAttribute('href', new URL(href, base).href);
-                                }
-                            });
-                        }""",
-                        target_url
-                    )
-
-                    html = await page.content()
-                    await browser.close()
-                    return html
-
-            except Exception as e:
-                return (
-                    f"<html><body><h1>Error scraping {target_url}</h1><p>{str(e)}</p></body></html>"
-                )
-
-        html_content = asyncio.run(fetch_html(url))
-
-        domain = urlparse(url).netloc.replace('.', '_')
-        output_path = OUTPUT_DIR / f"{domain}_scraped.html"
-        with open(output_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
-
-        print(f"✅ Scraped content saved to {output_path}")
+    def _save(self, url: str, fetched: Dict) -> Dict:
+        html_content = fetched["html"]
+        output_path = artifact_store.put(url, "scraped", html_content, suffix=".html")
+
+        print(f"✅ Scraped content ({fetched['fetched_via']}) saved to {output_path}")
 
         return {
             "url": url,
             "html": html_content, 
             "scraped_html": html_content,
-            "scraped_file": str(output_path)
+            "scraped_file": output_path,
+            "fetched_via": fetched["fetched_via"],
+            "digest": fetched["digest"],
+            "not_modified": fetched["not_modified"]
         }
 
-scraper_tool = ScraperTool()
+    def _run(self, url: str) -> Dict:
+        # Runs on the shared browser pool loop, so the browser survives across calls
+        fetched = get_browser_pool().run(fetch_html(url))
+        return self._save(url, fetched)
+
+    async def _arun(self, url: str) -> Dict:
+        fetched = await get_browser_pool().arun(fetch_html(url))
+        return self._save(url, fetched)
+
+    async def afetch_many(self, urls: List[str]) -> List[Dict]:
+        """Scrape many URLs concurrently; results are returned in input order."""
+        pages = await get_browser_pool().arun(fetch_many_html(urls))
+        return [self._save(u, fetched) for u, fetched in zip(urls, pages)]
 
+    def fetch_many(self, urls: List[str]) -> List[Dict]:
+        """Blocking variant of `afetch_many`."""
+        pages = get_browser_pool().run(fetch_many_html(urls))
+        return [self._save(u, fetched) for u, fetched in zip(urls, pages)]
+
+scraper_tool = ScraperTool()
@@ -0,0 +1,123 @@
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urljoin
+from tools.cleaner_tool import TAGS_TO_REMOVE
+
+# Subtrees dropped while parsing; <head> content is never visible text
+STREAM_SKIP_TAGS = set(TAGS_TO_REMOVE) | {"head", "title", "template"}
+
+# Phase 1 streams pages larger than this from the scraped file instead of parsing them in memory
+STREAMING_THRESHOLD_CHARS = 5 * 1024 * 1024
+CHUNK_CHARS = 64 * 1024
+
+# Anchor text longer than this is truncated (keeps pathological pages bounded)
+MAX_ANCHOR_CHARS = 2000
+
+
+class StreamingHTMLExtractor(HTMLParser):
+    """
+    Incremental tokenizer that yields ("text", text) and ("link", text, href) segments
+    in document order, without building a tree. Feed it chunks and call `drain()`.
+    """
+
+    def __init__(self, base_url: str = ""):
+        super().__init__(convert_charrefs=True)
+        self.base_url = base_url
+        self._skip_stack: List[str] = []
+        self._text: List[str] = []
+        self._anchor = None  # (href, [text parts], length)
+        self._pending: List[Tuple] = []
+
+    def _flush_text(self):
+        # Text nodes end at tag boundaries, like the tree-based extractor
+        if self._text:
+            text = "".join(self._text).strip()
+            self._text = []
+            if text:
+                self._pending.append(("text", text))
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "body":
+            # An unclosed <head> ends where the body starts
+            self._skip_stack = [t for t in self._skip_stack if t not in ("head", "title")]
+        if tag in STREAM_SKIP_TAGS:
+            self._flush_text()
+            self._skip_stack.append(tag)
+            return
+        if self._skip_stack or self._anchor is not None:
+            return
+        self._flush_text()
+        if tag == "a":
+            href = dict(attrs).get("href")
+            if href:
+                self._anchor = (href, [], 0)
+
+    def handle_endtag(self, tag):
+        if tag in self._skip_stack:
+            while self._skip_stack and self._skip_stack.pop() != tag:
+                pass
+            return
+        if self._skip_stack:
+            return
+        if tag == "a" and self._anchor is not None:
+            href, parts, _ = self._anchor
+            self._anchor = None
+            text = " ".join("".join(parts).split())
+            if text:
+                self._pending.append(("link", text, urljoin(self.base_url, href)))
+            return
+        if self._anchor is None:
+            self._flush_text()
+
+    def handle_data(self, data):
+        if self._skip_stack:
+            return
+        if self._anchor is not None:
+            href, parts, length = self._anchor
+            if length < MAX_ANCHOR_CHARS:
+                parts.append(data[:MAX_ANCHOR_CHARS - length])
+                self._anchor = (href, parts, length + len(data))
+        else:
+            self._text.append(data)
+
+    def drain(self) -> List[Tuple]:
+        segments, self._pending = self._pending, []
+        return segments
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+
+def iter_segments(chunks: Iterable[str], base_url: str = "") -> Iterator[Tuple]:
+    """Yield text/link segments from an iterable of HTML chunks, holding one chunk at a time."""
+    parser = StreamingHTMLExtractor(base_url)
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.drain()
+    parser.close()
+    yield from parser.drain()
+
+
+def iter_string_chunks(html: str, chunk_chars: int = CHUNK_CHARS) -> Iterator[str]:
+    for start in range(0, len(html), chunk_chars):
+        yield html[start:start + chunk_chars]
+
+
+def iter_extracted_text(segments: Iterable[Tuple], links: List[str],
+                        anchors: Optional[List[Tuple[str, str]]] = None) -> Iterator[str]:
+    """
+    Render segments in HTMLExtractorTool's "text (href)" format, appending hrefs to
+    `links` (and (text, href) pairs to `anchors`, if given) as they are seen.
+    """
+    first = True
+    for segment in segments:
+        if segment[0] == "link":
+            links.append(segment[2])
+            if anchors is not None:
+                anchors.append((segment[1], segment[2]))
+            piece = f"{segment[1]} ({segment[2]})"
+        else:
+            piece = segment[1]
+        yield piece if first else " " + piece
+        first = False
@@ -0,0 +1,178 @@
+import json
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+from tools.listing_segmenter import MIN_ITEMS, has_date, item_record, regulator_for, segment_listing
+
+# Learned per-domain extraction templates live next to the other scraper caches
+CACHE_DIR = Path("regulatory_outputs/cache")
+CACHE_DIR.mkdir(parents=True, exist_ok=True)
+TEMPLATES_FILE = CACHE_DIR / "extraction_templates.json"
+
+# A template still matches if it finds between these multiples of the items it was learned on
+MIN_MATCH_RATIO = 0.5
+MAX_MATCH_RATIO = 2.0
+# A date element path is kept if it holds a date in at least this share of the items
+MIN_DATE_COVERAGE = 0.5
+# Only learn from extractions whose item links were found among the page's anchors at this rate
+MIN_LINK_COVERAGE = 0.8
+
+_lock = threading.Lock()
+_INDEX = re.compile(r"\[\d+\]$")
+
+
+def _load() -> Dict:
+    try:
+        return json.loads(TEMPLATES_FILE.read_text(encoding="utf-8"))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _save(templates: Dict):
+    TEMPLATES_FILE.write_text(json.dumps(templates, indent=2), encoding="utf-8")
+
+
+def template_key(url: str, mode: str) -> str:
+    # Templates hold absolute element paths, which differ between the fused clean+extract tree
+    # ("fused") and the HTMLExtractorTool tree re-parsed from the cleaned file ("unfused")
+    return f"{mode}:{urlparse(url).netloc}"
+
+
+def _update(key: str, **fields):
+    with _lock:
+        templates = _load()
+        if key in templates:
+            templates[key].update(fields)
+            _save(templates)
+
+
+def get_template(url: str, mode: str) -> Optional[Dict]:
+    with _lock:
+        return _load().get(template_key(url, mode))
+
+
+def _strip_index(step: str) -> str:
+    return _INDEX.sub("", step)
+
+
+def learn(url: str, items: List[Dict], link_records: List[Dict], mode: str) -> Optional[Dict]:
+    """
+    Derive an XPath template from a successful LLM extraction: the anchors the LLM picked
+    as item links are located in the cleaned tree via their link records, and the path
+    step that varies between them marks the repeated item element. Nothing is learned when
+    too few item links are among the anchors, as the extraction may not match the page.
+    """
+    xpath_by_href = {}
+    for record in link_records or []:
+        if record.get("xpath"):
+            xpath_by_href.setdefault(record["href"], record["xpath"])
+    found = [xpath_by_href[i["link"]] for i in items if i.get("link") in xpath_by_href]
+    if not items or len(found) < MIN_LINK_COVERAGE * len(items):
+        return None
+    paths = list(dict.fromkeys(found))
+    if len(paths) < MIN_ITEMS:
+        return None
+
+    # Keep the most common path shape; stray matches are usually navigation or related links
+    steps = [p.strip("/").split("/") for p in paths]
+    shape = Counter(tuple(map(_strip_index, s)) for s in steps).most_common(1)[0][0]
+    steps = [s for s in steps if tuple(map(_strip_index, s)) == shape]
+    varying = [i for i in range(len(shape)) if len({s[i] for s in steps}) > 1]
+    if len(steps) < MIN_ITEMS or not varying:
+        return None
+
+    # Everything up to the last varying step is the item; what follows leads to the title link
+    cut = varying[-1]
+    item_xpath = "/" + "/".join(shape[i] if i in varying else steps[0][i] for i in range(cut + 1))
+    link_path = "/".join(steps[0][cut + 1:]) or "."
+
+    regulators = Counter(i["regulator"] for i in items if i.get("regulator"))
+    key = template_key(url, mode)
+    with _lock:
+        templates = _load()
+        previous = templates.get(key, {})
+        template = {
+            "item_xpath": item_xpath,
+            "link_path": link_path,
+            "date_path": None,  # learned on first use, from the tree
+            "regulator": regulators.most_common(1)[0][0] if regulators else regulator_for(url),
+            "expected_items": len(steps),
+            "version": previous.get("version", 0) + 1,
+            "learned_at": datetime.now().isoformat(timespec="seconds"),
+            "learned_from": url,
+            "hits": 0,
+            "misses": 0,
+            "stale": False,
+        }
+        templates[key] = template
+        _save(templates)
+    print(f"📐 Learned extraction template v{template['version']} for {key}: {item_xpath} -> {link_path}")
+    return template
+
+
+def _learn_date_path(root, elements) -> Optional[str]:
+    tree = root.getroottree()
+    found = Counter()
+    for element in elements:
+        prefix = tree.getpath(element)
+        for child in element.iter():
+            if isinstance(child.tag, str) and child.text and has_date(child.text):
+                found[tree.getpath(child)[len(prefix) + 1:] or "."] += 1
+                break
+    if not found:
+        return None
+    path, count = found.most_common(1)[0]
+    return path if count >= MIN_DATE_COVERAGE * len(elements) else None
+
+
+def apply(root, url: str, mode: str) -> Optional[Dict]:
+    """
+    Extract listing items from a cleaned tree with the domain's learned template.
+    Returns a segment_listing-style result, or None if there is no usable template
+    or it no longer matches (the template is then marked stale for re-learning).
+    """
+    key = template_key(url, mode)
+    template = get_template(url, mode)
+    if not template or template.get("stale"):
+        return None
+
+    elements = root.xpath(template["item_xpath"])
+    date_path = template.get("date_path")
+    if date_path is None and elements:
+        date_path = _learn_date_path(root, elements)
+        if date_path:
+            _update(key, date_path=date_path)
+
+    items = []
+    for element in elements:
+        titles = [a for a in element.xpath(template["link_path"]) if a.get("href")]
+        if not titles:
+            continue
+        dates = element.xpath(date_path) if date_path else []
+        record = item_record(element, titles[0], url, template["regulator"], dates[0] if dates else None)
+        if record["topic"]:
+            items.append(record)
+
+    expected = template["expected_items"]
+    if len(items) < MIN_ITEMS or not MIN_MATCH_RATIO * expected <= len(items) <= MAX_MATCH_RATIO * expected:
+        _update(key, misses=template["misses"] + 1, stale=True)
+        print(f"♻️ Template v{template['version']} for {key} matched {len(items)} items (expected ~{expected}); will re-learn")
+        return None
+
+    _update(key, hits=template["hits"] + 1, last_matched=len(items),
+            last_used=datetime.now().isoformat(timespec="seconds"))
+    print(f"📐 Applied extraction template v{template['version']} for {key}: {len(items)} items")
+    return {"items": items, "confidence": 1.0, "container": template["item_xpath"]}
+
+
+def find_listing(root, url: str, mode: Optional[str] = None) -> Dict:
+    """
+    Learned template first, then generic repeated-block segmentation. Templates are only
+    used with a mode, i.e. on phase 1 listing pages: detail pages summarized in phase 2
+    would never match and would mark the listing template stale.
+    """
+    return (mode and apply(root, url, mode)) or segment_listing(root, url)
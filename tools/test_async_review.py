@@ -0,0 +1,65 @@
+# test_async_review.py
+
+import sys
+import os
+import tempfile
+
+# Ensure parent folder is on path so tools can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Caches and outputs are relative to the working directory: keep this run's out of the real ones
+workdir = tempfile.TemporaryDirectory()
+os.chdir(workdir.name)
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+import asyncio
+import json
+import pandas as pd
+from openai.types.chat import ChatCompletion
+from agents import llm_exclusion_agent
+
+REQUEST_SECONDS = 0.05
+CONCURRENCY = 2
+ROWS = 100
+
+
+class FakeAsyncOpenAI:
+    """Answers every review request after REQUEST_SECONDS, offline."""
+
+    def __init__(self, **kwargs):
+        self.chat = self
+        self.completions = self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+    async def create(self, **params):
+        await asyncio.sleep(REQUEST_SECONDS)
+        return ChatCompletion.model_validate({
+            "id": "fake", "object": "chat.completion", "created": 0, "model": params["model"],
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {
+                "role": "assistant", "content": json.dumps({"recommendation": "Include", "reason": "fake"})
+            }}]
+        })
+
+
+# ✅ Many more rows than slots, each fast: queued rows must not run out of time while waiting.
+# Draining the queue takes ROWS / CONCURRENCY * REQUEST_SECONDS = 2.5 s, well over the 1 s row timeout.
+llm_exclusion_agent.AsyncOpenAI = FakeAsyncOpenAI
+llm_exclusion_agent.ROW_TIMEOUT_SECONDS = 1
+
+df = pd.DataFrame([
+    {"topic": f"Update {i}", "additional_context": "Context", "regulator": "BIS", "link": f"https://www.bis.org/press/p{i}.htm"}
+    for i in range(ROWS)
+])
+verdicts = llm_exclusion_agent.LLMExclusionAgent()._review_rows(df, list(df.index), bypass_cache=True, concurrency=CONCURRENCY)
+
+errors = [i for i, verdict in verdicts.items() if verdict["recommendation"] == "Error"]
+print(f"✅ {len(verdicts)} rows reviewed, {len(errors)} errors")
+assert len(verdicts) == ROWS and not errors, errors[:5]
+
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+workdir.cleanup()
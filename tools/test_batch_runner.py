@@ -0,0 +1,53 @@
+import sys
+import os
+import tempfile
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Outputs, caches and the decision store are relative to the working directory:
+# a fresh one keeps stub results out of the real ones and makes every run go through batch mode
+workdir = tempfile.TemporaryDirectory()
+os.chdir(workdir.name)
+
+# Run batch mode offline against the local stub on a free port
+# (the URL must be set before batch_runner is imported)
+from tools.batch_stub_server import serve
+server = serve(0)
+os.environ["BATCH_API_BASE_URL"] = f"http://127.0.0.1:{server.server_address[1]}/v1"
+os.environ.setdefault("OPENAI_API_KEY", "stub")
+
+import pandas as pd
+from tools import artifact_store, batch_runner
+from agents.llm_exclusion_agent import LLMExclusionAgent
+from agents.summarizer_agent import SummarizerAgent
+
+batch_runner.POLL_SECONDS = 1  # the stub finishes in seconds
+
+test_url = "https://www.bis.org/press/pressrels.htm"
+df = pd.DataFrame([
+    {"date": "2025-06-17", "topic": "Basel Committee consults on liquidity risk", "additional_context": "Consultation on bank liquidity", "link": "https://www.bis.org/press/p1.htm", "regulator": "BIS"},
+    {"date": "2025-06-16", "topic": "Annual Economic Report launch event", "additional_context": "Livestream details", "link": "https://www.bis.org/press/p2.htm", "regulator": "BIS"},
+    {"date": "2025-06-15", "topic": "Guidance on climate-related financial risks", "additional_context": "Supervisory guidance", "link": "https://www.bis.org/press/p3.htm", "regulator": "BIS"},
+])
+csv_file = artifact_store.put(test_url, "llm_output", df.to_csv(index=False), suffix=".csv")
+
+# Exclusion in batch mode
+result = LLMExclusionAgent().run({"url": test_url, "extracted_file": csv_file, "batch": True, "bypass_cache": True,
+                                 "skip_seen": False, "local_classifier": False})
+print("✅ Exclusion output:")
+print(result)
+print(pd.read_excel(result["exclusion_file"])[["topic", "Recommendation", "Reason"]])
+
+# Summaries in batch mode
+outputs = SummarizerAgent().run_batch(
+    [{"extracted_text": row["additional_context"], "url": row["link"]} for _, row in df.iterrows()]
+    + [{"extracted_text": "Supervisory guidance", "url": "https://www.bis.org/press/p4.htm", "prompt": "List the deadlines only."}],
+    job_name="test_summaries", bypass_cache=True
+)
+print("✅ Summaries:")
+for output in outputs:
+    print(output["source_url"], "->", output["summary"])
+
+server.shutdown()
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+workdir.cleanup()
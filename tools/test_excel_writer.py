@@ -0,0 +1,49 @@
+# test_excel_writer.py
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+
+# Ensure parent folder is on path so tools can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import pandas as pd
+from openpyxl import load_workbook
+from tools import excel_writer
+
+# ✅ Same layout as the exclusion workbook: link in column G, action dropdown in column H
+df = pd.DataFrame([
+    {"date": "2025-06-17", "topic": "Basel Committee consults on liquidity risk", "additional_context": "Consultation",
+     "regulator": "BIS", "Recommendation": "Include", "Reason": "Prudential", "link": "https://www.bis.org/press/p1.htm", "action": ""},
+    {"date": "2025-06-16", "topic": "=1+1 looks like a formula", "additional_context": None,
+     "regulator": "BIS", "Recommendation": "Exclude", "Reason": "Event", "link": "https://www.bis.org/press/p2.htm", "action": ""},
+    {"date": "2025-06-15", "topic": "No link on this row", "additional_context": "Speech",
+     "regulator": "BIS", "Recommendation": "Exclude", "Reason": "Speech", "link": None, "action": ""},
+])
+options = ["summarize", "custom prompt", "no action"]
+
+# Write with xlsxwriter (if installed) and with the openpyxl write-only fallback
+writers = {"openpyxl": None}
+if excel_writer.xlsxwriter is not None:
+    writers["xlsxwriter"] = excel_writer.xlsxwriter
+
+with tempfile.TemporaryDirectory() as tmp:
+    for name, module in writers.items():
+        excel_writer.xlsxwriter = module
+        path = Path(tmp) / f"{name}.xlsx"
+        excel_writer.write_workbook(df, path, sheet_name="Exclusions", link_column="link", dropdowns={"action": options})
+
+        links = excel_writer.read_links(path, column_letter="G")
+        back = pd.read_excel(path)
+        sheet = load_workbook(path).worksheets[0]
+        validations = [(dv.formula1, str(dv.sqref)) for dv in sheet.data_validations.dataValidation]
+
+        print(f"✅ {name}: links={links}")
+        print(f"   topics={back['topic'].tolist()}")
+        print(f"   validations={validations}")
+
+        assert links == [df.at[0, "link"], df.at[1, "link"], None]
+        assert back["link"].tolist()[:2] == [excel_writer.LINK_TEXT] * 2
+        assert back["topic"].tolist() == df["topic"].tolist()
+        assert validations and validations[0][1] == "H2:H4"
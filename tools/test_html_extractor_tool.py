@@ -7,11 +7,13 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from tools.html_extractor_tool import html_extractor_tool
+from tools import artifact_store
 
-# ✅ Update with a real cleaned HTML file path you already have
+# ✅ Uses the latest cleaned HTML stored for this URL (run the cleaner on it first)
+test_url = "https://www.bis.org/press/pressrel.htm"
 test_input = {
-    "url": "https://www.bis.org/press/pressrel.htm",
-    "cleaned_file": "regulatory_outputs/site_outputs/www_bis_org_scraped.html"
+    "url": test_url,
+    "cleaned_file": artifact_store.latest(test_url, "cleaned")
 }
 
 # Run the tool
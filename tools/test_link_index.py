@@ -0,0 +1,26 @@
+# test_link_index.py
+
+import sys
+import os
+
+# Ensure parent folder is on path so tools can be imported
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tools.link_index import LinkIndex
+
+# ✅ "Read more" carries no content words of its own: the link is found through its block text
+records = [
+    {"text": "Read more", "href": "https://www.bis.org/press/p250617.htm",
+     "block_text": "Basel Committee consults on crypto exposures Read more"},
+    {"text": "Basel Committee publishes liquidity risk principles", "href": "https://www.bis.org/press/p250616.htm",
+     "block_text": "Basel Committee publishes liquidity risk principles"},
+]
+index = LinkIndex.from_link_records(records)
+
+matches = index.search("Basel Committee consults on crypto exposures")
+print(f"✅ Read more: {matches}")
+assert matches and matches[0][0] == records[0]["href"], matches
+
+matches = index.search("Basel Committee publishes liquidity risk principles")
+print(f"✅ Descriptive anchor: {matches}")
+assert matches and matches[0][0] == records[1]["href"], matches
@@ -0,0 +1,93 @@
+import re
+from typing import List
+
+try:
+    import tiktoken
+except ImportError:  # a chars/4 estimate is close enough for budgeting
+    tiktoken = None
+
+# Extracted text renders anchors as "text (href)"; each marker ends a listing item's title
+LINK_MARKER = re.compile(r"\((https?://[^\s)]+)\)")
+
+# Per-chunk budgets for LLMExtractorTool: prompt tokens, and items (bounds the JSON answer)
+MAX_CHUNK_TOKENS = 6000
+MAX_CHUNK_ITEMS = 40
+
+_encoding = None
+
+
+def _get_encoding(model: str):
+    global _encoding, tiktoken
+    if _encoding is None and tiktoken is not None:
+        try:
+            try:
+                _encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding("o200k_base")
+        except Exception as e:
+            # The BPE file is downloaded on first use; offline, stay on the estimate
+            print(f"⚠️ tiktoken unavailable ({type(e).__name__}), estimating tokens as chars/4")
+            tiktoken = None
+    return _encoding
+
+
+def count_tokens(text: str, model: str = "gpt-4o-mini") -> int:
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def item_boundaries(text: str) -> List[int]:
+    """Offsets just after each link marker: the places where a chunk may end without cutting a title."""
+    return [m.end() for m in LINK_MARKER.finditer(text)]
+
+
+def _split_long(piece: str, max_tokens: int) -> List[str]:
+    """Break a piece with no item boundary (e.g. a long article) at whitespace."""
+    tokens = count_tokens(piece)
+    if tokens <= max_tokens:
+        return [piece]
+    window = max(1, len(piece) * max_tokens // tokens)
+    parts = []
+    while len(piece) > window:
+        cut = piece.rfind(" ", 0, window)
+        cut = cut if cut > 0 else window
+        parts.append(piece[:cut])
+        piece = piece[cut:]
+    parts.append(piece)
+    return parts
+
+
+def split_items(text: str) -> List[str]:
+    """
+    Pieces between consecutive item boundaries: each ends with one item's "title (href)"
+    and starts with the previous item's trailing context. The last piece holds any trailing text.
+    """
+    cuts = [0] + item_boundaries(text) + [len(text)]
+    return [text[a:b] for a, b in zip(cuts, cuts[1:]) if text[a:b].strip()]
+
+
+def split_on_items(text: str, max_tokens: int = MAX_CHUNK_TOKENS, max_items: int = MAX_CHUNK_ITEMS) -> List[str]:
+    """
+    Split extracted text into chunks under `max_tokens` that end on item boundaries.
+    Each chunk after the first repeats the previous item, so an item whose context
+    trails its link is seen whole at least once (duplicates are merged afterwards).
+    """
+    if count_tokens(text) <= max_tokens and len(item_boundaries(text)) <= max_items:
+        return [text]
+
+    pieces = [part for p in split_items(text) for part in _split_long(p, max_tokens)]
+    sizes = [count_tokens(p) for p in pieces]
+
+    chunks = []
+    start = 0
+    while start < len(pieces):
+        end, tokens = start, 0
+        while end < len(pieces) and (end == start or (tokens + sizes[end] <= max_tokens and end - start < max_items)):
+            tokens += sizes[end]
+            end += 1
+        overlap = start - 1 if start > 0 and sizes[start - 1] + tokens <= max_tokens else start
+        chunks.append("".join(pieces[overlap:end]).strip())
+        start = end
+    return chunks